@@ -3,7 +3,15 @@
 # Register your models here.
 
 from django.contrib import admin
-from .models import UserProfile, Plant, Disease, Logbook, Reminder, Admin
+from .models import (
+    UserProfile, Plant, Disease, Logbook, Reminder, Admin, PlantInfoCache,
+    PlantNameTranslation, Tombstone, MediaBlob)
+from . import search
+from .name_dictionary import name_dictionary
+from .plant_cache import normalize_plant_name
+
+# Full-text matches the admin changelist shows for a search
+ADMIN_SEARCH_LIMIT = 1000
 
 
 # ==========================================
@@ -50,6 +58,7 @@ class PlantAdmin(admin.ModelAdmin):
         'hindi_name'
     ]
     readonly_fields = ['created_at', 'updated_at']
+
     fieldsets = (
         ('Basic Information', {
             'fields': (
@@ -61,7 +70,12 @@ class PlantAdmin(admin.ModelAdmin):
             )
         }),
         ('Safety Information', {
-            'fields': ('toxicity', 'edibility')
+            'fields': (
+                'toxicity',
+                'toxicity_details',
+                'edibility',
+                'edibility_details'
+            )
         }),
         ('Care Instructions', {
             'fields': (
@@ -73,7 +87,17 @@ class PlantAdmin(admin.ModelAdmin):
             )
         }),
         ('Additional Info', {
-            'fields': ('fun_facts', 'image_url', 'is_common')
+            'fields': (
+                'family',
+                'description',
+                'origin',
+                'growth_rate',
+                'warning',
+                'fun_facts',
+                'image_url',
+                'wikipedia_url',
+                'is_common'
+            )
         }),
         ('Timestamps', {
             'fields': ('created_at', 'updated_at'),
@@ -81,6 +105,12 @@ class PlantAdmin(admin.ModelAdmin):
         }),
     )
 
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term:
+            return queryset, False
+        ids = [pk for pk, _ in search.plant_ids(search_term, limit=ADMIN_SEARCH_LIMIT)]
+        return queryset.filter(id__in=ids), False
+
 
 # ==========================================
 # DISEASE ADMIN
@@ -97,6 +127,12 @@ class DiseaseAdmin(admin.ModelAdmin):
     search_fields = ['name', 'symptoms', 'treatment']
     readonly_fields = ['created_at', 'updated_at']
 
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term:
+            return queryset, False
+        ids = [pk for pk, _ in search.disease_ids(search_term, limit=ADMIN_SEARCH_LIMIT)]
+        return queryset.filter(id__in=ids), False
+
 
 # ==========================================
 # LOGBOOK ADMIN
@@ -158,8 +194,96 @@ class AdminModelAdmin(admin.ModelAdmin):
         'user__email',
         'user__username'
     ]
+    list_select_related = ['user']
     readonly_fields = ['created_at', 'updated_at']
 
     def get_email(self, obj):
         return obj.user.email
-    get_email.short_description = 'Email'
\ No newline at end of file
+    get_email.short_description = 'Email'
+
+
+# ==========================================
+# PLANT INFO CACHE ADMIN
+# ==========================================
+@admin.register(PlantInfoCache)
+class PlantInfoCacheAdmin(admin.ModelAdmin):
+    list_display = [
+        'key',
+        'hit_count',
+        'miss_count',
+        'updated_at'
+    ]
+    search_fields = ['key']
+    readonly_fields = [
+        'key',
+        'sections',
+        'hit_count',
+        'miss_count',
+        'created_at',
+        'updated_at'
+    ]
+    actions = ['purge_entries']
+
+    @admin.action(description='Purge selected cache entries')
+    def purge_entries(self, request, queryset):
+        count = queryset.delete()[0]
+        self.message_user(request, f'Purged {count} cache entries.')
+
+
+# ==========================================
+# PLANT NAME DICTIONARY ADMIN
+# ==========================================
+@admin.register(PlantNameTranslation)
+class PlantNameTranslationAdmin(admin.ModelAdmin):
+    list_display = [
+        'english',
+        'hindi',
+        'romanized',
+        'source',
+        'updated_at'
+    ]
+    list_filter = ['source']
+    search_fields = ['english', 'hindi', 'romanized']
+    readonly_fields = ['english_key', 'source', 'created_at', 'updated_at']
+
+    def save_model(self, request, obj, form, change):
+        obj.english_key = normalize_plant_name(obj.english)
+        obj.source = 'manual'
+        super().save_model(request, obj, form, change)
+        name_dictionary.reload()
+
+
+# ==========================================
+# TOMBSTONE ADMIN (Read-only)
+# ==========================================
+@admin.register(Tombstone)
+class TombstoneAdmin(admin.ModelAdmin):
+    list_display = [
+        'model',
+        'object_id',
+        'owner_id',
+        'deleted_at'
+    ]
+    list_filter = ['model']
+    readonly_fields = ['model', 'object_id', 'owner_id', 'deleted_at']
+
+    def has_add_permission(self, request):
+        return False
+
+
+# ==========================================
+# MEDIA BLOB ADMIN (Read-only)
+# ==========================================
+@admin.register(MediaBlob)
+class MediaBlobAdmin(admin.ModelAdmin):
+    list_display = [
+        'name',
+        'size',
+        'ref_count',
+        'updated_at'
+    ]
+    search_fields = ['digest']
+    readonly_fields = ['name', 'digest', 'size', 'ref_count', 'created_at', 'updated_at']
+
+    def has_add_permission(self, request):
+        return False
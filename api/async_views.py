@@ -0,0 +1,133 @@
+import asyncio
+import json
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_POST
+from PIL import UnidentifiedImageError
+from rest_framework import exceptions, status
+from rest_framework.authentication import (
+    SessionAuthentication, TokenAuthentication)
+from rest_framework.request import Request
+
+from api import plant_cache, providers
+from api.image_hash import dhash, get_identification_index
+from api.image_processing import preprocess_leaf_upload
+from api.plant_service import (
+    aget_plant_info, alookup_plant_info, batch_line, build_identification,
+    dedupe_plant_names)
+
+
+# Native async versions of the views in api/views.py, routed instead of
+# them when SERVER_MODE=asgi. Provider calls run on the event loop, so one
+# worker can wait on many slow upstream requests at once.
+
+def _authentication_error(request):
+    # Same authenticators as the DRF views (token, or session + CSRF);
+    # None when authenticated, else the 401/403 response DRF would send
+    drf_request = Request(request, authenticators=[
+        TokenAuthentication(), SessionAuthentication()])
+    try:
+        if drf_request.user.is_authenticated:
+            return None
+        error = exceptions.NotAuthenticated()
+    except exceptions.APIException as e:  # bad token, CSRF failure
+        error = e
+    return JsonResponse({'detail': str(error.detail)}, status=error.status_code)
+
+
+@require_GET
+async def get_complete_plant_info(request):
+    plant_name = request.GET.get('name', '')
+    if not plant_name:
+        return JsonResponse({'error': 'Plant name required'},
+            status=status.HTTP_400_BAD_REQUEST)
+    try:
+        result, freshness = await alookup_plant_info(plant_name)
+    except Exception as e:
+        return JsonResponse({'error': str(e)},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    return plant_cache.set_cache_headers(
+        JsonResponse(result, json_dumps_params={'ensure_ascii': False}), freshness)
+
+async def _stream_batch(names):
+    semaphore = asyncio.Semaphore(settings.BATCH_MAX_PARALLEL)
+
+    async def lookup(plant_name):
+        async with semaphore:
+            try:
+                return batch_line(plant_name, await aget_plant_info(plant_name))
+            except Exception as e:
+                return batch_line(plant_name, error=str(e))
+
+    tasks = [asyncio.ensure_future(lookup(name)) for name in names]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        for task in tasks:
+            task.cancel()
+
+@csrf_exempt  # CSRF is enforced by SessionAuthentication, as in DRF
+@require_POST
+async def get_batch_plant_info(request):
+    error = await sync_to_async(_authentication_error)(request)
+    if error is not None:
+        return error
+    try:
+        names = json.loads(request.body).get('names')
+    except (ValueError, AttributeError):
+        names = None
+    names = dedupe_plant_names(names) if isinstance(names, list) else []
+    if not names:
+        return JsonResponse({'error': 'names list required'},
+            status=status.HTTP_400_BAD_REQUEST)
+    if len(names) > settings.BATCH_MAX_NAMES:
+        return JsonResponse(
+            {'error': f'At most {settings.BATCH_MAX_NAMES} names per request'},
+            status=status.HTTP_400_BAD_REQUEST)
+    return StreamingHttpResponse(
+        _stream_batch(names), content_type='application/x-ndjson')
+
+def _prepare_leaf(image_file):
+    prepared = preprocess_leaf_upload(image_file)
+    return prepared, dhash(prepared.image)
+
+@csrf_exempt  # CSRF is enforced by SessionAuthentication, as in DRF
+@require_POST
+async def identify_plant_from_image(request):
+    error = await sync_to_async(_authentication_error)(request)
+    if error is not None:
+        return error
+    image_file = request.FILES.get('image')
+    if not image_file:
+        return JsonResponse({'error': 'No image provided'},
+            status=status.HTTP_400_BAD_REQUEST)
+    try:
+        try:
+            prepared, image_hash = await asyncio.to_thread(
+                _prepare_leaf, image_file)
+        except UnidentifiedImageError:
+            return JsonResponse({'error': 'Invalid image'},
+                status=status.HTTP_400_BAD_REQUEST)
+        identification_index = get_identification_index()
+        vision = identification_index.lookup(image_hash)
+        if vision is None:
+            vision = await providers.aidentify_from_image(prepared)
+            if vision:
+                identification_index.add(image_hash, vision)
+        if not vision:
+            return JsonResponse({'error': 'Identification failed'},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        plant_name = vision.get('plant_name', 'Unknown')
+        if plant_name == 'Unknown':
+            return JsonResponse({'error': 'Could not identify'},
+                status=status.HTTP_404_NOT_FOUND)
+        return JsonResponse(build_identification(
+            plant_name, vision, await aget_plant_info(plant_name), prepared),
+            json_dumps_params={'ensure_ascii': False})
+    except Exception as e:
+        return JsonResponse({'error': str(e)},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -0,0 +1,207 @@
+import re
+
+from django.db import transaction
+
+from .models import Disease, Plant
+
+
+# ==========================================
+# LOCAL LOOKUP
+# ==========================================
+def find_local_plant(plant_name):
+    """Plant (with its diseases) by common, scientific or Hindi name"""
+    return Plant.objects.by_name(plant_name).prefetch_related(
+        'diseases').order_by('id').first()
+
+
+# Descriptive text for the enum fields, matching what format_plant_data
+# produces for LLM answers
+TOXICITY_TEXT = {
+    'non_toxic': 'Non-toxic and safe for humans and pets',
+    'toxic_pets': 'Toxic to pets, keep away from cats and dogs',
+    'toxic_humans': 'Contains toxic compounds, avoid ingestion',
+    'highly_toxic': 'Highly toxic, can cause severe poisoning',
+}
+EDIBILITY_TEXT = {
+    'edible': 'Yes, safe to consume (verify parts and preparation)',
+    'non_edible': 'Not edible, not safe for consumption',
+    'medicinal': 'Used medicinally, consume only in recommended amounts',
+    'poisonous': 'Poisonous, do not consume',
+}
+
+
+def plant_to_details(plant):
+    """Same shape as plant_service.build_plant_details()"""
+    return {
+        'common_name': plant.common_name,
+        'hindi_name': plant.hindi_name,
+        'description': plant.description or 'Not available',
+        'image_url': plant.image_url,
+        'wikipedia_url': plant.wikipedia_url,
+        'scientific_name': plant.scientific_name,
+        'family': plant.family,
+        'watering': plant.watering,
+        'sunlight': plant.sunlight,
+        'soil_type': plant.soil_type,
+        'indoor_outdoor': plant.get_plant_type_display(),
+        'edible': plant.edibility_details or EDIBILITY_TEXT.get(plant.edibility, ''),
+        'toxic': plant.toxicity_details or TOXICITY_TEXT.get(plant.toxicity, ''),
+        'warning': plant.warning or None,
+        'fun_facts': plant.fun_facts,
+        'origin': plant.origin,
+        'growth_rate': plant.growth_rate,
+        'diseases': [
+            {
+                'name': disease.name,
+                'symptom': disease.symptoms,
+                'treatment': disease.treatment,
+            }
+            for disease in plant.diseases.all()
+        ]
+    }
+
+
+# ==========================================
+# WRITE-BACK
+# ==========================================
+def classify_plant_type(text):
+    text = _text(text).lower()
+    indoor, outdoor = 'indoor' in text, 'outdoor' in text
+    if indoor and not outdoor:
+        return 'indoor'
+    if outdoor and not indoor:
+        return 'outdoor'
+    return 'both'
+
+
+NOT_TOXIC = re.compile(
+    r'\bnon-? ?(?:toxic|poisonous)\b|\bnot (?:toxic|poisonous)\b'
+    r'|\bno (?:known )?(?:toxicity|toxins?|poison)')
+NOT_EDIBLE = re.compile(r'\bnot edible\b|\binedible\b|\bnon-? ?edible\b|\bnot safe\b')
+
+
+def classify_toxicity(text):
+    """
+    Map descriptive toxicity text to a TOXICITY_CHOICES key, or None.
+    Any toxicity claim wins over a "non-toxic" one, so "Non-toxic to
+    humans but toxic to cats" is toxic_pets, never non_toxic.
+    """
+    text = _text(text).lower()
+    if not text or 'not available' in text:
+        return None
+    claims = NOT_TOXIC.sub('', text)
+    if 'toxic' in claims or 'poison' in claims:
+        if re.search(r'\bhighly\b|\bsevere|\bfatal\b|\bdeadly\b', claims):
+            return 'highly_toxic'
+        if re.search(r'\bpets?\b|\bcats?\b|\bdogs?\b|\banimals\b', claims):
+            return 'toxic_pets'
+        return 'toxic_humans'
+    if NOT_TOXIC.search(text) or 'safe' in text:
+        return 'non_toxic'
+    return None
+
+
+def classify_edibility(text):
+    """
+    Map descriptive edibility text to an EDIBILITY_CHOICES key. A plant
+    with edible parts is 'edible' even when other parts are poisonous
+    ("Leaves are edible, seeds are poisonous"); the caveat is kept in
+    the stored text.
+    """
+    text = _text(text).lower()
+    claims = NOT_TOXIC.sub('', NOT_EDIBLE.sub('', text))
+    medicinal = 'medicin' in claims
+    if re.search(r'\bedible\b|safe to (?:consume|eat)', claims):
+        return 'medicinal' if medicinal else 'edible'
+    if 'poison' in claims or 'toxic' in claims:
+        return 'poisonous'
+    if medicinal:
+        return 'medicinal'
+    return 'non_edible'
+
+
+def _text(value):
+    """LLM answers are not always strings (lists, numbers, null)"""
+    if value is None:
+        return ''
+    if isinstance(value, (list, tuple)):
+        return '; '.join(_text(item) for item in value)
+    return str(value)
+
+
+def _fit(value, field_name, model=Plant):
+    """Text trimmed to the column's max_length (URLs that do not fit are dropped)"""
+    value = _text(value)
+    max_length = model._meta.get_field(field_name).max_length
+    if max_length and len(value) > max_length:
+        return '' if field_name.endswith('url') else value[:max_length]
+    return value
+
+
+def is_confident(details, missing):
+    """
+    Whether an external answer is reliable enough to write back: every
+    source answered and Wikipedia's article for the name mentions the
+    genus the LLM gave, so a typo or a non-plant is not stored under
+    whatever name was typed.
+    """
+    if missing or classify_toxicity(details.get('toxic')) is None:
+        return False
+    genus = _text(details.get('scientific_name')).split()[:1]
+    return bool(genus) and genus[0].lower() in _text(details.get('description')).lower()
+
+
+def save_plant_from_details(details):
+    """
+    Write an externally assembled plant (build_plant_details() output)
+    back as Plant + Disease rows so the next lookup is served locally.
+    Returns the Plant, or None when the data is too uncertain to store.
+    The descriptive toxic/edible text is kept next to the enum values.
+    """
+    toxicity = classify_toxicity(details.get('toxic'))
+    if toxicity is None or not details.get('scientific_name'):
+        return None
+
+    common_name = _fit(details['common_name'], 'common_name')
+    with transaction.atomic():
+        existing = find_local_plant(common_name)
+        if existing is not None:
+            return existing
+        # The unique name constraint settles concurrent write-backs
+        plant, created = Plant.objects.get_or_create(
+            common_name__iexact=common_name,
+            defaults=dict(
+                common_name=common_name,
+                scientific_name=_fit(details['scientific_name'], 'scientific_name'),
+                hindi_name=_fit(details.get('hindi_name'), 'hindi_name'),
+                plant_type=classify_plant_type(details.get('indoor_outdoor')),
+                toxicity=toxicity,
+                toxicity_details=_text(details.get('toxic')),
+                edibility=classify_edibility(details.get('edible')),
+                edibility_details=_text(details.get('edible')),
+                watering=_text(details.get('watering')),
+                sunlight=_text(details.get('sunlight')),
+                soil_type=_text(details.get('soil_type')),
+                family=_fit(details.get('family'), 'family'),
+                description=(_text(details.get('description'))
+                    if details.get('description') != 'Not available' else ''),
+                origin=_fit(details.get('origin'), 'origin'),
+                growth_rate=_fit(details.get('growth_rate'), 'growth_rate'),
+                warning=_text(details.get('warning')),
+                fun_facts=_text(details.get('fun_facts')),
+                image_url=_fit(details.get('image_url'), 'image_url') or None,
+                wikipedia_url=_fit(details.get('wikipedia_url'), 'wikipedia_url') or None,
+            ))
+        if not created:
+            return plant
+        Disease.objects.bulk_create([
+            Disease(
+                plant=plant,
+                name=_fit(disease.get('name'), 'name', Disease),
+                symptoms=_text(disease.get('symptom') or disease.get('symptoms')),
+                treatment=_text(disease.get('treatment')),
+            )
+            for disease in details.get('diseases') or []
+            if isinstance(disease, dict) and disease.get('name')
+        ])
+    return plant
@@ -1,11 +1,10 @@
-import requests
+import asyncio
+import base64
 import json
-import google.generativeai as genai
-from groq import Groq
 from deep_translator import GoogleTranslator
-from decouple import config
-from PIL import Image
-import io
+from api.http_client import aget_json, get_json
+from api.llm_clients import (
+    get_async_groq_client, get_gemini_model, get_groq_client)
 
 
 # ═══════════════════════════════════════════════════════════════════════
@@ -49,6 +48,16 @@ def format_plant_data(data):
     return data
 
 
+def parse_json_text(text):
+    """Strip markdown fences from an LLM reply and parse the JSON inside"""
+    text = text.strip()
+    if '```json' in text:
+        text = text.split('```json')[1].split('```')[0].strip()
+    elif '```' in text:
+        text = text.split('```')[1].split('```')[0].strip()
+    return json.loads(text)
+
+
 # ─── WIKIPEDIA API ────────────────────────────────────────────────────
 class WikipediaAPI:
     BASE_URL = 'https://en.wikipedia.org/api/rest_v1/page/summary/'
@@ -58,30 +67,49 @@ class WikipediaAPI:
         'neem': 'Neem', 'champa': 'Champa', 'mogra': 'Jasmine',
     }
     
+    @staticmethod
+    def _summary_url(plant_name):
+        english_name = WikipediaAPI.PLANT_NAME_MAP.get(
+            plant_name.lower(), plant_name)
+        formatted = english_name.replace(' ', '_')
+        return f'{WikipediaAPI.BASE_URL}{formatted}'
+    
+    @staticmethod
+    def _is_ambiguous(data):
+        description = data.get('extract', '')
+        return 'may refer to' in description or 'can refer to' in description
+    
+    @staticmethod
+    def _extract(data):
+        description = data.get('extract', '')
+        image_url = data.get('thumbnail', {}).get('source')
+        wiki_url = data.get('content_urls', {}).get('desktop', {}).get('page')
+        return description, image_url, wiki_url
+    
     @staticmethod
     def get_plant_info(plant_name):
         try:
-            english_name = WikipediaAPI.PLANT_NAME_MAP.get(
-                plant_name.lower(), plant_name)
-            formatted = english_name.replace(' ', '_')
-            url = f'{WikipediaAPI.BASE_URL}{formatted}'
-            headers = {'User-Agent': 'VanVidya/1.0'}
-            response = requests.get(url, headers=headers, timeout=10)
+            url = WikipediaAPI._summary_url(plant_name)
+            data = get_json(url, timeout=10)
+            
+            if data is not None:
+                if WikipediaAPI._is_ambiguous(data):
+                    data = get_json(f'{url}_plant', timeout=10) or data
+                return WikipediaAPI._extract(data)
+        except Exception as e:
+            print(f'Wikipedia error: {e}')
+        return None, None, None
+    
+    @staticmethod
+    async def aget_plant_info(plant_name):
+        try:
+            url = WikipediaAPI._summary_url(plant_name)
+            data = await aget_json(url, timeout=10)
             
-            if response.status_code == 200:
-                data = response.json()
-                description = data.get('extract', '')
-                
-                if 'may refer to' in description or 'can refer to' in description:
-                    url2 = f'{WikipediaAPI.BASE_URL}{formatted}_plant'
-                    response = requests.get(url2, headers=headers, timeout=10)
-                    if response.status_code == 200:
-                        data = response.json()
-                        description = data.get('extract', '')
-                
-                image_url = data.get('thumbnail', {}).get('source')
-                wiki_url = data.get('content_urls', {}).get('desktop', {}).get('page')
-                return description, image_url, wiki_url
+            if data is not None:
+                if WikipediaAPI._is_ambiguous(data):
+                    data = await aget_json(f'{url}_plant', timeout=10) or data
+                return WikipediaAPI._extract(data)
         except Exception as e:
             print(f'Wikipedia error: {e}')
         return None, None, None
@@ -89,13 +117,12 @@ class WikipediaAPI:
 
 # ─── GROQ API ─────────────────────────────────────────────────────────
 class GroqPlantAPI:
-    @staticmethod
-    def get_plant_data(plant_name):
-        try:
-            client = Groq(api_key=config('GROQ_API_KEY'))
-            
-            # UPDATED PROMPT - More descriptive
-            prompt = f'''Give plant details for "{plant_name}".
+    MODEL = 'llama-3.3-70b-versatile'
+    VISION_MODEL = 'meta-llama/llama-4-scout-17b-16e-instruct'
+    VISION_LABEL = 'Llama 4 Scout Vision (Groq)'
+    
+    # UPDATED PROMPT - More descriptive
+    PROMPT = '''Give plant details for "{plant_name}".
 Return ONLY JSON with:
 - scientific_name, family, hindi_name
 - watering (describe frequency), sunlight (describe needs)
@@ -105,42 +132,89 @@ Return ONLY JSON with:
 - warning, origin, growth_rate, fun_facts
 - diseases array with name, symptom, treatment
 Be descriptive for edible and toxic fields. Only JSON no markdown.'''
-            
+    
+    @staticmethod
+    def _request(plant_name):
+        return {
+            'messages': [{'role': 'user', 'content':
+                GroqPlantAPI.PROMPT.format(plant_name=plant_name)}],
+            'model': GroqPlantAPI.MODEL,
+            'temperature': 0.2,
+        }
+    
+    @staticmethod
+    def get_plant_data(plant_name):
+        try:
+            client = get_groq_client()
             response = client.chat.completions.create(
-                messages=[{'role': 'user', 'content': prompt}],
-                model='llama-3.3-70b-versatile',
-                temperature=0.2
-            )
-            
-            text = response.choices[0].message.content.strip()
-            
-            # Clean markdown
-            if '```json' in text:
-                text = text.split('```json')[1].split('```')[0].strip()
-            elif '```' in text:
-                text = text.split('```')[1].split('```')[0].strip()
+                **GroqPlantAPI._request(plant_name))
             
             # Parse JSON and format
-            result = json.loads(text)
-            result = format_plant_data(result)  # ← FORMAT DATA!
+            result = parse_json_text(response.choices[0].message.content)
+            return format_plant_data(result)  # ← FORMAT DATA!
             
-            return result
+        except Exception as e:
+            print(f'Groq error: {e}')
+            return None
+    
+    @staticmethod
+    async def aget_plant_data(plant_name):
+        try:
+            client = get_async_groq_client()
+            response = await client.chat.completions.create(
+                **GroqPlantAPI._request(plant_name))
+            
+            result = parse_json_text(response.choices[0].message.content)
+            return format_plant_data(result)
             
         except Exception as e:
             print(f'Groq error: {e}')
             return None
+    
+    @staticmethod
+    def _vision_request(prepared):
+        image_b64 = base64.b64encode(prepared.data).decode('ascii')
+        return {
+            'messages': [{'role': 'user', 'content': [
+                {'type': 'text', 'text': GeminiPlantAPI.VISION_PROMPT},
+                {'type': 'image_url', 'image_url': {
+                    'url': f'data:{prepared.mime_type};base64,{image_b64}'}},
+            ]}],
+            'model': GroqPlantAPI.VISION_MODEL,
+            'temperature': 0.2,
+        }
+    
+    @staticmethod
+    def identify_from_image(prepared):
+        try:
+            client = get_groq_client()
+            response = client.chat.completions.create(
+                **GroqPlantAPI._vision_request(prepared))
+            return parse_json_text(response.choices[0].message.content)
+            
+        except Exception as e:
+            print(f'Groq Vision error: {e}')
+            return None
+    
+    @staticmethod
+    async def aidentify_from_image(prepared):
+        try:
+            client = get_async_groq_client()
+            response = await client.chat.completions.create(
+                **GroqPlantAPI._vision_request(prepared))
+            return parse_json_text(response.choices[0].message.content)
+            
+        except Exception as e:
+            print(f'Groq Vision error: {e}')
+            return None
 
 
 # ─── GEMINI API ───────────────────────────────────────────────────────
 class GeminiPlantAPI:
-    @staticmethod
-    def get_plant_data(plant_name):
-        try:
-            genai.configure(api_key=config('GEMINI_API_KEY'))
-            model = genai.GenerativeModel('gemini-2.0-flash-exp')
-            
-            # UPDATED PROMPT - Better instructions
-            prompt = f'''Give detailed information about the plant "{plant_name}".
+    VISION_LABEL = 'Gemini 2.0 Flash Vision'
+    
+    # UPDATED PROMPT - Better instructions
+    PROMPT = '''Give detailed information about the plant "{plant_name}".
 Return ONLY JSON in this exact format:
 {{
     "scientific_name": "scientific name here",
@@ -172,35 +246,8 @@ IMPORTANT:
 - Be detailed and specific
 
 Return ONLY the JSON, no markdown.'''
-            
-            response = model.generate_content(prompt)
-            text = response.text.strip()
-            
-            # Clean markdown
-            if '```json' in text:
-                text = text.split('```json')[1].split('```')[0].strip()
-            elif '```' in text:
-                text = text.split('```')[1].split('```')[0].strip()
-            
-            # Parse JSON and format
-            result = json.loads(text)
-            result = format_plant_data(result)  # ← FORMAT DATA!
-            
-            return result
-            
-        except Exception as e:
-            print(f'Gemini error: {e}')
-            return None
     
-    @staticmethod
-    def identify_from_image(image_file):
-        try:
-            genai.configure(api_key=config('GEMINI_API_KEY'))
-            model = genai.GenerativeModel('gemini-2.0-flash-exp')
-            
-            pil_image = Image.open(io.BytesIO(image_file.read()))
-            
-            prompt = '''Analyze this leaf image.
+    VISION_PROMPT = '''Analyze this leaf image.
 Return ONLY JSON:
 {
     "plant_name": "common name",
@@ -215,16 +262,58 @@ Return ONLY JSON:
     }
 }
 If unknown set plant_name to 'Unknown'. If healthy set disease to null.'''
+    
+    @staticmethod
+    def get_plant_data(plant_name):
+        try:
+            model = get_gemini_model()
+            response = model.generate_content(
+                GeminiPlantAPI.PROMPT.format(plant_name=plant_name))
             
-            response = model.generate_content([prompt, pil_image])
-            text = response.text.strip()
+            # Parse JSON and format
+            result = parse_json_text(response.text)
+            return format_plant_data(result)  # ← FORMAT DATA!
             
-            if '```json' in text:
-                text = text.split('```json')[1].split('```')[0].strip()
-            elif '```' in text:
-                text = text.split('```')[1].split('```')[0].strip()
+        except Exception as e:
+            print(f'Gemini error: {e}')
+            return None
+    
+    @staticmethod
+    async def aget_plant_data(plant_name):
+        try:
+            model = get_gemini_model()
+            response = await model.generate_content_async(
+                GeminiPlantAPI.PROMPT.format(plant_name=plant_name))
             
-            return json.loads(text)
+            result = parse_json_text(response.text)
+            return format_plant_data(result)
+            
+        except Exception as e:
+            print(f'Gemini error: {e}')
+            return None
+    
+    @staticmethod
+    def identify_from_image(prepared):
+        """`prepared` is an api.image_processing.PreparedImage"""
+        try:
+            model = get_gemini_model()
+            image_part = {'mime_type': prepared.mime_type, 'data': prepared.data}
+            response = model.generate_content(
+                [GeminiPlantAPI.VISION_PROMPT, image_part])
+            return parse_json_text(response.text)
+            
+        except Exception as e:
+            print(f'Gemini Vision error: {e}')
+            return None
+    
+    @staticmethod
+    async def aidentify_from_image(prepared):
+        try:
+            model = get_gemini_model()
+            image_part = {'mime_type': prepared.mime_type, 'data': prepared.data}
+            response = await model.generate_content_async(
+                [GeminiPlantAPI.VISION_PROMPT, image_part])
+            return parse_json_text(response.text)
             
         except Exception as e:
             print(f'Gemini Vision error: {e}')
@@ -240,4 +329,18 @@ class GoogleTranslateAPI:
                 source='en', target='hi').translate(text)
             return translated
         except:
-            return text
\ No newline at end of file
+            return text
+    
+    @staticmethod
+    def translate_to_english(text):
+        try:
+            translated = GoogleTranslator(
+                source='auto', target='en').translate(text)
+            return translated
+        except:
+            return text
+    
+    @staticmethod
+    async def atranslate_to_hindi(text):
+        # deep_translator has no async client; keep it off the event loop
+        return await asyncio.to_thread(GoogleTranslateAPI.translate_to_hindi, text)
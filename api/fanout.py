@@ -0,0 +1,82 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from django.conf import settings
+
+
+_executors = {}
+_executor_lock = threading.Lock()
+
+
+def get_executor(name='external-api', max_workers=None):
+    """
+    Shared, bounded pool for outbound provider calls (created lazily).
+    Work that is itself submitted from a pool thread (e.g. hedged LLM
+    calls inside a fan-out) must use a different `name` so the pool
+    cannot deadlock waiting on itself. `max_workers` (default
+    EXTERNAL_API_MAX_WORKERS) applies when the pool is first created.
+    """
+    executor = _executors.get(name)
+    if executor is None:
+        with _executor_lock:
+            executor = _executors.get(name)
+            if executor is None:
+                executor = _executors[name] = ThreadPoolExecutor(
+                    max_workers=max_workers or settings.EXTERNAL_API_MAX_WORKERS,
+                    thread_name_prefix=name)
+    return executor
+
+
+def fan_out(calls, timeout=None):
+    """
+    Run independent calls concurrently and wait at most `timeout` seconds.
+
+    `calls` maps a section name to a zero-argument callable. Returns
+    (results, missing): results holds the value of every call that
+    finished in time, missing lists the names that did not (or raised).
+    Calls still running at the deadline are left to finish in the
+    background; their results are ignored.
+    """
+    if timeout is None:
+        timeout = settings.EXTERNAL_API_DEADLINE
+    executor = get_executor()
+    futures = {name: executor.submit(fn) for name, fn in calls.items()}
+    wait(futures.values(), timeout=timeout)
+
+    results, missing = {}, []
+    for name, future in futures.items():
+        if not future.done():
+            missing.append(name)
+            continue
+        try:
+            results[name] = future.result()
+        except Exception as e:
+            print(f'{name} error: {e}')
+            missing.append(name)
+    return results, missing
+
+
+async def afan_out(calls, timeout=None):
+    """
+    Async counterpart of fan_out(): `calls` maps names to zero-argument
+    coroutine functions. Unfinished calls are cancelled at the deadline.
+    """
+    if timeout is None:
+        timeout = settings.EXTERNAL_API_DEADLINE
+    tasks = {name: asyncio.ensure_future(fn()) for name, fn in calls.items()}
+    if tasks:
+        await asyncio.wait(tasks.values(), timeout=timeout)
+
+    results, missing = {}, []
+    for name, task in tasks.items():
+        if not task.done():
+            task.cancel()
+            missing.append(name)
+            continue
+        try:
+            results[name] = task.result()
+        except Exception as e:
+            print(f'{name} error: {e}')
+            missing.append(name)
+    return results, missing
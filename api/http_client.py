@@ -0,0 +1,163 @@
+import asyncio
+import os
+import threading
+import weakref
+from collections import OrderedDict
+
+import httpx
+import requests
+from decouple import config
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# SHARED HTTP SESSION
+# ═══════════════════════════════════════════════════════════════════════
+# One keep-alive, connection-pooled session per process. Kept free of
+# Django imports so build_offline_db.py can use it as well.
+USER_AGENT = 'VanVidya/1.0'
+POOL_SIZE = config('HTTP_POOL_SIZE', default=20, cast=int)
+MAX_RETRIES = config('HTTP_MAX_RETRIES', default=3, cast=int)
+RETRY_BACKOFF = config('HTTP_RETRY_BACKOFF', default=0.5, cast=float)
+ETAG_CACHE_SIZE = config('HTTP_ETAG_CACHE_SIZE', default=1000, cast=int)
+
+_session = None
+_session_pid = None
+_session_lock = threading.Lock()
+
+
+def _build_session():
+    retry = Retry(
+        total=MAX_RETRIES,
+        backoff_factor=RETRY_BACKOFF,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset(['GET', 'HEAD']),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=POOL_SIZE,
+        pool_maxsize=POOL_SIZE,
+        max_retries=retry,
+    )
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    session.headers['User-Agent'] = USER_AGENT
+    return session
+
+
+def get_session():
+    """Return this process's pooled session, rebuilding it after a fork"""
+    global _session, _session_pid
+    pid = os.getpid()
+    if _session is None or _session_pid != pid:
+        with _session_lock:
+            if _session is None or _session_pid != pid:
+                _session = _build_session()
+                _session_pid = pid
+    return _session
+
+
+class ETagCache:
+    """Small thread-safe LRU of url -> (etag, decoded json body)"""
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, url):
+        with self._lock:
+            item = self._items.get(url)
+            if item is not None:
+                self._items.move_to_end(url)
+            return item
+
+    def set(self, url, etag, data):
+        with self._lock:
+            self._items[url] = (etag, data)
+            self._items.move_to_end(url)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+
+etag_cache = ETagCache(ETAG_CACHE_SIZE)
+
+
+def get_json(url, timeout=10):
+    """
+    GET a JSON document through the shared session.
+
+    Sends If-None-Match when we already hold the document, so unchanged
+    resources come back as 304 and are answered from the local copy.
+    Returns the decoded body, or None for any non-200 outcome.
+    """
+    headers = {}
+    cached = etag_cache.get(url)
+    if cached:
+        headers['If-None-Match'] = cached[0]
+
+    response = get_session().get(url, headers=headers, timeout=timeout)
+    if response.status_code == 304 and cached:
+        return cached[1]
+    if response.status_code != 200:
+        return None
+
+    data = response.json()
+    etag = response.headers.get('ETag')
+    if etag:
+        etag_cache.set(url, etag, data)
+    return data
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# ASYNC CLIENT (ASGI views)
+# ═══════════════════════════════════════════════════════════════════════
+# httpx.AsyncClient is bound to the event loop that created it, so keep
+# one pooled client per running loop.
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+_async_clients = weakref.WeakKeyDictionary()
+
+
+def get_async_client():
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        client = httpx.AsyncClient(
+            headers={'User-Agent': USER_AGENT},
+            limits=httpx.Limits(
+                max_connections=POOL_SIZE,
+                max_keepalive_connections=POOL_SIZE),
+            transport=httpx.AsyncHTTPTransport(retries=MAX_RETRIES),
+        )
+        _async_clients[loop] = client
+    return client
+
+
+async def aget_json(url, timeout=10):
+    """Async counterpart of get_json(), sharing the same ETag cache"""
+    headers = {}
+    cached = etag_cache.get(url)
+    if cached:
+        headers['If-None-Match'] = cached[0]
+
+    client = get_async_client()
+    for attempt in range(MAX_RETRIES + 1):
+        response = await client.get(url, headers=headers, timeout=timeout)
+        if response.status_code not in RETRY_STATUSES or attempt == MAX_RETRIES:
+            break
+        await asyncio.sleep(RETRY_BACKOFF * (2 ** attempt))
+
+    if response.status_code == 304 and cached:
+        return cached[1]
+    if response.status_code != 200:
+        return None
+
+    data = response.json()
+    etag = response.headers.get('ETag')
+    if etag:
+        etag_cache.set(url, etag, data)
+    return data
@@ -0,0 +1,80 @@
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from PIL import Image
+
+
+def dhash(image, hash_size=8):
+    """
+    64-bit difference hash of a PIL image: shrink to (hash_size+1) x
+    hash_size grayscale and record whether each pixel is brighter than
+    its right-hand neighbour. Near-identical photos differ in few bits.
+    """
+    image.draft('L', (hash_size * 8, hash_size * 8))  # cheap JPEG downscale
+    pixels = list(image.convert('L').resize(
+        (hash_size + 1, hash_size), Image.LANCZOS).getdata())
+    value = 0
+    for row in range(hash_size):
+        for col in range(hash_size):
+            left = pixels[row * (hash_size + 1) + col]
+            right = pixels[row * (hash_size + 1) + col + 1]
+            value = (value << 1) | (left > right)
+    return value
+
+
+def hamming_distance(a, b):
+    return bin(a ^ b).count('1')
+
+
+class ImageHashIndex:
+    """
+    Bounded, thread-safe LRU of image hash -> identification result.
+    lookup() returns the closest stored result within `max_distance`
+    bits. A linear scan is fine for a few thousand 64-bit hashes.
+    """
+
+    def __init__(self, max_size, max_distance):
+        self.max_size = max_size
+        self.max_distance = max_distance
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def lookup(self, image_hash):
+        with self._lock:
+            best_hash, best_distance = None, self.max_distance + 1
+            for stored_hash in self._items:
+                distance = hamming_distance(image_hash, stored_hash)
+                if distance < best_distance:
+                    best_hash, best_distance = stored_hash, distance
+                    if distance == 0:
+                        break
+            if best_hash is None:
+                return None
+            self._items.move_to_end(best_hash)
+            return self._items[best_hash]
+
+    def add(self, image_hash, result):
+        with self._lock:
+            self._items[image_hash] = result
+            self._items.move_to_end(image_hash)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+    def __len__(self):
+        return len(self._items)
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_identification_index():
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = ImageHashIndex(
+                    settings.IDENTIFY_HASH_CACHE_SIZE,
+                    settings.IDENTIFY_HASH_MAX_DISTANCE)
+    return _index
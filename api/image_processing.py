@@ -0,0 +1,118 @@
+import io
+import time
+from collections import namedtuple
+
+from django.conf import settings
+from PIL import Image, ImageOps
+
+
+PreparedImage = namedtuple('PreparedImage', [
+    'image', 'data', 'mime_type', 'original_bytes', 'encoded_bytes',
+    'elapsed_ms'])
+
+MIME_TYPES = {'JPEG': 'image/jpeg', 'WEBP': 'image/webp'}
+EXTENSIONS = {'JPEG': 'jpg', 'WEBP': 'webp'}
+
+
+def output_format(fmt):
+    """
+    (format, MIME type) to encode as: `fmt` when PIL can write it,
+    otherwise JPEG, so a mistyped IDENTIFY_IMAGE_FORMAT cannot fail
+    every upload
+    """
+    fmt = fmt.upper()
+    if fmt in MIME_TYPES:
+        return fmt, MIME_TYPES[fmt]
+    Image.init()  # registers every plugin's writer and MIME type
+    if fmt in Image.SAVE and fmt in Image.MIME:
+        return fmt, Image.MIME[fmt]
+    print(f'Unsupported image format {fmt!r}, using JPEG')
+    return 'JPEG', MIME_TYPES['JPEG']
+
+
+def center_crop(image, fraction):
+    """Keep the central `fraction` of each side"""
+    if fraction >= 1:
+        return image
+    width, height = image.size
+    new_width, new_height = int(width * fraction), int(height * fraction)
+    left = (width - new_width) // 2
+    top = (height - new_height) // 2
+    return image.crop((left, top, left + new_width, top + new_height))
+
+
+def preprocess_image(upload, max_edge, crop=1.0, fmt='JPEG', quality=85):
+    """
+    Turn an uploaded photo into a compact image for the vision model.
+
+    PIL reads straight from the upload's file handle (Django spools large
+    uploads to disk), and JPEGs are decoded at a reduced DCT scale via
+    draft(), so a 12 MB phone photo is never fully held in memory. The
+    image is then EXIF-rotated, center-cropped, downsampled so its longest
+    edge is at most `max_edge` and re-encoded as `fmt`.
+    """
+    start = time.perf_counter()
+    upload.seek(0)
+    original_bytes = getattr(upload, 'size', None)
+
+    image = Image.open(upload)
+    image.draft('RGB', (int(max_edge / crop), int(max_edge / crop)))
+    image = ImageOps.exif_transpose(image)
+    image = center_crop(image, crop).convert('RGB')
+    image.thumbnail((max_edge, max_edge), Image.LANCZOS)
+
+    fmt, mime_type = output_format(fmt)
+    buffer = io.BytesIO()
+    image.save(buffer, fmt, quality=quality)
+    data = buffer.getvalue()
+
+    if original_bytes is None:
+        original_bytes = upload.tell()
+    return PreparedImage(
+        image=image,
+        data=data,
+        mime_type=mime_type,
+        original_bytes=original_bytes,
+        encoded_bytes=len(data),
+        elapsed_ms=round((time.perf_counter() - start) * 1000, 1),
+    )
+
+
+def preprocess_leaf_upload(upload):
+    """preprocess_image() with the IDENTIFY_IMAGE_* settings"""
+    return preprocess_image(
+        upload,
+        max_edge=settings.IDENTIFY_IMAGE_MAX_EDGE,
+        crop=settings.IDENTIFY_IMAGE_CROP,
+        fmt=settings.IDENTIFY_IMAGE_FORMAT,
+        quality=settings.IDENTIFY_IMAGE_QUALITY,
+    )
+
+
+def render_variants(source, sizes, formats, quality=80):
+    """
+    Downscaled copies of a stored photo: {(size_name, fmt): bytes} for
+    every `sizes` entry ({name: max_edge}) in every format.
+
+    The photo is decoded once, at the reduced DCT scale draft() allows
+    for the largest size; each smaller size is then resampled from the
+    previous one rather than from the full-size original.
+    """
+    image = Image.open(source)
+    largest = max(sizes.values())
+    image.draft('RGB', (largest, largest))
+    image = ImageOps.exif_transpose(image).convert('RGB')
+
+    rendered = {}
+    for name, max_edge in sorted(sizes.items(), key=lambda item: -item[1]):
+        image = image.copy()
+        image.thumbnail((max_edge, max_edge), Image.LANCZOS)
+        for fmt in formats:
+            buffer = io.BytesIO()
+            if fmt == 'JPEG':
+                image.save(buffer, fmt, quality=quality, optimize=True,
+                    progressive=True)
+            else:
+                image.save(buffer, fmt, quality=quality)
+            rendered[name, fmt] = buffer.getvalue()
+    return rendered
@@ -0,0 +1,125 @@
+"""
+Resized copies of Logbook photos for list and detail screens.
+
+Saving an entry with a new image schedules generate_variants() on a
+background pool once the transaction commits, so the upload request
+never waits on decoding or encoding. Each LOGBOOK_IMAGE_SIZES size is
+stored in each LOGBOOK_IMAGE_FORMATS format under
+logbook_images/variants/, named after the source blob's digest, and
+recorded in Logbook.image_variants ('thumb_jpeg', 'thumb_webp',
+'medium_jpeg', ...) together with the 'source' image. Entries sharing a
+photo share its variants, which are deleted with the blob
+(api.storage.collect_garbage).
+"""
+import os
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connections, transaction
+from django.utils import timezone
+
+from .fanout import get_executor
+from .image_processing import EXTENSIONS, render_variants
+from .models import Logbook
+
+VARIANT_DIR = 'logbook_images/variants'
+
+
+def variant_key(size, fmt):
+    return f'{size}_{fmt.lower()}'
+
+
+def variant_name(source_name, size, fmt):
+    stem = os.path.splitext(os.path.basename(source_name))[0]
+    return f'{VARIANT_DIR}/{stem}_{size}.{EXTENSIONS[fmt]}'
+
+
+def variant_names(source_name):
+    return {variant_key(size, fmt): variant_name(source_name, size, fmt)
+            for size in settings.LOGBOOK_IMAGE_SIZES
+            for fmt in settings.LOGBOOK_IMAGE_FORMATS}
+
+
+def delete_variants(source_name):
+    for name in variant_names(source_name).values():
+        default_storage.delete(name)
+
+
+def needs_variants(entry):
+    return bool(entry.image) and entry.image_variants.get('source') != entry.image.name
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# GENERATION
+# ═══════════════════════════════════════════════════════════════════════
+def generate_variants(entry_id, force=False):
+    """
+    Render and store the variants of one entry's image. Returns the new
+    image_variants, or None when there was nothing to do (no image,
+    already done, or the image was replaced while rendering).
+    """
+    entry = Logbook.objects.filter(pk=entry_id).only(
+        'image', 'image_variants').first()
+    if entry is None or not entry.image or not (force or needs_variants(entry)):
+        return None
+
+    source = entry.image.name
+    names = variant_names(source)
+    # Another entry with the same photo may have rendered them already
+    if force or not all(default_storage.exists(name) for name in names.values()):
+        with entry.image.open('rb') as f:
+            rendered = render_variants(f, settings.LOGBOOK_IMAGE_SIZES,
+                settings.LOGBOOK_IMAGE_FORMATS, settings.LOGBOOK_IMAGE_QUALITY)
+        for (size, fmt), data in rendered.items():
+            key = variant_key(size, fmt)
+            default_storage.delete(names[key])
+            names[key] = default_storage.save(names[key], ContentFile(data))
+    variants = {'source': source, **names}
+
+    # Only if the entry still has this image; bumping updated_at lets
+    # synced clients pick up the new URLs
+    updated = Logbook.objects.filter(pk=entry_id, image=source).update(
+        image_variants=variants, updated_at=timezone.now())
+    return variants if updated else None
+
+
+def _generate_logged(entry_id, force=False):
+    try:
+        return generate_variants(entry_id, force)
+    except Exception as e:
+        print(f'Logbook image variants error (entry {entry_id}): {e}')
+
+
+def _generate_in_pool(entry_id):
+    try:
+        _generate_logged(entry_id)
+    finally:
+        connections.close_all()  # this pool thread's own DB connection
+
+
+def schedule_variants(entry_id):
+    """Generate the entry's variants in the background after commit"""
+    def submit():
+        if settings.LOGBOOK_IMAGE_WORKERS > 0:
+            get_executor('image-variants', settings.LOGBOOK_IMAGE_WORKERS).submit(
+                _generate_in_pool, entry_id)
+        else:
+            _generate_logged(entry_id)
+    transaction.on_commit(submit)
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# URLS
+# ═══════════════════════════════════════════════════════════════════════
+def variant_urls(entry, request=None):
+    """{variant key: URL}; empty until the variants of the current image exist"""
+    if not entry.image or needs_variants(entry):
+        return {}
+    urls = {}
+    for key, name in entry.image_variants.items():
+        if key == 'source':
+            continue
+        url = default_storage.url(name)
+        urls[key] = request.build_absolute_uri(url) if request else url
+    return urls
@@ -0,0 +1,90 @@
+import asyncio
+import os
+import threading
+import weakref
+
+import google.generativeai as genai
+import httpx
+from decouple import config
+from groq import AsyncGroq, Groq
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# SHARED LLM CLIENTS
+# ═══════════════════════════════════════════════════════════════════════
+# Provider clients are created lazily, once per process, and reused by
+# every request. The registry remembers the pid that built it, so a
+# gunicorn worker forked from a parent that already touched a client
+# starts with fresh clients (and fresh sockets / gRPC channels).
+GEMINI_MODEL = 'gemini-2.0-flash-exp'
+LLM_POOL_SIZE = config('LLM_POOL_SIZE', default=20, cast=int)
+
+_clients = {}
+_clients_pid = None
+_clients_lock = threading.Lock()
+
+
+def _get_client(name, factory):
+    global _clients_pid
+    pid = os.getpid()
+    client = _clients.get(name) if _clients_pid == pid else None
+    if client is not None:
+        return client
+    with _clients_lock:
+        if _clients_pid != pid:
+            _clients.clear()
+            _clients_pid = pid
+        if name not in _clients:
+            _clients[name] = factory()
+        return _clients[name]
+
+
+def reset_clients():
+    """Drop every client; called from gunicorn's post_fork hook"""
+    with _clients_lock:
+        _clients.clear()
+
+
+def _build_groq_client():
+    http_client = httpx.Client(
+        limits=httpx.Limits(
+            max_connections=LLM_POOL_SIZE,
+            max_keepalive_connections=LLM_POOL_SIZE),
+        timeout=httpx.Timeout(60.0, connect=5.0),
+    )
+    return Groq(api_key=config('GROQ_API_KEY'), http_client=http_client)
+
+
+def _configure_gemini():
+    genai.configure(api_key=config('GEMINI_API_KEY'))
+    return True
+
+
+def get_groq_client():
+    return _get_client('groq', _build_groq_client)
+
+
+def get_gemini_model(model_name=GEMINI_MODEL):
+    _get_client('gemini', _configure_gemini)
+    return _get_client(
+        f'gemini:{model_name}', lambda: genai.GenerativeModel(model_name))
+
+
+# Async clients hold an httpx.AsyncClient, which belongs to one event loop
+_async_clients = weakref.WeakKeyDictionary()
+
+
+def get_async_groq_client():
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        http_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=LLM_POOL_SIZE,
+                max_keepalive_connections=LLM_POOL_SIZE),
+            timeout=httpx.Timeout(60.0, connect=5.0),
+        )
+        client = AsyncGroq(
+            api_key=config('GROQ_API_KEY'), http_client=http_client)
+        _async_clients[loop] = client
+    return client
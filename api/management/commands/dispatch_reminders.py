@@ -0,0 +1,51 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from api.notifiers import get_notifier
+from api.reminders import dispatch_batch
+
+
+class Command(BaseCommand):
+    help = ('Send due reminders and schedule their next occurrence. '
+            'Safe to run several copies in parallel.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=settings.REMINDER_BATCH_SIZE,
+            help='Reminders claimed per transaction')
+        parser.add_argument(
+            '--loop', action='store_true',
+            help='Keep running, polling every --interval seconds when idle')
+        parser.add_argument(
+            '--interval', type=float, default=settings.REMINDER_POLL_INTERVAL,
+            help='Seconds to sleep when nothing is due (with --loop)')
+        parser.add_argument(
+            '--max-batches', type=int, default=None,
+            help='Stop after this many batches')
+
+    def handle(self, *args, **options):
+        notifier = get_notifier()
+        batches = claimed_total = delivered_total = 0
+        start = time.monotonic()
+        try:
+            while options['max_batches'] is None or batches < options['max_batches']:
+                claimed, delivered = dispatch_batch(
+                    notifier, batch_size=options['batch_size'])
+                if claimed:
+                    batches += 1
+                    claimed_total += claimed
+                    delivered_total += delivered
+                    continue
+                if not options['loop']:
+                    break
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
+
+        elapsed = time.monotonic() - start
+        rate = claimed_total / elapsed * 3600 if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f'{claimed_total} reminders claimed, {delivered_total} delivered '
+            f'in {batches} batches ({elapsed:.1f} s, {rate:,.0f}/hour)'))
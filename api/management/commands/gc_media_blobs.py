@@ -0,0 +1,100 @@
+import os
+import re
+import time
+from collections import Counter
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from api import storage
+from api.image_variants import delete_variants
+from api.models import Logbook, MediaBlob
+
+BLOB_DIR = re.compile(r'^[0-9a-f]{2}$')
+
+
+class Command(BaseCommand):
+    help = ('Garbage collect unreferenced Logbook image blobs. Optionally '
+            'move images stored before deduplication into the blob store '
+            'first, and repair reference counts.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--adopt', action='store_true',
+            help='Move images uploaded before deduplication into the blob store')
+        parser.add_argument(
+            '--recount', action='store_true',
+            help='Recompute reference counts from the Logbook table '
+                 '(run while uploads are paused)')
+        parser.add_argument(
+            '--orphan-age', type=float, default=24,
+            help='Hours after which blob files without a MediaBlob row '
+                 '(and abandoned .part uploads) are deleted')
+
+    def handle(self, *args, **options):
+        if options['adopt']:
+            self.adopt()
+        if options['recount']:
+            self.recount()
+        collected = storage.collect_garbage()
+        orphans = self.delete_orphans(options['orphan_age'] * 3600)
+        self.stdout.write(self.style.SUCCESS(
+            f'{collected} unreferenced blobs and {orphans} orphaned files deleted'))
+
+    def adopt(self):
+        field = Logbook._meta.get_field('image')
+        blobs = set(MediaBlob.objects.values_list('name', flat=True))
+        entries = Logbook.objects.exclude(image='').exclude(image__isnull=True)
+        adopted = 0
+        for pk, name in entries.values_list('pk', 'image').iterator():
+            if name in blobs or not storage.logbook_storage.exists(name):
+                continue
+            with transaction.atomic():
+                with storage.logbook_storage.open(name, 'rb') as f:
+                    blob_name = storage.logbook_storage.save(
+                        field.generate_filename(None, os.path.basename(name)), f)
+                # Bumping updated_at makes synced clients drop the old URLs
+                if Logbook.objects.filter(pk=pk, image=name).update(
+                        image=blob_name, image_variants={}, updated_at=timezone.now()):
+                    transaction.on_commit(lambda name=name: (
+                        storage.logbook_storage.delete(name), delete_variants(name)))
+                    adopted += 1
+                else:
+                    storage.release(blob_name)  # the entry changed meanwhile
+            blobs.add(blob_name)
+        self.stdout.write(f'{adopted} images moved into the blob store; run '
+                          f'generate_logbook_variants to rebuild their variants')
+
+    def recount(self):
+        counts = Counter(Logbook.objects.exclude(image='').exclude(
+            image__isnull=True).values_list('image', flat=True).iterator())
+        fixed = 0
+        for blob in MediaBlob.objects.iterator():
+            if blob.ref_count != counts.get(blob.name, 0):
+                MediaBlob.objects.filter(pk=blob.pk).update(
+                    ref_count=counts.get(blob.name, 0))
+                fixed += 1
+        self.stdout.write(f'{fixed} reference counts corrected')
+
+    def delete_orphans(self, min_age):
+        upload_to = Logbook._meta.get_field('image').upload_to.strip('/')
+        root = storage.logbook_storage.path(upload_to)
+        if not os.path.isdir(root):
+            return 0
+        known = set(MediaBlob.objects.values_list('name', flat=True))
+        cutoff = time.time() - min_age
+        deleted = 0
+        for entry in os.scandir(root):
+            if entry.is_file() and entry.name.endswith('.part'):
+                paths = [(entry.path, None)]
+            elif entry.is_dir() and BLOB_DIR.match(entry.name):
+                paths = [(f.path, f'{upload_to}/{entry.name}/{f.name}')
+                         for f in os.scandir(entry.path) if f.is_file()]
+            else:
+                continue
+            for path, name in paths:
+                if name not in known and os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+                    deleted += 1
+        return deleted
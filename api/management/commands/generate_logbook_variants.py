@@ -0,0 +1,63 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from api.image_variants import generate_variants, needs_variants
+from api.models import Logbook
+
+
+def _generate(entry_id, force):
+    try:
+        return generate_variants(entry_id, force)
+    finally:
+        connections.close_all()  # this pool thread's own DB connection
+
+
+class Command(BaseCommand):
+    help = ('Generate the resized variants of Logbook images that do not '
+            'have them yet (images uploaded before variants existed, or '
+            'whose background job failed).')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force', action='store_true',
+            help='Regenerate every image, e.g. after changing LOGBOOK_IMAGE_SIZES')
+        parser.add_argument(
+            '--workers', type=int, default=max(1, settings.LOGBOOK_IMAGE_WORKERS),
+            help='Images rendered in parallel (1: one at a time, in this thread)')
+
+    def handle(self, *args, **options):
+        force = options['force']
+        entries = Logbook.objects.exclude(image='').exclude(image__isnull=True)
+        todo = [entry.pk for entry in entries.only('image', 'image_variants').iterator()
+                if force or needs_variants(entry)]
+        self.stdout.write(f'{len(todo)} images to process')
+
+        done = failed = 0
+        start = time.monotonic()
+        if options['workers'] <= 1:
+            results = ((pk, lambda pk=pk: generate_variants(pk, force)) for pk in todo)
+            executor = None
+        else:
+            executor = ThreadPoolExecutor(max_workers=options['workers'],
+                thread_name_prefix='image-variants')
+            futures = {executor.submit(_generate, pk, force): pk for pk in todo}
+            results = ((futures[f], f.result) for f in as_completed(futures))
+        try:
+            for pk, result in results:
+                try:
+                    result()
+                    done += 1
+                except Exception as e:
+                    failed += 1
+                    self.stderr.write(f'Entry {pk}: {e}')
+        finally:
+            if executor is not None:
+                executor.shutdown(cancel_futures=True)
+
+        elapsed = time.monotonic() - start
+        self.stdout.write(self.style.SUCCESS(
+            f'{done} images processed, {failed} failed in {elapsed:.1f} s'))
@@ -0,0 +1,18 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from api.sync import prune_tombstones
+
+
+class Command(BaseCommand):
+    help = ('Delete sync tombstones older than SYNC_TOMBSTONE_DAYS. Clients '
+            'whose cursor is older than that are told to sync from scratch.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=settings.SYNC_TOMBSTONE_DAYS,
+            help='Keep tombstones this many days')
+
+    def handle(self, *args, **options):
+        count = prune_tombstones(options['days'])
+        self.stdout.write(self.style.SUCCESS(f'{count} tombstones pruned'))
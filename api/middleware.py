@@ -0,0 +1,58 @@
+import re
+
+from django.conf import settings
+from django.middleware.gzip import GZipMiddleware
+from django.utils.cache import patch_vary_headers
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+re_accepts_brotli = re.compile(r'\bbr\b')
+
+# Already compressed: another pass only costs CPU
+COMPRESSED_TYPES = re.compile(
+    r'^(image/|video/|audio/|application/(gzip|zip|x-gzip|octet-stream))')
+# Brotli output has no room for GZipMiddleware's random padding against
+# BREACH, so it is only used for API JSON, never for pages with CSRF tokens
+BROTLI_TYPES = re.compile(r'^application/json\b')
+
+
+class CompressionMiddleware(GZipMiddleware):
+    """
+    GZipMiddleware that prefers brotli for JSON when the client accepts
+    it and the `brotli` package is installed (smaller than gzip on the
+    repetitive plant JSON), and leaves already compressed downloads and
+    sync streams alone.
+    """
+
+    def process_response(self, request, response):
+        content_type = response.get('Content-Type', '')
+        if COMPRESSED_TYPES.match(content_type):
+            return response
+        if response.streaming and not response.is_async:
+            # gzip would hold a sync stream's output back until it ends
+            # (NDJSON batch lookups); async streams are compressed per chunk
+            return response
+        if (brotli is None or response.streaming
+                or not BROTLI_TYPES.match(content_type)
+                or response.has_header('Content-Encoding')
+                or len(response.content) < 200):
+            return super().process_response(request, response)
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        if not re_accepts_brotli.search(request.META.get('HTTP_ACCEPT_ENCODING', '')):
+            return super().process_response(request, response)
+
+        compressed = brotli.compress(
+            response.content, quality=settings.BROTLI_QUALITY)
+        if len(compressed) >= len(response.content):
+            return response
+        response.content = compressed
+        response.headers['Content-Length'] = str(len(compressed))
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag  # as GZipMiddleware does
+        response.headers['Content-Encoding'] = 'br'
+        return response
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-17 20:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_plantinfocache'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='plantinfocache',
+            name='fetch_lease_until',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 4.2.7 on 2026-10-17 20:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_plantinfocache_fetch_lease'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='plant',
+            name='description',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddField(
+            model_name='plant',
+            name='family',
+            field=models.CharField(blank=True, max_length=200),
+        ),
+        migrations.AddField(
+            model_name='plant',
+            name='growth_rate',
+            field=models.CharField(blank=True, max_length=200),
+        ),
+        migrations.AddField(
+            model_name='plant',
+            name='origin',
+            field=models.CharField(blank=True, max_length=200),
+        ),
+        migrations.AddField(
+            model_name='plant',
+            name='warning',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddField(
+            model_name='plant',
+            name='wikipedia_url',
+            field=models.URLField(blank=True, max_length=500, null=True),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 4.2.7 on 2026-10-17 20:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_plant_external_fields'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PlantNameTranslation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('english', models.CharField(max_length=200)),
+                ('english_key', models.CharField(max_length=200, unique=True)),
+                ('hindi', models.CharField(db_index=True, max_length=200)),
+                ('romanized', models.CharField(blank=True, db_index=True, max_length=200)),
+                ('source', models.CharField(choices=[('seed', 'Seed'), ('catalogue', 'Plant Catalogue'), ('translator', 'Google Translate'), ('manual', 'Manual')], default='translator', max_length=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Plant Name Translation',
+                'verbose_name_plural': 'Plant Name Translations',
+                'ordering': ['english'],
+            },
+        ),
+    ]
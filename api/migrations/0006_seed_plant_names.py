@@ -0,0 +1,53 @@
+from django.db import migrations
+
+
+SEED_NAMES = [
+    ('Marigold', 'गेंदा', 'genda'),
+    ('Rose', 'गुलाब', 'gulab'),
+    ('Tulsi', 'तुलसी', 'tulsi'),
+    ('Neem', 'नीम', 'neem'),
+    ('Champa', 'चंपा', 'champa'),
+    ('Jasmine', 'मोगरा', 'mogra'),
+]
+
+
+def _key(name):
+    return ' '.join(name.lower().split())
+
+
+def seed_plant_names(apps, schema_editor):
+    """Seed from the built-in names, the Plant catalogue and past translations"""
+    Plant = apps.get_model('api', 'Plant')
+    PlantInfoCache = apps.get_model('api', 'PlantInfoCache')
+    PlantNameTranslation = apps.get_model('api', 'PlantNameTranslation')
+
+    pairs = {}
+    for english, hindi, romanized in SEED_NAMES:
+        pairs[_key(english)] = (english, hindi, romanized, 'seed')
+    for english, hindi in Plant.objects.exclude(hindi_name='').values_list(
+            'common_name', 'hindi_name'):
+        if _key(english) != _key(hindi):
+            pairs.setdefault(_key(english), (english, hindi, '', 'catalogue'))
+    for key, sections in PlantInfoCache.objects.values_list('key', 'sections'):
+        hindi = (sections.get('hindi_name') or {}).get('value')
+        if isinstance(hindi, str) and hindi.strip() and key != _key(hindi):
+            pairs.setdefault(key, (key.title(), hindi.strip(), '', 'translator'))
+
+    existing = set(PlantNameTranslation.objects.values_list('english_key', flat=True))
+    PlantNameTranslation.objects.bulk_create([
+        PlantNameTranslation(english=english[:200], english_key=key[:200],
+            hindi=hindi[:200], romanized=romanized, source=source)
+        for key, (english, hindi, romanized, source) in pairs.items()
+        if key not in existing
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_plantnametranslation'),
+    ]
+
+    operations = [
+        migrations.RunPython(seed_plant_names, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,84 @@
+from django.db import migrations
+
+
+# Same expressions as api.search.PLANT_DOCUMENT / DISEASE_DOCUMENT
+PLANT_DOCUMENT = (
+    "setweight(to_tsvector('simple'::regconfig, coalesce(common_name, '') || ' ' || "
+    "coalesce(scientific_name, '') || ' ' || coalesce(hindi_name, '')), 'A') || "
+    "setweight(to_tsvector('simple'::regconfig, coalesce(family, '') || ' ' || "
+    "coalesce(watering, '') || ' ' || coalesce(sunlight, '') || ' ' || "
+    "coalesce(soil_type, '') || ' ' || coalesce(care_tips, '')), 'B')"
+)
+DISEASE_DOCUMENT = (
+    "setweight(to_tsvector('simple'::regconfig, coalesce(name, '')), 'A') || "
+    "setweight(to_tsvector('simple'::regconfig, coalesce(symptoms, '') || ' ' || "
+    "coalesce(treatment, '') || ' ' || coalesce(prevention, '')), 'B')"
+)
+
+PLANT_COLUMNS = ['common_name', 'scientific_name', 'hindi_name', 'family',
+                 'watering', 'sunlight', 'soil_type', 'care_tips']
+DISEASE_COLUMNS = ['name', 'symptoms', 'treatment', 'prevention']
+
+# Keep Devanagari vowel signs (category M) inside tokens
+FTS5_TOKENIZER = "unicode61 remove_diacritics 2 categories 'L* N* Co M*'"
+
+
+def _fts5_statements(table, columns):
+    fts = f'{table}_fts'
+    cols = ', '.join(columns)
+    new = ', '.join(f'new.{c}' for c in columns)
+    old = ', '.join(f'old.{c}' for c in columns)
+    delete = (f"INSERT INTO {fts}({fts}, rowid, {cols}) "
+              f"VALUES ('delete', old.id, {old});")
+    insert = f'INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new});'
+    return [
+        f'CREATE VIRTUAL TABLE {fts} USING fts5({cols}, '
+        f'content="{table}", content_rowid="id", tokenize="{FTS5_TOKENIZER}")',
+        f'CREATE TRIGGER {fts}_ai AFTER INSERT ON {table} BEGIN {insert} END',
+        f'CREATE TRIGGER {fts}_ad AFTER DELETE ON {table} BEGIN {delete} END',
+        f'CREATE TRIGGER {fts}_au AFTER UPDATE ON {table} BEGIN {delete} {insert} END',
+        f"INSERT INTO {fts}({fts}) VALUES ('rebuild')",
+    ]
+
+
+def create_search_indexes(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        statements = [
+            f'CREATE INDEX api_plant_search_idx ON api_plant USING GIN (({PLANT_DOCUMENT}))',
+            f'CREATE INDEX api_disease_search_idx ON api_disease USING GIN (({DISEASE_DOCUMENT}))',
+        ]
+    elif vendor == 'sqlite':
+        with schema_editor.connection.cursor() as cursor:
+            cursor.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+            if not cursor.fetchone()[0]:
+                return  # api.search falls back to icontains scans
+        statements = (_fts5_statements('api_plant', PLANT_COLUMNS) +
+                      _fts5_statements('api_disease', DISEASE_COLUMNS))
+    else:
+        return
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+def drop_search_indexes(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS api_plant_search_idx')
+        schema_editor.execute('DROP INDEX IF EXISTS api_disease_search_idx')
+    elif vendor == 'sqlite':
+        for table in ('api_plant', 'api_disease'):
+            for suffix in ('ai', 'ad', 'au'):
+                schema_editor.execute(f'DROP TRIGGER IF EXISTS {table}_fts_{suffix}')
+            schema_editor.execute(f'DROP TABLE IF EXISTS {table}_fts')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_seed_plant_names'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
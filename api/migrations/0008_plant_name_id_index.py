@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-17 20:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_search_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='plant',
+            index=models.Index(fields=['common_name', 'id'], name='plant_name_id_idx'),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 4.2.7 on 2026-10-17 20:38
+
+from django.db import migrations, models
+import django.db.models.functions.text
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_plant_name_id_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='disease',
+            index=models.Index(fields=['updated_at', 'id'], name='disease_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='logbook',
+            index=models.Index(fields=['user', '-date'], name='logbook_user_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='plant',
+            index=models.Index(django.db.models.functions.text.Lower('common_name'), name='plant_common_lower_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='plant',
+            index=models.Index(django.db.models.functions.text.Lower('scientific_name'), name='plant_scientific_lower_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='plant',
+            index=models.Index(django.db.models.functions.text.Lower('hindi_name'), name='plant_hindi_lower_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='plant',
+            index=models.Index(fields=['updated_at', 'id'], name='plant_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reminder',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['next_reminder_date'], name='reminder_due_idx'),
+        ),
+    ]
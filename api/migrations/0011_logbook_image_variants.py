@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-17 20:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_sync_tombstones'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='logbook',
+            name='image_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
@@ -0,0 +1,72 @@
+# Generated by Django 4.2.7 on 2026-10-17 21:03
+
+import importlib
+
+from django.db import migrations, models
+import django.db.models.functions.text
+
+search_indexes = importlib.import_module('api.migrations.0007_search_indexes')
+
+
+def rename_duplicate_names(apps, schema_editor):
+    """Keep the oldest row's name; later duplicates get ' (<id>)' appended"""
+    Plant = apps.get_model('api', 'Plant')
+    seen = set()
+    for plant in Plant.objects.order_by('id').only('id', 'common_name'):
+        key = plant.common_name.lower()
+        if key in seen:
+            plant.common_name = f'{plant.common_name[:190]} ({plant.id})'
+            plant.save(update_fields=['common_name'])
+        seen.add(key)
+
+
+def restore_plant_fts_triggers(apps, schema_editor):
+    """
+    SQLite applies the changes below by rebuilding api_plant, which drops
+    the FTS5 triggers of 0007_search_indexes; put them back and reindex
+    """
+    connection = schema_editor.connection
+    if connection.vendor != 'sqlite' or \
+            'api_plant_fts' not in connection.introspection.table_names():
+        return
+    for suffix in ('ai', 'ad', 'au'):
+        schema_editor.execute(f'DROP TRIGGER IF EXISTS api_plant_fts_{suffix}')
+    statements = search_indexes._fts5_statements('api_plant', search_indexes.PLANT_COLUMNS)
+    for statement in statements[1:]:  # the FTS table itself survives
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0012_media_blobs'),
+    ]
+
+    operations = [
+        migrations.RunPython(migrations.RunPython.noop, restore_plant_fts_triggers),
+        migrations.RemoveIndex(
+            model_name='plant',
+            name='plant_common_lower_idx',
+        ),
+        migrations.AddField(
+            model_name='plant',
+            name='edibility_details',
+            field=models.TextField(blank=True, help_text='Which parts are edible, served instead of the generic text'),
+        ),
+        migrations.AddField(
+            model_name='plant',
+            name='toxicity_details',
+            field=models.TextField(blank=True, help_text='Descriptive toxicity text, served instead of the generic one'),
+        ),
+        migrations.AlterField(
+            model_name='plant',
+            name='size',
+            field=models.CharField(blank=True, choices=[('small', 'Small'), ('medium', 'Medium'), ('large', 'Large')], help_text='Blank when unknown (plants written back from external data)', max_length=50),
+        ),
+        migrations.RunPython(rename_duplicate_names, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='plant',
+            constraint=models.UniqueConstraint(django.db.models.functions.text.Lower('common_name'), name='plant_common_name_unique'),
+        ),
+        migrations.RunPython(restore_plant_fts_triggers, migrations.RunPython.noop),
+    ]
@@ -2,8 +2,62 @@
 
 # Create your models here.
 
+import time
+
 from django.db import models
+from django.db.models import Count, Prefetch, Q, Value
+from django.db.models.functions import Lower
 from django.contrib.auth.models import User
+from django.utils import timezone
+
+from .storage import logbook_storage
+
+
+# ==========================================
+# QUERYSETS
+# ==========================================
+# for_serializer() loads everything the matching serializer in
+# api/serializers.py reads, so a page of N rows costs a constant
+# number of queries instead of one (or more) per row.
+class PlantQuerySet(models.QuerySet):
+    def by_name(self, name):
+        """
+        Case-insensitive match on common, scientific or Hindi name.
+        Compares LOWER(column) so the functional indexes in Plant.Meta
+        are used (`__iexact` compiles to UPPER() and would not be).
+        """
+        lowered = Lower(Value(name.strip()))
+        return self.alias(
+            common_lower=Lower('common_name'),
+            scientific_lower=Lower('scientific_name'),
+            hindi_lower=Lower('hindi_name'),
+        ).filter(
+            Q(common_lower=lowered) |
+            Q(scientific_lower=lowered) |
+            Q(hindi_lower=lowered)
+        )
+
+    def for_serializer(self):
+        """PlantSerializer: annotated disease_count + prefetched diseases"""
+        return self.annotate(disease_total=Count('diseases')).prefetch_related(
+            Prefetch('diseases', queryset=Disease.objects.order_by('id')))
+
+
+class DiseaseQuerySet(models.QuerySet):
+    def for_serializer(self):
+        return self.select_related('plant')
+
+
+class UserPlantQuerySet(models.QuerySet):
+    """Logbook / Reminder rows, serialized with their plant and user names"""
+
+    def for_serializer(self):
+        return self.select_related('plant', 'user')
+
+
+class AdminQuerySet(models.QuerySet):
+    def for_serializer(self):
+        return self.select_related('user')
 
 
 # ==========================================
@@ -70,7 +124,9 @@ class Plant(models.Model):
     )
     size = models.CharField(
         max_length=50,
-        choices=SIZE_CHOICES
+        choices=SIZE_CHOICES,
+        blank=True,
+        help_text="Blank when unknown (plants written back from external data)"
     )
 
     # Safety Information
@@ -82,6 +138,14 @@ class Plant(models.Model):
         max_length=50,
         choices=EDIBILITY_CHOICES
     )
+    toxicity_details = models.TextField(
+        blank=True,
+        help_text="Descriptive toxicity text, served instead of the generic one"
+    )
+    edibility_details = models.TextField(
+        blank=True,
+        help_text="Which parts are edible, served instead of the generic text"
+    )
 
     # Care Information
     watering = models.TextField(
@@ -107,8 +171,14 @@ class Plant(models.Model):
     )
 
     # Additional Information
+    family = models.CharField(max_length=200, blank=True)
+    description = models.TextField(blank=True)
+    origin = models.CharField(max_length=200, blank=True)
+    growth_rate = models.CharField(max_length=200, blank=True)
+    warning = models.TextField(blank=True)
     fun_facts = models.TextField(blank=True)
     image_url = models.URLField(blank=True, null=True)
+    wikipedia_url = models.URLField(max_length=500, blank=True, null=True)
     is_common = models.BooleanField(
         default=False,
         help_text="Mark for offline caching"
@@ -118,6 +188,8 @@ class Plant(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = PlantQuerySet.as_manager()
+
     def __str__(self):
         return f"{self.common_name} ({self.scientific_name})"
 
@@ -125,6 +197,19 @@ class Plant(models.Model):
         verbose_name = 'Plant'
         verbose_name_plural = 'Plants'
         ordering = ['common_name']
+        indexes = [
+            # keyset pagination of the catalogue list
+            models.Index(fields=['common_name', 'id'], name='plant_name_id_idx'),
+            # case-insensitive name lookups (PlantQuerySet.by_name)
+            models.Index(Lower('scientific_name'), name='plant_scientific_lower_idx'),
+            models.Index(Lower('hindi_name'), name='plant_hindi_lower_idx'),
+            # incremental sync
+            models.Index(fields=['updated_at', 'id'], name='plant_updated_idx'),
+        ]
+        constraints = [
+            # one row per name, also serves case-insensitive lookups
+            models.UniqueConstraint(Lower('common_name'), name='plant_common_name_unique'),
+        ]
 
 
 # ==========================================
@@ -159,12 +244,17 @@ class Disease(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = DiseaseQuerySet.as_manager()
+
     def __str__(self):
         return f"{self.name} - {self.plant.common_name}"
 
     class Meta:
         verbose_name = 'Disease'
         verbose_name_plural = 'Diseases'
+        indexes = [
+            models.Index(fields=['updated_at', 'id'], name='disease_updated_idx'),
+        ]
 
 
 # ==========================================
@@ -182,11 +272,16 @@ class Logbook(models.Model):
     )
     date = models.DateField(auto_now_add=True)
     notes = models.TextField(blank=True)
+    # Stored once per unique content, see api/storage.py
     image = models.ImageField(
         upload_to='logbook_images/',
+        storage=logbook_storage,
         null=True,
         blank=True
     )
+    # Resized copies of `image` by variant name ('thumb_webp', ...) plus
+    # the 'source' they were made from; filled in by api/image_variants.py
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
     location = models.CharField(
         max_length=200,
         blank=True,
@@ -196,6 +291,8 @@ class Logbook(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = UserPlantQuerySet.as_manager()
+
     def __str__(self):
         return f"{self.user.username} - {self.plant.common_name}"
 
@@ -203,6 +300,12 @@ class Logbook(models.Model):
         verbose_name = 'Logbook Entry'
         verbose_name_plural = 'Logbook Entries'
         ordering = ['-date']
+        indexes = [
+            # a user's logbook, newest first
+            models.Index(fields=['user', '-date'], name='logbook_user_date_idx'),
+            # incremental sync of a user's entries
+            models.Index(fields=['user', 'updated_at', 'id'], name='logbook_user_updated_idx'),
+        ]
 
 
 # ==========================================
@@ -249,6 +352,8 @@ class Reminder(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = UserPlantQuerySet.as_manager()
+
     def __str__(self):
         plant_name = self.plant.common_name if self.plant else "General"
         return f"{self.user.username} - {self.reminder_type} - {plant_name}"
@@ -257,6 +362,16 @@ class Reminder(models.Model):
         verbose_name = 'Reminder'
         verbose_name_plural = 'Reminders'
         ordering = ['next_reminder_date']
+        indexes = [
+            # due-reminder scans only ever look at active reminders
+            models.Index(
+                fields=['next_reminder_date'],
+                condition=Q(is_active=True),
+                name='reminder_due_idx'
+            ),
+            # incremental sync of a user's reminders
+            models.Index(fields=['user', 'updated_at', 'id'], name='reminder_user_updated_idx'),
+        ]
 
 
 # ==========================================
@@ -286,6 +401,8 @@ class Admin(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = AdminQuerySet.as_manager()
+
     def __str__(self):
         return f"{self.name} - {self.role}"
 
@@ -296,3 +413,139 @@ class Admin(models.Model):
     class Meta:
         verbose_name = 'Admin'
         verbose_name_plural = 'Admins'
+
+
+# ==========================================
+# PLANT INFO CACHE MODEL
+# ==========================================
+class PlantInfoCache(models.Model):
+    """
+    Assembled external plant data keyed by normalized plant name.
+    Each source (wikipedia, plant_data, hindi_name) is stored in
+    `sections` with its own fetch timestamp so it can expire on its
+    own TTL (see settings.PLANT_CACHE_TTL).
+    """
+    key = models.CharField(max_length=200, unique=True)
+    sections = models.JSONField(default=dict, blank=True)
+    hit_count = models.PositiveIntegerField(default=0)
+    miss_count = models.PositiveIntegerField(default=0)
+    # Set while one worker fetches this plant upstream; other workers
+    # wait for the result instead of issuing the same calls.
+    fetch_lease_until = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return self.key
+
+    def get_section(self, source, ttl):
+        """Return the cached value for `source` if younger than `ttl` seconds"""
+        section = self.sections.get(source)
+        if not section:
+            return None
+        if time.time() - section.get('fetched_at', 0) > ttl:
+            return None
+        return section.get('value')
+
+    def set_section(self, source, value):
+        self.sections[source] = {'value': value, 'fetched_at': time.time()}
+
+    class Meta:
+        verbose_name = 'Plant Info Cache'
+        verbose_name_plural = 'Plant Info Cache'
+        ordering = ['key']
+
+
+# ==========================================
+# PLANT NAME DICTIONARY MODEL
+# ==========================================
+class PlantNameTranslation(models.Model):
+    """
+    English <-> Hindi plant name pair. `romanized` holds the Hindi name
+    written in Latin script ('gulab') so users can search either way.
+    """
+    SOURCE_CHOICES = [
+        ('seed', 'Seed'),
+        ('catalogue', 'Plant Catalogue'),
+        ('translator', 'Google Translate'),
+        ('manual', 'Manual'),
+    ]
+
+    english = models.CharField(max_length=200)
+    english_key = models.CharField(max_length=200, unique=True)
+    hindi = models.CharField(max_length=200, db_index=True)
+    romanized = models.CharField(max_length=200, blank=True, db_index=True)
+    source = models.CharField(max_length=20, choices=SOURCE_CHOICES, default='translator')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.english} - {self.hindi}"
+
+    class Meta:
+        verbose_name = 'Plant Name Translation'
+        verbose_name_plural = 'Plant Name Translations'
+        ordering = ['english']
+
+
+# ==========================================
+# TOMBSTONE MODEL (Deleted rows, for sync)
+# ==========================================
+class Tombstone(models.Model):
+    """
+    A deleted Plant, Disease, Logbook or Reminder row, written by the
+    post_delete handlers in api/signals.py so /api/sync/ can tell
+    clients to drop it. `owner_id` is the user of Logbook / Reminder
+    rows (null for the shared catalogue).
+    """
+    model = models.CharField(max_length=50)
+    object_id = models.BigIntegerField()
+    owner_id = models.BigIntegerField(null=True, blank=True)
+    deleted_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.model} #{self.object_id}"
+
+    class Meta:
+        verbose_name = 'Tombstone'
+        verbose_name_plural = 'Tombstones'
+        indexes = [
+            models.Index(
+                fields=['model', 'owner_id', 'deleted_at', 'id'],
+                name='tombstone_feed_idx'
+            ),
+            # pruning (manage.py prune_tombstones)
+            models.Index(fields=['deleted_at'], name='tombstone_deleted_idx'),
+        ]
+
+
+# ==========================================
+# MEDIA BLOB MODEL (Deduplicated uploads)
+# ==========================================
+class MediaBlob(models.Model):
+    """
+    One unique uploaded file in api.storage.logbook_storage, named by
+    its sha256 digest. `ref_count` is the number of Logbook rows using
+    it; unreferenced blobs are garbage collected.
+    """
+    name = models.CharField(max_length=255, unique=True)
+    digest = models.CharField(max_length=64, db_index=True)
+    size = models.BigIntegerField()
+    ref_count = models.IntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} ({self.ref_count} refs)"
+
+    class Meta:
+        verbose_name = 'Media Blob'
+        verbose_name_plural = 'Media Blobs'
+        indexes = [
+            # garbage collection only looks at unreferenced blobs
+            models.Index(
+                fields=['ref_count'],
+                condition=Q(ref_count__lte=0),
+                name='mediablob_unreferenced_idx'
+            ),
+        ]
@@ -0,0 +1,143 @@
+import re
+import threading
+
+from django.db.models import Q
+
+from api.external_apis import GoogleTranslateAPI
+from api.plant_cache import normalize_plant_name
+from .models import Plant, PlantNameTranslation
+
+
+# (english, hindi, romanized) pairs that are always known, also used by
+# the data migration that seeds PlantNameTranslation
+SEED_NAMES = [
+    ('Marigold', 'गेंदा', 'genda'),
+    ('Rose', 'गुलाब', 'gulab'),
+    ('Tulsi', 'तुलसी', 'tulsi'),
+    ('Neem', 'नीम', 'neem'),
+    ('Champa', 'चंपा', 'champa'),
+    ('Jasmine', 'मोगरा', 'mogra'),
+]
+
+
+DEVANAGARI = re.compile('[\u0900-\u097f]')
+
+
+def is_translation(english, hindi):
+    """False for empty answers and for the translator echoing its input"""
+    return bool(english and hindi) and (
+        normalize_plant_name(english) != normalize_plant_name(hindi))
+
+
+class NameDictionary:
+    """
+    In-memory English <-> Hindi plant name dictionary backed by
+    PlantNameTranslation. Loaded once per process from the table, the
+    Plant catalogue and SEED_NAMES; a miss falls through to the table
+    (another worker may have learned the name) and then to Google
+    Translate, and translator answers are written back.
+    """
+
+    def __init__(self):
+        self._to_hindi = {}
+        self._to_english = {}
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def _remember(self, english, hindi, romanized=''):
+        self._to_hindi.setdefault(normalize_plant_name(english), hindi)
+        self._to_english.setdefault(normalize_plant_name(hindi), english)
+        if romanized:
+            self._to_english.setdefault(normalize_plant_name(romanized), english)
+
+    def _load(self):
+        if self._loaded:
+            return
+        with self._lock:
+            if self._loaded:
+                return
+            # Curated rows win over the catalogue and the seeds
+            for english, hindi, romanized in PlantNameTranslation.objects.values_list(
+                    'english', 'hindi', 'romanized'):
+                self._remember(english, hindi, romanized)
+            for english, hindi in Plant.objects.exclude(hindi_name='').values_list(
+                    'common_name', 'hindi_name'):
+                if is_translation(english, hindi):
+                    self._remember(english, hindi)
+            for english, hindi, romanized in SEED_NAMES:
+                self._remember(english, hindi, romanized)
+            self._loaded = True
+
+    def reload(self):
+        with self._lock:
+            self._to_hindi.clear()
+            self._to_english.clear()
+            self._loaded = False
+        self._load()
+
+    # ─── LOOKUPS (no network) ───────────────────────────────────────────
+    def hindi_for(self, english):
+        """Known Hindi name for an English name, or None"""
+        self._load()
+        key = normalize_plant_name(english)
+        hindi = self._to_hindi.get(key)
+        if hindi is None:
+            row = PlantNameTranslation.objects.filter(english_key=key).first()
+            if row is not None:
+                self._remember(row.english, row.hindi, row.romanized)
+                hindi = row.hindi
+        return hindi
+
+    def english_for(self, name):
+        """Known English name for a Hindi (either script) name, or None"""
+        self._load()
+        key = normalize_plant_name(name)
+        english = self._to_english.get(key)
+        if english is None:
+            row = PlantNameTranslation.objects.filter(
+                Q(hindi=name.strip()) | Q(romanized=key)).first()
+            if row is not None:
+                self._remember(row.english, row.hindi, row.romanized)
+                english = row.english
+        return english
+
+    # ─── TRANSLATION (lookup, then translator with write-back) ──────────
+    def add(self, english, hindi, source='translator', romanized=''):
+        """Store a pair; an existing row for the English name is kept"""
+        if not is_translation(english, hindi):
+            return
+        english, hindi = english.strip(), hindi.strip()
+        PlantNameTranslation.objects.get_or_create(
+            english_key=normalize_plant_name(english),
+            defaults={'english': english, 'hindi': hindi,
+                      'romanized': romanized, 'source': source})
+        self._remember(english, hindi, romanized)
+
+    def translate_to_hindi(self, text):
+        hindi = self.hindi_for(text)
+        if hindi is None:
+            hindi = GoogleTranslateAPI.translate_to_hindi(text)
+            self.add(text, hindi)
+        return hindi
+
+    def translate_to_english(self, text):
+        english = self.english_for(text)
+        if english is None:
+            english = GoogleTranslateAPI.translate_to_english(text)
+            # Romanized input ("gulab") is not a Hindi name to store
+            if DEVANAGARI.search(text):
+                self.add(english, text)
+        return english
+
+
+name_dictionary = NameDictionary()
+
+
+class HindiTranslator:
+    """Thin wrapper kept for api.utils; uses the shared name dictionary"""
+
+    def translate_to_hindi(self, text):
+        return name_dictionary.translate_to_hindi(text)
+
+    def translate_to_english(self, text):
+        return name_dictionary.translate_to_english(text)
@@ -0,0 +1,180 @@
+import re
+import threading
+import time
+from collections import Counter, namedtuple
+
+from django.conf import settings
+
+from api.name_dictionary import SEED_NAMES
+from .models import Plant, PlantNameTranslation
+
+
+# Common romanized spellings and run-together names -> canonical English
+# name. Spelling variants that only differ in doubled vowels, 'w'/'v'
+# or spacing are already folded together by phonetic_key().
+TRANSLITERATIONS = {
+    'genda': 'Marigold',
+    'gainda': 'Marigold',
+    'genda phool': 'Marigold',
+    'gulab': 'Rose',
+    'tulasi': 'Tulsi',
+    'tulsee': 'Tulsi',
+    'holy basil': 'Tulsi',
+    'neem': 'Neem',
+    'nimba': 'Neem',
+    'champa': 'Champa',
+    'chameli': 'Jasmine',
+    'mogra': 'Jasmine',
+    'mogara': 'Jasmine',
+    'aloevera': 'Aloe Vera',
+    'ghritkumari': 'Aloe Vera',
+    'gwarpatha': 'Aloe Vera',
+    'kamal': 'Lotus',
+    'pudina': 'Mint',
+    'dhaniya': 'Coriander',
+    'haldi': 'Turmeric',
+    'adrak': 'Ginger',
+    'kadi patta': 'Curry Leaf',
+    'karipatta': 'Curry Leaf',
+    'peepal': 'Sacred Fig',
+    'bargad': 'Banyan',
+    'ashwagandha': 'Ashwagandha',
+    'sadabahar': 'Periwinkle',
+    'guldaudi': 'Chrysanthemum',
+    'surajmukhi': 'Sunflower',
+    'money plant': 'Pothos',
+}
+
+_FOLDS = [
+    (re.compile(r"[\s\-_.,'()/]+"), ''),  # spacing and punctuation
+    (re.compile(r'ee'), 'i'),
+    (re.compile(r'oo'), 'u'),
+    (re.compile(r'([a-z])\1+'), r'\1'),   # 'gainddaa' -> 'gainda'
+    (re.compile(r'w'), 'v'),
+    (re.compile(r'ph'), 'f'),
+]
+
+
+def phonetic_key(name):
+    """Spelling-insensitive key: 'Aloe-Vera' and 'aloevera' -> 'aloevera'"""
+    key = name.lower().strip()
+    for pattern, replacement in _FOLDS:
+        key = pattern.sub(replacement, key)
+    return key
+
+
+def trigrams(key):
+    padded = f'  {key} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+Candidate = namedtuple('Candidate', ['name', 'matched', 'score'])
+
+
+class NameIndex:
+    """
+    Trigram index over plant name aliases. Each alias (common, scientific
+    or Hindi name, transliteration) maps to one canonical name; queries
+    are scored by Dice similarity of the aliases' trigram sets.
+    """
+
+    def __init__(self, aliases):
+        self._aliases = []          # (alias, canonical, trigram count)
+        self._exact = {}            # phonetic key -> alias id
+        self._postings = {}         # trigram -> [alias id]
+        for alias, canonical in aliases:
+            key = phonetic_key(alias)
+            if not key or key in self._exact:
+                continue
+            alias_id = len(self._aliases)
+            grams = trigrams(key)
+            self._aliases.append((alias, canonical, len(grams)))
+            self._exact[key] = alias_id
+            for gram in grams:
+                self._postings.setdefault(gram, []).append(alias_id)
+
+    def __len__(self):
+        return len(self._aliases)
+
+    def search(self, query, limit=5, min_score=0.0):
+        """Ranked Candidates, at most one per canonical name"""
+        key = phonetic_key(query)
+        if not key:
+            return []
+        alias_id = self._exact.get(key)
+        if alias_id is not None:
+            alias, canonical, _ = self._aliases[alias_id]
+            return [Candidate(canonical, alias, 1.0)]
+
+        grams = trigrams(key)
+        shared = Counter()
+        for gram in grams:
+            shared.update(self._postings.get(gram, ()))
+
+        best = {}
+        for alias_id, count in shared.items():
+            alias, canonical, size = self._aliases[alias_id]
+            score = 2 * count / (len(grams) + size)
+            if score >= min_score and score > best.get(canonical, (0,))[0]:
+                best[canonical] = (score, alias)
+        ranked = sorted(best.items(), key=lambda item: -item[1][0])
+        return [Candidate(canonical, alias, round(score, 3))
+                for canonical, (score, alias) in ranked[:limit]]
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# SHARED INDEX
+# ═══════════════════════════════════════════════════════════════════════
+def collect_aliases():
+    """(alias, canonical name) pairs from the catalogue and the dictionary"""
+    aliases = []
+    for common, scientific, hindi in Plant.objects.values_list(
+            'common_name', 'scientific_name', 'hindi_name'):
+        aliases += [(common, common), (scientific, common), (hindi, common)]
+    for english, hindi, romanized in PlantNameTranslation.objects.values_list(
+            'english', 'hindi', 'romanized'):
+        aliases += [(english, english), (hindi, english), (romanized, english)]
+    for english, hindi, romanized in SEED_NAMES:
+        aliases += [(english, english), (hindi, english), (romanized, english)]
+    aliases += [(alias, canonical) for alias, canonical in TRANSLITERATIONS.items()]
+    aliases += [(canonical, canonical) for canonical in TRANSLITERATIONS.values()]
+    return [(alias, canonical) for alias, canonical in aliases if alias]
+
+
+_index = None
+_built_at = 0.0
+_index_lock = threading.Lock()
+
+
+def get_name_index():
+    """Per-process index, rebuilt every NAME_INDEX_REFRESH seconds"""
+    global _index, _built_at
+    if _index is None or time.monotonic() - _built_at > settings.NAME_INDEX_REFRESH:
+        with _index_lock:
+            if _index is None or time.monotonic() - _built_at > settings.NAME_INDEX_REFRESH:
+                _index = NameIndex(collect_aliases())
+                _built_at = time.monotonic()
+    return _index
+
+
+def invalidate():
+    global _index
+    _index = None
+
+
+def resolve(query, limit=5):
+    return get_name_index().search(
+        query, limit=limit, min_score=settings.NAME_INDEX_MIN_SCORE)
+
+
+def canonical_name(plant_name):
+    """
+    Canonical name for user input when the best match is confident
+    (NAME_INDEX_AUTO_SCORE) and no other plant is, otherwise the input
+    itself
+    """
+    confident = [candidate for candidate in resolve(plant_name, limit=2)
+                 if candidate.score >= settings.NAME_INDEX_AUTO_SCORE]
+    if len(confident) == 1:
+        return confident[0].name
+    return plant_name
@@ -0,0 +1,40 @@
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+
+# ==========================================
+# REMINDER NOTIFIERS
+# ==========================================
+# A notifier takes a batch of due Reminder rows (with plant and user
+# loaded) and returns the ids it delivered. Reminders it did not
+# deliver are retried after REMINDER_RETRY_DELAY seconds. Select one
+# with settings.REMINDER_NOTIFIER.
+class BaseNotifier:
+    def send(self, reminders):
+        raise NotImplementedError
+
+
+class ConsoleNotifier(BaseNotifier):
+    """Prints each reminder; the default until a push provider is wired up"""
+
+    def send(self, reminders):
+        for reminder in reminders:
+            print(f'Reminder {reminder.id}: {reminder}')
+        return {reminder.id for reminder in reminders}
+
+
+class LocalNotifier(BaseNotifier):
+    """Keeps delivered reminders in memory (tests, local runs)"""
+    outbox = []
+
+    def __init__(self, fail_ids=()):
+        self.fail_ids = set(fail_ids)
+
+    def send(self, reminders):
+        delivered = [r for r in reminders if r.id not in self.fail_ids]
+        LocalNotifier.outbox.extend(delivered)
+        return {reminder.id for reminder in delivered}
+
+
+def get_notifier():
+    return import_string(settings.REMINDER_NOTIFIER)()
@@ -0,0 +1,217 @@
+"""
+Versioned offline database packages for the Android app.
+
+A package directory holds:
+
+    manifest.json                  versions, deltas, sizes and checksums
+    plants-v<N>.db.gz              full SQLite database of version N
+    delta-v<A>-v<N>.json.gz        row changes turning version A into N
+
+Each published database carries a plants_fts FTS5 index (with triggers,
+so applying a delta on the device keeps it current) and has
+PRAGMA user_version set to its version. Deltas are row-level: upserts
+are full rows keyed by id, deletes are ids.
+
+This module does not import Django, so build_offline_db.py can use it
+directly.
+"""
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+
+MANIFEST = 'manifest.json'
+# Older versions kept (with a delta to the newest) after each publish
+KEEP_VERSIONS = 10
+
+FTS_COLUMNS = ['common_name', 'hindi_name', 'scientific_name', 'family',
+               'description', 'watering', 'sunlight', 'soil_type']
+FTS_TOKENIZER = "unicode61 remove_diacritics 2 categories 'L* N* Co M*'"
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# MANIFEST
+# ═══════════════════════════════════════════════════════════════════════
+def read_manifest(package_dir):
+    path = os.path.join(package_dir, MANIFEST)
+    if not os.path.exists(path):
+        return {'latest': 0, 'versions': {}, 'deltas': {}}
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _write_atomic(path, data):
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path))
+    with os.fdopen(fd, 'wb') as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def _file_info(package_dir, name):
+    path = os.path.join(package_dir, name)
+    with open(path, 'rb') as f:
+        digest = hashlib.sha256(f.read()).hexdigest()
+    return {'file': name, 'size': os.path.getsize(path), 'sha256': digest}
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# DATABASE CONTENT
+# ═══════════════════════════════════════════════════════════════════════
+def read_rows(db_path):
+    """(columns, {id: row tuple}) of the plants table"""
+    conn = sqlite3.connect(db_path)
+    try:
+        cursor = conn.execute('SELECT * FROM plants ORDER BY id')
+        columns = [d[0] for d in cursor.description]
+        return columns, {row[0]: row for row in cursor}
+    finally:
+        conn.close()
+
+
+def content_hash(columns, rows):
+    digest = hashlib.sha256(json.dumps(columns).encode())
+    for pk in sorted(rows):
+        digest.update(json.dumps(rows[pk], ensure_ascii=False).encode())
+    return digest.hexdigest()
+
+
+def add_fts_index(conn):
+    cols = ', '.join(FTS_COLUMNS)
+    new = ', '.join(f'new.{c}' for c in FTS_COLUMNS)
+    old = ', '.join(f'old.{c}' for c in FTS_COLUMNS)
+    delete = f"INSERT INTO plants_fts(plants_fts, rowid, {cols}) VALUES ('delete', old.id, {old});"
+    insert = f'INSERT INTO plants_fts(rowid, {cols}) VALUES (new.id, {new});'
+    conn.executescript(f'''
+        DROP TABLE IF EXISTS plants_fts;
+        CREATE VIRTUAL TABLE plants_fts USING fts5({cols},
+            content="plants", content_rowid="id", tokenize="{FTS_TOKENIZER}");
+        CREATE TRIGGER IF NOT EXISTS plants_fts_ai AFTER INSERT ON plants BEGIN {insert} END;
+        CREATE TRIGGER IF NOT EXISTS plants_fts_ad AFTER DELETE ON plants BEGIN {delete} END;
+        CREATE TRIGGER IF NOT EXISTS plants_fts_au AFTER UPDATE ON plants BEGIN {delete} {insert} END;
+        INSERT INTO plants_fts(plants_fts) VALUES ('rebuild');
+    ''')
+
+
+def make_delta(old_rows, new_rows, columns, from_version, to_version):
+    upsert = [list(row) for pk, row in sorted(new_rows.items())
+              if old_rows.get(pk) != row]
+    delete = sorted(pk for pk in old_rows if pk not in new_rows)
+    return {'from': from_version, 'to': to_version, 'columns': columns,
+            'upsert': upsert, 'delete': delete}
+
+
+def apply_delta(db_path, delta):
+    """What the app does with a delta (also used to verify published ones)"""
+    conn = sqlite3.connect(db_path)
+    try:
+        with conn:
+            columns = delta['columns']
+            # Delete + insert rather than INSERT OR REPLACE: REPLACE does
+            # not fire the delete trigger that keeps plants_fts in sync
+            changed = delta['delete'] + [row[0] for row in delta['upsert']]
+            conn.executemany('DELETE FROM plants WHERE id = ?',
+                [(pk,) for pk in changed])
+            conn.executemany(
+                f'INSERT INTO plants ({", ".join(columns)}) '
+                f'VALUES ({", ".join("?" * len(columns))})', delta['upsert'])
+            conn.execute(f'PRAGMA user_version = {int(delta["to"])}')
+    finally:
+        conn.close()
+
+
+def _gunzip_to(src, dest):
+    with gzip.open(src, 'rb') as f_in, open(dest, 'wb') as f_out:
+        shutil.copyfileobj(f_in, f_out)
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# PUBLISH
+# ═══════════════════════════════════════════════════════════════════════
+def publish(source_db, package_dir, keep=KEEP_VERSIONS):
+    """
+    Publish `source_db` as the next version: a gzipped copy with the
+    FTS5 index, plus a delta from every retained older version. Returns
+    the new version, or the current one if the content did not change.
+    """
+    os.makedirs(package_dir, exist_ok=True)
+    manifest = read_manifest(package_dir)
+    columns, rows = read_rows(source_db)
+    digest = content_hash(columns, rows)
+    latest = manifest['latest']
+    if latest and manifest['versions'][str(latest)].get('content') == digest:
+        return latest
+
+    version = latest + 1
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'plants.db')
+        src = sqlite3.connect(source_db)
+        dest = sqlite3.connect(db_path)
+        src.backup(dest)
+        src.close()
+        add_fts_index(dest)
+        dest.execute(f'PRAGMA user_version = {version}')
+        dest.commit()
+        dest.execute('VACUUM')
+        dest.close()
+
+        full_name = f'plants-v{version}.db.gz'
+        with open(db_path, 'rb') as f:
+            _write_atomic(os.path.join(package_dir, full_name),
+                gzip.compress(f.read(), compresslevel=9))
+        full_info = _file_info(package_dir, full_name)
+
+        deltas = {}
+        retained = sorted(int(v) for v in manifest['versions'])[-keep:]
+        for old_version in retained:
+            old_path = os.path.join(tmp, f'v{old_version}.db')
+            _gunzip_to(os.path.join(package_dir,
+                manifest['versions'][str(old_version)]['file']), old_path)
+            _, old_rows = read_rows(old_path)
+            delta = make_delta(old_rows, rows, columns, old_version, version)
+            data = gzip.compress(json.dumps(delta, ensure_ascii=False).encode(), 9)
+            if len(data) >= full_info['size']:
+                continue  # the full package is no bigger; serve that instead
+            name = f'delta-v{old_version}-v{version}.json.gz'
+            _write_atomic(os.path.join(package_dir, name), data)
+            deltas[f'{old_version}-{version}'] = dict(
+                _file_info(package_dir, name),
+                upserts=len(delta['upsert']), deletes=len(delta['delete']))
+
+    versions = {str(v): manifest['versions'][str(v)] for v in retained}
+    versions[str(version)] = dict(full_info, rows=len(rows), content=digest,
+        created_at=int(time.time()))
+    new_manifest = {'latest': version, 'versions': versions, 'deltas': deltas}
+    _write_atomic(os.path.join(package_dir, MANIFEST),
+        json.dumps(new_manifest, indent=2).encode())
+
+    # Files no longer referenced by the manifest
+    referenced = {info['file'] for info in versions.values()}
+    referenced |= {info['file'] for info in deltas.values()}
+    for name in os.listdir(package_dir):
+        if name.endswith('.gz') and name not in referenced:
+            os.remove(os.path.join(package_dir, name))
+    return version
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# SERVE
+# ═══════════════════════════════════════════════════════════════════════
+def best_update(manifest, current_version):
+    """
+    ('none' | 'delta' | 'full', info) for a client at `current_version`:
+    the smallest download that brings it to the latest version.
+    """
+    latest = manifest['latest']
+    if not latest:
+        return None, None
+    if current_version == latest:
+        return 'none', None
+    full = manifest['versions'][str(latest)]
+    delta = manifest['deltas'].get(f'{current_version}-{latest}')
+    if delta is not None and delta['size'] < full['size']:
+        return 'delta', delta
+    return 'full', full
@@ -0,0 +1,97 @@
+import base64
+import json
+from collections import OrderedDict
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset ("seek") pagination on a unique ordering, e.g.
+    (common_name, id). The opaque cursor holds the last row's key and
+    the next page is `WHERE (key) > (cursor) ORDER BY key LIMIT n`.
+    Unlike page numbers, there is no COUNT(*) and no OFFSET scan, so
+    deep pages cost the same as the first one.
+    """
+    ordering = ('common_name', 'id')
+    cursor_types = (str, int)  # type of each `ordering` value in a cursor
+    page_size = 50
+    max_page_size = 200
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def encode_cursor(self, obj):
+        key = [getattr(obj, field) for field in self.ordering]
+        return base64.urlsafe_b64encode(
+            json.dumps(key, ensure_ascii=False).encode()).decode()
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            key = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+        except (ValueError, TypeError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(key, list) or len(key) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        # exact types: None, nested lists and bools (an int subclass)
+        # would otherwise reach the ORM and fail there
+        if any(type(value) is not expected
+               for value, expected in zip(key, self.cursor_types)):
+            raise NotFound(self.invalid_cursor_message)
+        return key
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def after(self, key):
+        """Q for rows strictly after `key` in `ordering`"""
+        condition = Q()
+        for i, field in enumerate(self.ordering):
+            equal = {f: key[j] for j, f in enumerate(self.ordering[:i])}
+            condition |= Q(**equal, **{f'{field}__gt': key[i]})
+        return condition
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        key = self.decode_cursor(request)
+        page_size = self.get_page_size(request)
+        queryset = queryset.order_by(*self.ordering)
+        if key is not None:
+            queryset = queryset.filter(self.after(key))
+        rows = list(queryset[:page_size + 1])
+        self.has_next = len(rows) > page_size
+        page = rows[:page_size]
+        self.next_cursor = self.encode_cursor(page[-1]) if self.has_next else None
+        return page
+
+    def get_next_link(self):
+        if self.next_cursor is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.next_cursor)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
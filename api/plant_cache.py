@@ -0,0 +1,160 @@
+import asyncio
+import time
+from collections import namedtuple
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.cache import patch_cache_control
+from django.utils.http import http_date
+
+from .models import PlantInfoCache
+
+# How long an answer may be reused (seconds) and when its data was last
+# fetched or edited; becomes Cache-Control / Last-Modified
+Freshness = namedtuple('Freshness', ['max_age', 'last_modified'])
+
+
+def normalize_plant_name(plant_name):
+    """'  Aloe   VERA ' -> 'aloe vera'"""
+    return ' '.join(plant_name.lower().split())
+
+
+def get_ttl(source):
+    return settings.PLANT_CACHE_TTL[source]
+
+
+def get_entry(plant_name):
+    """
+    The cache entry for a plant. Names never looked up successfully get
+    an unsaved entry: rows are only stored once there is data to keep,
+    so typos and garbage names do not accumulate.
+    """
+    key = normalize_plant_name(plant_name)
+    return PlantInfoCache.objects.filter(key=key).first() or PlantInfoCache(key=key)
+
+
+def get_section(entry, source):
+    return entry.get_section(source, get_ttl(source))
+
+
+def freshness(entry, sources):
+    """
+    Freshness of an answer built from `entry`'s `sources` sections: valid
+    until the first of them expires, last modified by the newest fetch
+    """
+    fetched_at = {source: entry.sections[source]['fetched_at']
+                  for source in sources if entry.sections.get(source)}
+    if not fetched_at:
+        return Freshness(0, None)
+    expires = min(at + get_ttl(source) for source, at in fetched_at.items())
+    return Freshness(
+        max(0, int(expires - time.time())),
+        datetime.fromtimestamp(max(fetched_at.values()), tz=dt_timezone.utc))
+
+
+def set_cache_headers(response, freshness):
+    """Cache-Control and Last-Modified of a response built from an answer"""
+    if freshness.max_age > 0:
+        patch_cache_control(response, public=True, max_age=freshness.max_age)
+    else:
+        patch_cache_control(response, no_cache=True)
+    if freshness.last_modified is not None:
+        response['Last-Modified'] = http_date(freshness.last_modified.timestamp())
+    return response
+
+
+def save_entry(entry, fetched, missed):
+    """
+    Store freshly fetched sections, release the fetch lease and bump the
+    hit/miss counters. `fetched` maps source -> value; empty values are
+    not cached so they are retried on the next lookup.
+    """
+    for source, value in fetched.items():
+        if value:
+            entry.set_section(source, value)
+    if not entry.sections:
+        # Nothing found for this name: drop the lease-only row, if any
+        if entry.pk is not None:
+            entry.delete()
+        return
+    if entry.pk is None:
+        entry.save()
+    elif missed:
+        entry.fetch_lease_until = None
+        entry.save(update_fields=['sections', 'fetch_lease_until', 'updated_at'])
+        PlantInfoCache.objects.filter(pk=entry.pk).update(
+            miss_count=F('miss_count') + 1)
+    else:
+        PlantInfoCache.objects.filter(pk=entry.pk).update(
+            hit_count=F('hit_count') + 1)
+
+
+def claim_fetch(entry, lease_seconds):
+    """
+    Try to become the worker that fetches this plant upstream.
+    Returns False while another worker holds an unexpired lease.
+    """
+    now = timezone.now()
+    lease_until = now + timedelta(seconds=lease_seconds)
+    if entry.pk is None:
+        # First lookup of this name: the row holds the lease until
+        # save_entry() stores data in it (or deletes it again)
+        row, created = PlantInfoCache.objects.get_or_create(
+            key=entry.key, defaults={'fetch_lease_until': lease_until})
+        entry.pk = row.pk
+        if created:
+            entry.fetch_lease_until = lease_until
+            return True
+        entry.refresh_from_db()
+    claimed = PlantInfoCache.objects.filter(pk=entry.pk).filter(
+        Q(fetch_lease_until__isnull=True) | Q(fetch_lease_until__lt=now)
+    ).update(fetch_lease_until=lease_until)
+    return bool(claimed)
+
+
+def lease_released(entry):
+    """Refresh `entry` and report whether no worker is fetching it anymore"""
+    try:
+        entry.refresh_from_db(fields=['sections', 'fetch_lease_until'])
+    except PlantInfoCache.DoesNotExist:
+        # The fetch found nothing and save_entry() dropped the row
+        entry.pk, entry.sections, entry.fetch_lease_until = None, {}, None
+        return True
+    lease = entry.fetch_lease_until
+    return lease is None or lease < timezone.now()
+
+
+def wait_for_fetch(entry, timeout, poll_interval=0.2):
+    """
+    Block until the worker holding the lease has stored its result, the
+    lease is released/expired, or `timeout` seconds pass. `entry` is
+    refreshed in place. Returns True when that worker finished (rather
+    than its lease expiring or the wait timing out).
+    """
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        time.sleep(poll_interval)
+        if lease_released(entry):
+            return entry.fetch_lease_until is None
+    return False
+
+
+async def await_fetch(entry, timeout, poll_interval=0.2):
+    """wait_for_fetch() for async callers"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        await asyncio.sleep(poll_interval)
+        if await sync_to_async(lease_released)(entry):
+            return entry.fetch_lease_until is None
+    return False
+
+
+def purge(plant_name=None):
+    """Delete one cached plant, or everything when no name is given"""
+    qs = PlantInfoCache.objects.all()
+    if plant_name:
+        qs = qs.filter(key=normalize_plant_name(plant_name))
+    return qs.delete()[0]
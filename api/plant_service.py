@@ -0,0 +1,332 @@
+import json
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from api import name_index, plant_cache
+from api.catalogue import (
+    find_local_plant, is_confident, plant_to_details, save_plant_from_details)
+from api.external_apis import GoogleTranslateAPI, WikipediaAPI
+from api.fanout import afan_out, fan_out
+from api.name_dictionary import name_dictionary
+from api.providers import ahedged_plant_data, hedged_plant_data
+from api.singleflight import AsyncSingleFlight, SingleFlight
+
+
+SECTIONS = ('wikipedia', 'plant_data', 'hindi_name')
+
+
+def fetch_plant_data(plant_name):
+    """Groq first (more reliable for now), hedged with Gemini"""
+    return hedged_plant_data(plant_name)
+
+
+async def afetch_plant_data(plant_name):
+    return await ahedged_plant_data(plant_name)
+
+
+def fetch_wikipedia(plant_name):
+    wiki = WikipediaAPI.get_plant_info(plant_name)
+    return list(wiki) if any(wiki) else None
+
+
+async def afetch_wikipedia(plant_name):
+    wiki = await WikipediaAPI.aget_plant_info(plant_name)
+    return list(wiki) if any(wiki) else None
+
+
+def _hindi_name(plant_name, translated):
+    # The translator echoes its input when it fails; that is not a Hindi name
+    if not translated or plant_cache.normalize_plant_name(translated) == \
+            plant_cache.normalize_plant_name(plant_name):
+        return None
+    return translated
+
+
+def fetch_hindi_name(plant_name):
+    return _hindi_name(plant_name, GoogleTranslateAPI.translate_to_hindi(plant_name))
+
+
+async def afetch_hindi_name(plant_name):
+    return _hindi_name(
+        plant_name, await GoogleTranslateAPI.atranslate_to_hindi(plant_name))
+
+
+_flights = SingleFlight()
+_async_flights = AsyncSingleFlight()
+
+
+def _cached_sections(entry):
+    sections = {}
+    for source in SECTIONS:
+        value = plant_cache.get_section(entry, source)
+        if value is not None:
+            sections[source] = value
+    return sections
+
+
+def _merge_fetched(sections, fetched):
+    sections.update({k: v for k, v in fetched.items() if v})
+    missing = [source for source in SECTIONS if not sections.get(source)]
+    return sections, missing
+
+
+def _known_hindi(sections, hindi):
+    if hindi and 'hindi_name' not in sections:
+        sections['hindi_name'] = hindi
+
+
+def _collect_sections(plant_name, plant_data_fetcher):
+    entry = plant_cache.get_entry(plant_name)
+    sections = _cached_sections(entry)
+
+    deadline = timeout = settings.EXTERNAL_API_DEADLINE
+    leader_done = False
+    if len(sections) < len(SECTIONS) and not plant_cache.claim_fetch(
+            entry, deadline + 5):
+        # Another worker is already fetching this plant: wait for its
+        # result. What it could not find is reported missing, not
+        # fetched again; if its lease expired, fetch in the time left
+        started = time.monotonic()
+        leader_done = plant_cache.wait_for_fetch(entry, deadline)
+        timeout = deadline - (time.monotonic() - started)
+        sections = _cached_sections(entry)
+
+    # 'gulab' / 'गुलाब' -> 'Rose' so Wikipedia gets the English title;
+    # the Hindi name only goes to the translator if the dictionary lacks it
+    english_name = name_dictionary.english_for(plant_name) or plant_name
+    _known_hindi(sections, name_dictionary.hindi_for(english_name))
+    fetchers = {
+        'wikipedia': lambda: fetch_wikipedia(english_name),
+        'plant_data': lambda: plant_data_fetcher(plant_name),
+        'hindi_name': lambda: fetch_hindi_name(english_name),
+    }
+    calls = {} if leader_done or timeout <= 0 else {source: fetchers[source]
+        for source in SECTIONS if source not in sections}
+    fetched, _ = fan_out(calls, timeout)
+    plant_cache.save_entry(entry, fetched, missed=bool(calls))
+    if fetched.get('hindi_name'):
+        name_dictionary.add(english_name, fetched['hindi_name'])
+    sections, missing = _merge_fetched(sections, fetched)
+    return sections, missing, plant_cache.freshness(entry, SECTIONS)
+
+
+async def _acollect_sections(plant_name, plant_data_fetcher):
+    entry = await sync_to_async(plant_cache.get_entry)(plant_name)
+    sections = _cached_sections(entry)
+
+    deadline = timeout = settings.EXTERNAL_API_DEADLINE
+    leader_done = False
+    if len(sections) < len(SECTIONS) and not await sync_to_async(
+            plant_cache.claim_fetch)(entry, deadline + 5):
+        started = time.monotonic()
+        leader_done = await plant_cache.await_fetch(entry, deadline)
+        timeout = deadline - (time.monotonic() - started)
+        sections = _cached_sections(entry)
+
+    english_name = await sync_to_async(name_dictionary.english_for)(
+        plant_name) or plant_name
+    _known_hindi(sections,
+        await sync_to_async(name_dictionary.hindi_for)(english_name))
+    fetchers = {
+        'wikipedia': lambda: afetch_wikipedia(english_name),
+        'plant_data': lambda: plant_data_fetcher(plant_name),
+        'hindi_name': lambda: afetch_hindi_name(english_name),
+    }
+    calls = {} if leader_done or timeout <= 0 else {source: fetchers[source]
+        for source in SECTIONS if source not in sections}
+    fetched, _ = await afan_out(calls, timeout)
+    await sync_to_async(plant_cache.save_entry)(entry, fetched, missed=bool(calls))
+    if fetched.get('hindi_name'):
+        await sync_to_async(name_dictionary.add)(english_name, fetched['hindi_name'])
+    sections, missing = _merge_fetched(sections, fetched)
+    return sections, missing, plant_cache.freshness(entry, SECTIONS)
+
+
+def collect_sections(plant_name, plant_data_fetcher=fetch_plant_data):
+    """
+    Return (sections, missing, freshness) for a plant.
+
+    Cached sections are served from PlantInfoCache; the rest are fetched
+    concurrently under the EXTERNAL_API_DEADLINE. `missing` lists the
+    sections that have no data (timed out or failed upstream), and
+    `freshness` (plant_cache.Freshness) follows the cached sections'
+    TTLs.
+
+    Concurrent lookups of the same plant are coalesced: one thread per
+    process does the work, and across processes the PlantInfoCache
+    fetch lease lets a single worker go upstream while the others wait.
+    """
+    key = plant_cache.normalize_plant_name(plant_name)
+    sections, missing, freshness = _flights.do(
+        key, lambda: _collect_sections(plant_name, plant_data_fetcher))
+    return dict(sections), list(missing), freshness
+
+
+async def acollect_sections(plant_name, plant_data_fetcher=afetch_plant_data):
+    """collect_sections() on the event loop, using the async provider clients"""
+    key = plant_cache.normalize_plant_name(plant_name)
+    sections, missing, freshness = await _async_flights.do(
+        key, lambda: _acollect_sections(plant_name, plant_data_fetcher))
+    return dict(sections), list(missing), freshness
+
+
+def build_plant_details(plant_name, sections):
+    wiki_desc, wiki_img, wiki_url = sections.get('wikipedia') or (None, None, None)
+    api_data = sections.get('plant_data')
+    hindi_name = sections.get('hindi_name') or plant_name
+    if api_data and api_data.get('hindi_name'):
+        hindi_name = api_data['hindi_name']
+    return {
+        'common_name': plant_name,
+        'hindi_name': hindi_name,
+        'description': wiki_desc or 'Not available',
+        'image_url': wiki_img,
+        'wikipedia_url': wiki_url,
+        'scientific_name': api_data.get('scientific_name','') if api_data else '',
+        'family': api_data.get('family','') if api_data else '',
+        'watering': api_data.get('watering','') if api_data else '',
+        'sunlight': api_data.get('sunlight','') if api_data else '',
+        'soil_type': api_data.get('soil_type','') if api_data else '',
+        'indoor_outdoor': api_data.get('indoor_outdoor','') if api_data else '',
+        'edible': api_data.get('edible','') if api_data else '',
+        'toxic': api_data.get('toxic','') if api_data else '',
+        'warning': api_data.get('warning') if api_data else None,
+        'fun_facts': api_data.get('fun_facts','') if api_data else '',
+        'origin': api_data.get('origin','') if api_data else '',
+        'growth_rate': api_data.get('growth_rate','') if api_data else '',
+        'diseases': api_data.get('diseases',[]) if api_data else []
+    }
+
+
+def build_identification(plant_name, vision, details, prepared):
+    """Response body for identify-leaf (`details` from get_plant_info())"""
+    plant_details = dict(details)
+    missing = plant_details.pop('missing_sections', [])
+    plant_details['scientific_name'] = (
+        vision.get('scientific_name') or plant_details['scientific_name'])
+    return {
+        'plant_identification': {
+            'plant_name': plant_name,
+            'confidence': vision.get('confidence', 0),
+            'identified_by': vision.get('identified_by', 'Gemini 2.0 Flash Vision')
+        },
+        'disease_detection': {
+            'is_healthy': vision.get('is_healthy', True),
+            'disease': vision.get('disease')
+        },
+        'plant_details': plant_details,
+        'missing_sections': missing,
+        'image_preprocessing': {
+            'original_bytes': prepared.original_bytes,
+            'sent_bytes': prepared.encoded_bytes,
+            'bytes_saved': prepared.original_bytes - prepared.encoded_bytes,
+            'elapsed_ms': prepared.elapsed_ms
+        }
+    }
+
+
+def _local_details(plant_name):
+    """(details, freshness) from the local catalogue, or None"""
+    plant = find_local_plant(plant_name)
+    if plant is None:
+        return None
+    result = plant_to_details(plant)
+    result['missing_sections'] = []
+    modified = max([plant.updated_at] + [d.updated_at for d in plant.diseases.all()])
+    return result, plant_cache.Freshness(settings.PLANT_INFO_MAX_AGE, modified)
+
+
+def _write_back(result, missing):
+    """Store a complete, confidently resolved answer in the local catalogue"""
+    if not is_confident(result, missing):
+        return
+    try:
+        if save_plant_from_details(result) is not None:
+            name_index.invalidate()
+    except Exception as e:
+        print(f'Catalogue write-back error: {e}')
+
+
+def _resolve_local(plant_name):
+    """
+    (name, local): the local (details, freshness) for the name as typed,
+    else for its fuzzy/transliterated canonical form ('genda' ->
+    'Marigold'). `name` is what to ask the external APIs for when neither
+    is in the catalogue.
+    """
+    local = _local_details(plant_name)
+    if local is not None:
+        return plant_name, local
+    name = name_index.canonical_name(plant_name)
+    if name != plant_name:
+        return name, _local_details(name)
+    return plant_name, None
+
+
+def _incomplete(freshness, missing):
+    """Answers with missing sections are only reused briefly"""
+    if not missing:
+        return freshness
+    return freshness._replace(max_age=min(
+        freshness.max_age, settings.PLANT_INFO_INCOMPLETE_MAX_AGE))
+
+
+def lookup_plant_info(plant_name):
+    """
+    (details, freshness): get_plant_info() plus how long the answer may
+    be reused, taken from the catalogue row or the PlantInfoCache entry
+    it was built from (for HTTP caching).
+    """
+    plant_name, local = _resolve_local(plant_name)
+    if local is not None:
+        return local
+    sections, missing, freshness = collect_sections(plant_name)
+    result = build_plant_details(plant_name, sections)
+    _write_back(result, missing)
+    result['missing_sections'] = missing
+    return result, _incomplete(freshness, missing)
+
+
+async def alookup_plant_info(plant_name):
+    plant_name, local = await sync_to_async(_resolve_local)(plant_name)
+    if local is not None:
+        return local
+    sections, missing, freshness = await acollect_sections(plant_name)
+    result = build_plant_details(plant_name, sections)
+    await sync_to_async(_write_back)(result, missing)
+    result['missing_sections'] = missing
+    return result, _incomplete(freshness, missing)
+
+
+def get_plant_info(plant_name):
+    """
+    Plant details from the local Plant/Disease tables when the plant is
+    known; otherwise assembled from the external APIs and written back
+    so the next lookup is served locally.
+    """
+    return lookup_plant_info(plant_name)[0]
+
+
+async def aget_plant_info(plant_name):
+    return (await alookup_plant_info(plant_name))[0]
+
+
+def dedupe_plant_names(names):
+    """Drop repeats by normalized name, keeping the first spelling seen"""
+    unique = {}
+    for name in names:
+        if isinstance(name, str) and name.strip():
+            unique.setdefault(plant_cache.normalize_plant_name(name), name.strip())
+    return list(unique.values())
+
+
+def batch_line(plant_name, result=None, error=None):
+    """One NDJSON line of the batch endpoint"""
+    line = {'name': plant_name}
+    if error is None:
+        line['result'] = result
+    else:
+        line['error'] = error
+    return json.dumps(line, ensure_ascii=False) + '\n'
@@ -0,0 +1,350 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, wait
+
+from django.conf import settings
+
+from api.external_apis import GeminiPlantAPI, GroqPlantAPI
+from api.fanout import get_executor
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# LATENCY TRACKING
+# ═══════════════════════════════════════════════════════════════════════
+class LatencyTracker:
+    """Rolling window of successful call latencies (seconds)"""
+
+    def __init__(self, window=200):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, p, default=None):
+        with self._lock:
+            samples = sorted(self._samples)
+        if len(samples) < settings.HEDGE_MIN_SAMPLES:
+            return default
+        index = min(len(samples) - 1, int(p / 100 * len(samples)))
+        return samples[index]
+
+    def __len__(self):
+        return len(self._samples)
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# PROVIDER HEALTH / CIRCUIT BREAKER
+# ═══════════════════════════════════════════════════════════════════════
+class ProviderHealth:
+    """
+    Rolling latency and error-rate stats for one provider, plus a circuit
+    breaker: after CIRCUIT_FAILURE_THRESHOLD consecutive failures the
+    circuit opens and the provider is skipped; after CIRCUIT_RESET_TIMEOUT
+    seconds a single trial call is let through (half-open) and its
+    outcome closes or re-opens the circuit. `clock` is injectable for
+    tests.
+    """
+
+    def __init__(self, window=100, clock=time.monotonic):
+        self.clock = clock
+        self.latency = LatencyTracker()
+        self._outcomes = deque(maxlen=window)
+        self._consecutive_failures = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self._opened_at is None:
+            return 'closed'
+        if self.clock() - self._opened_at >= settings.CIRCUIT_RESET_TIMEOUT:
+            return 'half_open'
+        return 'open'
+
+    def allow_request(self):
+        with self._lock:
+            state = self.state
+            if state == 'closed':
+                return True
+            if state == 'half_open' and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def release(self):
+        """Give back a trial slot whose call was cancelled"""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record(self, seconds, ok):
+        with self._lock:
+            self._outcomes.append(ok)
+            self._trial_in_flight = False
+            if ok:
+                self._consecutive_failures = 0
+                self._opened_at = None
+            else:
+                self._consecutive_failures += 1
+                if (self._opened_at is not None or self._consecutive_failures
+                        >= settings.CIRCUIT_FAILURE_THRESHOLD):
+                    self._opened_at = self.clock()
+        if ok:
+            self.latency.record(seconds)
+
+    def error_rate(self):
+        with self._lock:
+            outcomes = list(self._outcomes)
+        if not outcomes:
+            return 0.0
+        return outcomes.count(False) / len(outcomes)
+
+    def stats(self):
+        return {
+            'state': self.state,
+            'error_rate': round(self.error_rate(), 3),
+            'latency_p50': self.latency.percentile(50),
+            'latency_p90': self.latency.percentile(90),
+            'samples': len(self.latency),
+        }
+
+
+class ProviderRouter:
+    """
+    Picks the fastest healthy provider for one capability. `providers`
+    maps a name to the class implementing it, in preference order; that
+    order is kept until there are enough latency samples to rank by p50.
+    """
+
+    def __init__(self, providers, clock=time.monotonic):
+        self.providers = providers
+        self.clock = clock
+        self.health = {name: ProviderHealth(clock=clock) for name in providers}
+
+    def ranked(self):
+        """Providers whose circuit is not open, fastest first"""
+        order = list(self.providers)
+
+        def sort_key(name):
+            p50 = self.health[name].latency.percentile(50)
+            return (p50 is None, p50 or 0, order.index(name))
+
+        usable = [name for name in order if self.health[name].state != 'open']
+        return sorted(usable, key=sort_key)
+
+    def next_provider(self, exclude=()):
+        """Best provider not in `exclude` that may be called right now"""
+        for name in self.ranked():
+            if name not in exclude and self.health[name].allow_request():
+                return name
+        return None
+
+    def call(self, name, method, *args):
+        start = self.clock()
+        try:
+            result = getattr(self.providers[name], method)(*args)
+        except Exception:
+            self.health[name].record(self.clock() - start, False)
+            raise
+        self.health[name].record(self.clock() - start, bool(result))
+        return result
+
+    async def acall(self, name, method, *args):
+        start = self.clock()
+        try:
+            result = await getattr(self.providers[name], method)(*args)
+        except asyncio.CancelledError:
+            # lost a hedge race; says nothing about the provider's health
+            self.health[name].release()
+            raise
+        except Exception:
+            self.health[name].record(self.clock() - start, False)
+            raise
+        self.health[name].record(self.clock() - start, bool(result))
+        return result
+
+    def stats(self):
+        return {name: health.stats() for name, health in self.health.items()}
+
+
+plant_data_router = ProviderRouter({
+    'groq': GroqPlantAPI,
+    'gemini': GeminiPlantAPI,
+})
+vision_router = ProviderRouter({
+    'gemini': GeminiPlantAPI,
+    'groq': GroqPlantAPI,
+})
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# HEDGE COUNTERS
+# ═══════════════════════════════════════════════════════════════════════
+_stats_lock = threading.Lock()
+hedge_stats = {
+    'requests': 0,
+    'hedges_fired': 0,
+    'primary_wins': 0,
+    'hedge_wins': 0,
+    'both_failed': 0,
+    'no_provider': 0,
+}
+
+
+def _count(*keys):
+    with _stats_lock:
+        for key in keys:
+            hedge_stats[key] += 1
+
+
+def get_provider_stats():
+    with _stats_lock:
+        hedging = dict(hedge_stats)
+    return {
+        'hedging': hedging,
+        'plant_data': plant_data_router.stats(),
+        'vision': vision_router.stats(),
+    }
+
+
+def _outcome(call):
+    """(result, error) of a finished future or task"""
+    try:
+        return call.result(), None
+    except Exception as e:
+        return None, e
+
+
+def hedge_delay(provider):
+    """Seconds to wait on `provider` before firing the backup request"""
+    return plant_data_router.health[provider].latency.percentile(
+        settings.HEDGE_PERCENTILE, default=settings.HEDGE_DEFAULT_DELAY)
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# HEDGED PLANT DATA
+# ═══════════════════════════════════════════════════════════════════════
+def hedged_plant_data(plant_name):
+    """
+    Ask the fastest healthy provider for plant data; if it has not
+    answered within its tracked HEDGE_PERCENTILE latency (or fails), ask
+    the next healthy one too and return the first valid JSON. The slower
+    call is left to finish in the background and its result is ignored.
+    When every call fails, the last error is raised (None if they only
+    came back empty).
+    """
+    _count('requests')
+    primary = plant_data_router.next_provider()
+    if primary is None:
+        _count('no_provider')
+        return None
+
+    executor = get_executor('llm-hedge')
+    futures = {executor.submit(plant_data_router.call,
+        primary, 'get_plant_data', plant_name): primary}
+    error = None
+    done, pending = wait(futures, timeout=hedge_delay(primary))
+    for future in done:
+        result, error = _outcome(future)
+        if result:
+            _count('primary_wins')
+            return result
+
+    backup = plant_data_router.next_provider(exclude=(primary,))
+    if backup is not None:
+        _count('hedges_fired')
+        futures[executor.submit(plant_data_router.call,
+            backup, 'get_plant_data', plant_name)] = backup
+    pending = {future for future in futures if not future.done()}
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            result, failure = _outcome(future)
+            if result:
+                _count('primary_wins' if futures[future] == primary
+                    else 'hedge_wins')
+                return result
+            error = failure or error
+    _count('both_failed')
+    if error is not None:
+        raise error
+    return None
+
+
+async def ahedged_plant_data(plant_name):
+    """hedged_plant_data() for the async views; the loser is cancelled"""
+    _count('requests')
+    primary = plant_data_router.next_provider()
+    if primary is None:
+        _count('no_provider')
+        return None
+
+    tasks = {asyncio.ensure_future(plant_data_router.acall(
+        primary, 'aget_plant_data', plant_name)): primary}
+    error = None
+    done, pending = await asyncio.wait(tasks, timeout=hedge_delay(primary))
+    for task in done:
+        result, error = _outcome(task)
+        if result:
+            _count('primary_wins')
+            return result
+
+    backup = plant_data_router.next_provider(exclude=(primary,))
+    if backup is not None:
+        _count('hedges_fired')
+        tasks[asyncio.ensure_future(plant_data_router.acall(
+            backup, 'aget_plant_data', plant_name))] = backup
+    pending = {task for task in tasks if not task.done()}
+    while pending:
+        done, pending = await asyncio.wait(
+            pending, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            result, failure = _outcome(task)
+            if result:
+                for other in pending:
+                    other.cancel()
+                _count('primary_wins' if tasks[task] == primary
+                    else 'hedge_wins')
+                return result
+            error = failure or error
+    _count('both_failed')
+    if error is not None:
+        raise error
+    return None
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# ROUTED VISION
+# ═══════════════════════════════════════════════════════════════════════
+def _label(vision, name):
+    vision.setdefault('identified_by', vision_router.providers[name].VISION_LABEL)
+    return vision
+
+
+def identify_from_image(prepared):
+    """Try vision providers, fastest healthy first, until one answers"""
+    tried = []
+    while True:
+        name = vision_router.next_provider(exclude=tried)
+        if name is None:
+            return None
+        tried.append(name)
+        vision = vision_router.call(name, 'identify_from_image', prepared)
+        if vision:
+            return _label(vision, name)
+
+
+async def aidentify_from_image(prepared):
+    tried = []
+    while True:
+        name = vision_router.next_provider(exclude=tried)
+        if name is None:
+            return None
+        tried.append(name)
+        vision = await vision_router.acall(name, 'aidentify_from_image', prepared)
+        if vision:
+            return _label(vision, name)
@@ -0,0 +1,96 @@
+import calendar
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Reminder
+
+
+FREQUENCY_DAYS = {
+    'daily': 1,
+    'weekly': 7,
+    'biweekly': 14,
+}
+
+
+def add_months(value, months):
+    """Same day `months` later, clamped to the end of shorter months"""
+    month_index = value.month - 1 + months
+    year, month = value.year + month_index // 12, month_index % 12 + 1
+    day = min(value.day, calendar.monthrange(year, month)[1])
+    return value.replace(year=year, month=month, day=day)
+
+
+def next_occurrence(current, frequency, now):
+    """
+    First occurrence of the schedule after `now`. A reminder that was
+    missed for a while fires once and then resumes its schedule, instead
+    of firing once per missed period.
+    """
+    if frequency == 'monthly':
+        months = 1
+        while add_months(current, months) <= now:
+            months += 1
+        return add_months(current, months)
+    step = timedelta(days=FREQUENCY_DAYS[frequency])
+    periods = max(1, (now - current) // step + 1)
+    return current + periods * step
+
+
+def dispatch_batch(notifier, batch_size=None, now=None):
+    """
+    Claim up to `batch_size` due reminders, hand them to `notifier` and
+    move each to its next occurrence (or, if not delivered, retry after
+    REMINDER_RETRY_DELAY). Returns (claimed, delivered).
+
+    Rows are claimed with SELECT ... FOR UPDATE SKIP LOCKED, so several
+    dispatchers can run at once: each one skips the rows another has
+    already claimed instead of waiting on them. The claim pushes the rows
+    to the retry time and commits before the notifier runs, so no lock is
+    held during delivery and a crashed dispatcher only delays its batch.
+    """
+    batch_size = batch_size or settings.REMINDER_BATCH_SIZE
+    now = now or timezone.now()
+    retry_at = now + timedelta(seconds=settings.REMINDER_RETRY_DELAY)
+
+    with transaction.atomic():
+        reminders = list(
+            Reminder.objects.for_serializer()
+            .select_for_update(skip_locked=True, of=('self',))
+            .filter(is_active=True, next_reminder_date__lte=now)
+            .order_by('next_reminder_date')[:batch_size]
+        )
+        if not reminders:
+            return 0, 0
+        due_dates = {reminder.id: reminder.next_reminder_date for reminder in reminders}
+        # update() does not apply auto_now
+        Reminder.objects.filter(id__in=due_dates).update(
+            next_reminder_date=retry_at, updated_at=timezone.now())
+
+    try:
+        delivered = notifier.send(reminders)
+    except Exception as e:
+        print(f'Reminder notifier error: {e}')
+        delivered = set()
+    delivered = set(delivered) & due_dates.keys()
+    if not delivered:
+        return len(reminders), 0
+
+    with transaction.atomic():
+        # A row the user edited while the notifier ran keeps the edit
+        sent = list(
+            Reminder.objects.select_for_update()
+            .filter(id__in=delivered, next_reminder_date=retry_at)
+        )
+        for reminder in sent:
+            reminder.next_reminder_date = next_occurrence(
+                due_dates[reminder.id], reminder.frequency, now)
+        # bulk_update() does not apply auto_now either; stamp it at write
+        # time so sync clients that already read past `now` still see it
+        updated_at = timezone.now()
+        for reminder in sent:
+            reminder.updated_at = updated_at
+        Reminder.objects.bulk_update(sent, ['next_reminder_date', 'updated_at'])
+    return len(reminders), len(delivered)
@@ -0,0 +1,143 @@
+import re
+
+from django.db import connection
+from django.db.models import Q
+
+from .models import Disease, Plant
+
+
+# ==========================================
+# SEARCH DOCUMENTS
+# ==========================================
+# PostgreSQL: expression GIN indexes over these exact expressions are
+# created by migration 0007_search_indexes; keep both in sync or the
+# planner falls back to a sequential scan.
+PLANT_DOCUMENT = (
+    "setweight(to_tsvector('simple'::regconfig, coalesce(common_name, '') || ' ' || "
+    "coalesce(scientific_name, '') || ' ' || coalesce(hindi_name, '')), 'A') || "
+    "setweight(to_tsvector('simple'::regconfig, coalesce(family, '') || ' ' || "
+    "coalesce(watering, '') || ' ' || coalesce(sunlight, '') || ' ' || "
+    "coalesce(soil_type, '') || ' ' || coalesce(care_tips, '')), 'B')"
+)
+DISEASE_DOCUMENT = (
+    "setweight(to_tsvector('simple'::regconfig, coalesce(name, '')), 'A') || "
+    "setweight(to_tsvector('simple'::regconfig, coalesce(symptoms, '') || ' ' || "
+    "coalesce(treatment, '') || ' ' || coalesce(prevention, '')), 'B')"
+)
+
+# SQLite: FTS5 tables (external content, kept current by triggers) with
+# the bm25 weight of each column
+PLANT_FTS_COLUMNS = {
+    'common_name': 10.0, 'scientific_name': 10.0, 'hindi_name': 10.0,
+    'family': 2.0, 'watering': 1.0, 'sunlight': 1.0, 'soil_type': 1.0,
+    'care_tips': 1.0,
+}
+DISEASE_FTS_COLUMNS = {
+    'name': 10.0, 'symptoms': 2.0, 'treatment': 1.0, 'prevention': 1.0,
+}
+
+# Fallback for databases without either (and for the admin on them)
+PLANT_SCAN_FIELDS = ['common_name', 'scientific_name', 'hindi_name', 'care_tips']
+DISEASE_SCAN_FIELDS = ['name', 'symptoms', 'treatment']
+
+_SEPARATORS = re.compile(r"[\s\-_.,;:'\"()/&|!<>*^~\\+]+")
+
+
+def search_terms(query):
+    """Query split into plain terms; operators of either syntax are dropped"""
+    return [term for term in _SEPARATORS.split(query) if term][:10]
+
+
+def _tsquery(terms):
+    """All terms must match, each as a prefix: rose & bla:* style"""
+    return ' & '.join("'%s':*" % term.replace("'", "''") for term in terms)
+
+
+def _fts5_query(terms):
+    return ' '.join('"%s"*' % term.replace('"', '""') for term in terms)
+
+
+_fts5_tables = None
+
+
+def _has_fts5_table(table):
+    global _fts5_tables
+    if _fts5_tables is None:
+        _fts5_tables = set(connection.introspection.table_names())
+    return table in _fts5_tables
+
+
+# ==========================================
+# RANKED ID LOOKUPS
+# ==========================================
+def _ranked_ids(model, document, fts_columns, scan_fields, terms, limit):
+    """[(id, rank)] best first"""
+    table = model._meta.db_table
+    fts_table = f'{table}_fts'
+    if connection.vendor == 'postgresql':
+        sql = (
+            f'SELECT id, ts_rank({document}, query) AS rank '
+            f'FROM {table}, to_tsquery(\'simple\', %s) query '
+            f'WHERE {document} @@ query '
+            f'ORDER BY rank DESC, id LIMIT %s'
+        )
+        params = [_tsquery(terms), limit]
+    elif connection.vendor == 'sqlite' and _has_fts5_table(fts_table):
+        weights = ', '.join(str(weight) for weight in fts_columns.values())
+        # bm25() is lower-is-better; negate it so every backend ranks high-first
+        sql = (
+            f'SELECT rowid, -bm25({fts_table}, {weights}) AS rank '
+            f'FROM {fts_table} WHERE {fts_table} MATCH %s '
+            f'ORDER BY rank DESC, rowid LIMIT %s'
+        )
+        params = [_fts5_query(terms), limit]
+    else:
+        condition = Q()
+        for term in terms:
+            term_q = Q()
+            for field in scan_fields:
+                term_q |= Q(**{f'{field}__icontains': term})
+            condition &= term_q
+        ids = model.objects.filter(condition).order_by('id').values_list(
+            'id', flat=True)[:limit]
+        return [(pk, 0.0) for pk in ids]
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return [(pk, float(rank)) for pk, rank in cursor.fetchall()]
+
+
+def plant_ids(query, limit=20):
+    terms = search_terms(query)
+    if not terms:
+        return []
+    return _ranked_ids(Plant, PLANT_DOCUMENT, PLANT_FTS_COLUMNS,
+        PLANT_SCAN_FIELDS, terms, limit)
+
+
+def disease_ids(query, limit=20):
+    terms = search_terms(query)
+    if not terms:
+        return []
+    return _ranked_ids(Disease, DISEASE_DOCUMENT, DISEASE_FTS_COLUMNS,
+        DISEASE_SCAN_FIELDS, terms, limit)
+
+
+def _in_rank_order(queryset, ranked):
+    objects = queryset.in_bulk([pk for pk, _ in ranked])
+    results = []
+    for pk, rank in ranked:
+        if pk in objects:
+            objects[pk].search_rank = rank
+            results.append(objects[pk])
+    return results
+
+
+def search_plants(query, limit=20):
+    """Plants matching `query`, best first, each with a `search_rank`"""
+    return _in_rank_order(Plant.objects.all(), plant_ids(query, limit))
+
+
+def search_diseases(query, limit=20):
+    return _in_rank_order(
+        Disease.objects.for_serializer(), disease_ids(query, limit))
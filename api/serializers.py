@@ -1,5 +1,6 @@
 from rest_framework import serializers
 from django.contrib.auth.models import User
+from .image_variants import variant_urls
 from .models import UserProfile, Plant, Disease, Logbook, Reminder, Admin
 
 
@@ -49,6 +50,9 @@ class PlantSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
     def get_disease_count(self, obj):
+        # Plant.objects.for_serializer() annotates the count
+        if hasattr(obj, 'disease_total'):
+            return obj.disease_total
         return obj.diseases.count()
 
 
@@ -72,6 +76,15 @@ class PlantListSerializer(serializers.ModelSerializer):
         ]
 
 
+# ==========================================
+# PLANT SYNC SERIALIZER (Flat, diseases sync separately)
+# ==========================================
+class PlantSyncSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Plant
+        fields = '__all__'
+
+
 # ==========================================
 # LOGBOOK SERIALIZER
 # ==========================================
@@ -88,11 +101,16 @@ class LogbookSerializer(serializers.ModelSerializer):
         source='user.username',
         read_only=True
     )
+    # Resized copies for list screens; {} until they have been generated
+    image_variants = serializers.SerializerMethodField()
 
     class Meta:
         model = Logbook
         fields = '__all__'
 
+    def get_image_variants(self, obj):
+        return variant_urls(obj, self.context.get('request'))
+
 
 # ==========================================
 # REMINDER SERIALIZER
@@ -0,0 +1,77 @@
+from collections import Counter
+
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import storage
+from .image_variants import needs_variants, schedule_variants
+from .models import Disease, Logbook, Plant, Reminder, Tombstone
+
+
+# ==========================================
+# TOMBSTONES FOR SYNC
+# ==========================================
+# Connecting post_delete also makes Django collect cascaded rows (a
+# plant's diseases, a user's logbook) one by one instead of deleting
+# them in bulk, so every one of them gets its tombstone.
+@receiver(post_delete, sender=Plant)
+@receiver(post_delete, sender=Disease)
+@receiver(post_delete, sender=Logbook)
+@receiver(post_delete, sender=Reminder)
+def record_tombstone(sender, instance, **kwargs):
+    Tombstone.objects.create(
+        model=sender._meta.model_name,
+        object_id=instance.pk,
+        owner_id=getattr(instance, 'user_id', None),
+    )
+
+
+# ==========================================
+# LOGBOOK IMAGE VARIANTS
+# ==========================================
+@receiver(post_save, sender=Logbook)
+def schedule_logbook_image_variants(sender, instance, **kwargs):
+    if needs_variants(instance):
+        schedule_variants(instance.pk)
+
+
+# ==========================================
+# LOGBOOK IMAGE BLOB REFERENCES
+# ==========================================
+@receiver(pre_save, sender=Logbook)
+def remember_previous_image(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and 'image' not in update_fields:
+        instance._previous_image = instance._image_uploaded = None
+        return
+    previous = ''
+    if instance.pk:
+        previous = Logbook.objects.filter(pk=instance.pk).values_list(
+            'image', flat=True).first() or ''
+    instance._previous_image = previous
+    # New uploads are counted by the storage as they are written
+    instance._image_uploaded = bool(instance.image) and not instance.image._committed
+
+
+@receiver(post_save, sender=Logbook)
+def update_image_references(sender, instance, **kwargs):
+    previous = getattr(instance, '_previous_image', None)
+    if previous is None:
+        return
+    changes = Counter()
+    if instance.image:
+        changes[instance.image.name] += 1
+        if instance._image_uploaded:
+            changes[instance.image.name] -= 1  # already counted by the storage
+    if previous:
+        changes[previous] -= 1
+    for name, change in changes.items():
+        if change > 0:
+            storage.retain(name)
+        elif change < 0:
+            storage.release(name)
+
+
+@receiver(post_delete, sender=Logbook)
+def release_deleted_image(sender, instance, **kwargs):
+    if instance.image:
+        storage.release(instance.image.name)
@@ -0,0 +1,111 @@
+"""
+Content-addressed, reference-counted storage for Logbook uploads.
+
+An upload is hashed (sha256) while it streams to a temporary file next
+to its destination. It is stored once as <upload_to>/<ab>/<digest><ext>:
+when a blob with that digest already exists the temporary file is
+dropped, so re-logging the same photo writes nothing new. Each stored
+name has a MediaBlob row counting the Logbook rows that use it. When
+the last one lets go (image replaced or entry deleted) the blob and its
+image variants are deleted once the transaction commits.
+"""
+import hashlib
+import os
+import posixpath
+import tempfile
+
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.deconstruct import deconstructible
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    def get_available_name(self, name, max_length=None):
+        return name  # the stored name comes from the content, see _save()
+
+    def blob_name(self, name, digest):
+        directory, ext = posixpath.dirname(name), posixpath.splitext(name)[1].lower()
+        return posixpath.join(directory, digest[:2], f'{digest}{ext}')
+
+    def _save(self, name, content):
+        from .models import MediaBlob
+
+        directory = self.path(os.path.dirname(name))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=directory, suffix='.part')
+        try:
+            digest, size = hashlib.sha256(), 0
+            with os.fdopen(fd, 'wb') as f:
+                for chunk in content.chunks():
+                    digest.update(chunk)
+                    size += len(chunk)
+                    f.write(chunk)
+            digest = digest.hexdigest()
+            name = self.blob_name(name, digest)
+            path = self.path(name)
+
+            # The row lock orders this against collect_garbage(): either
+            # the blob survives with one more reference, or it is gone
+            # and the file is put back
+            with transaction.atomic():
+                blob, _ = MediaBlob.objects.select_for_update().get_or_create(
+                    name=name, defaults={'digest': digest, 'size': size})
+                if os.path.exists(path):
+                    os.remove(tmp)
+                else:
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    os.replace(tmp, path)
+                    os.chmod(path, self.file_permissions_mode or 0o644)
+                MediaBlob.objects.filter(pk=blob.pk).update(
+                    ref_count=F('ref_count') + 1, updated_at=timezone.now())
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+        return name
+
+
+logbook_storage = ContentAddressedStorage()
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# REFERENCE COUNTING
+# ═══════════════════════════════════════════════════════════════════════
+def retain(name):
+    """One more row uses the stored `name` (uploads are counted by _save)"""
+    from .models import MediaBlob
+    MediaBlob.objects.filter(name=name).update(
+        ref_count=F('ref_count') + 1, updated_at=timezone.now())
+
+
+def release(name):
+    """One row fewer uses `name`; the blob is collected after commit if unused"""
+    from .models import MediaBlob
+    released = MediaBlob.objects.filter(name=name).update(
+        ref_count=F('ref_count') - 1, updated_at=timezone.now())
+    if released:
+        transaction.on_commit(lambda: collect_garbage([name]))
+
+
+def collect_garbage(names=None):
+    """
+    Delete unreferenced blobs (all of them, or only those in `names`)
+    with their files and image variants. Returns the number collected.
+    """
+    from .image_variants import delete_variants
+    from .models import MediaBlob
+
+    blobs = MediaBlob.objects.filter(ref_count__lte=0)
+    if names is not None:
+        blobs = blobs.filter(name__in=names)
+    collected = 0
+    with transaction.atomic():
+        for blob in blobs.select_for_update(skip_locked=True):
+            logbook_storage.delete(blob.name)
+            delete_variants(blob.name)
+            blob.delete()
+            collected += 1
+    return collected
@@ -0,0 +1,145 @@
+"""
+Incremental sync for the app: rows of a feed changed since the client's
+cursor, plus the ids deleted since then (api.models.Tombstone).
+
+Both streams are read in (updated_at, id) / (deleted_at, id) order with
+keyset conditions, so each page is a range scan of the *_updated_idx /
+tombstone_feed_idx indexes however much has changed in total. The
+cursor returned with every page is the client's new high-water mark;
+it keeps calling with it while `has_more` is true.
+"""
+import base64
+import json
+from collections import namedtuple
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import Disease, Logbook, Plant, Reminder, Tombstone
+from .serializers import (
+    DiseaseSerializer, LogbookSerializer, PlantSyncSerializer,
+    ReminderSerializer)
+
+Feed = namedtuple('Feed', ['queryset', 'serializer', 'per_user'])
+
+FEEDS = {
+    'plants': Feed(Plant.objects.all(), PlantSyncSerializer, False),
+    'diseases': Feed(Disease.objects.for_serializer(), DiseaseSerializer, False),
+    'logbook': Feed(Logbook.objects.for_serializer(), LogbookSerializer, True),
+    'reminders': Feed(Reminder.objects.for_serializer(), ReminderSerializer, True),
+}
+
+
+class CursorExpired(Exception):
+    """The tombstones the cursor still needs have been pruned"""
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# CURSOR
+# ═══════════════════════════════════════════════════════════════════════
+def encode_cursor(changed, deleted):
+    key = {
+        'changed': [changed[0].isoformat(), changed[1]] if changed else None,
+        'deleted': [deleted[0].isoformat(), deleted[1]],
+    }
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode()
+
+
+def _position(value, optional=False):
+    if value is None and optional:
+        return None
+    at, pk = value
+    at = parse_datetime(at)
+    # encode_cursor() always writes aware datetimes
+    if at is None or timezone.is_naive(at) or not isinstance(pk, int):
+        raise ValueError('Invalid cursor position')
+    return at, pk
+
+
+def decode_cursor(cursor):
+    """(changed, deleted) positions; ValueError for a malformed cursor"""
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return _position(key['changed'], optional=True), _position(key['deleted'])
+    except (KeyError, TypeError, ValueError) as e:
+        raise ValueError(f'Invalid cursor: {e}')
+
+
+def _after(field, position):
+    """Q for rows strictly after `position` in (field, id) order"""
+    if position is None:
+        return Q()
+    at, pk = position
+    return Q(**{f'{field}__gt': at}) | Q(**{field: at, 'id__gt': pk})
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# CHANGES
+# ═══════════════════════════════════════════════════════════════════════
+def changes(feed_name, user=None, cursor=None, page_size=None, request=None):
+    """
+    One page of `feed_name` after `cursor` (None: from the beginning):
+    {'changed': [...], 'deleted': [ids], 'cursor': ..., 'has_more': ...}.
+    Per-user feeds only see `user`'s rows. Raises ValueError for a bad
+    cursor and CursorExpired when the client must sync from scratch.
+    `request` makes the serializers' file and image URLs absolute.
+    """
+    feed = FEEDS[feed_name]
+    page_size = page_size or settings.SYNC_PAGE_SIZE
+    now = timezone.now()
+    horizon = now - timedelta(seconds=settings.SYNC_SETTLE_SECONDS)
+
+    if cursor:
+        changed_at, deleted_at = decode_cursor(cursor)
+        if deleted_at[0] < now - timedelta(days=settings.SYNC_TOMBSTONE_DAYS):
+            raise CursorExpired()
+    else:
+        # A fresh client has nothing to delete: only rows deleted after
+        # this first page matter to it
+        changed_at, deleted_at = None, (horizon, 0)
+
+    rows = feed.queryset.filter(updated_at__lte=horizon)
+    tombstones = Tombstone.objects.filter(
+        model=rows.model._meta.model_name, deleted_at__lte=horizon)
+    if feed.per_user:
+        rows = rows.filter(user=user)
+        tombstones = tombstones.filter(owner_id=user.pk)
+    else:
+        tombstones = tombstones.filter(owner_id__isnull=True)
+
+    rows = list(rows.filter(_after('updated_at', changed_at))
+                .order_by('updated_at', 'id')[:page_size + 1])
+    deleted = list(tombstones.filter(_after('deleted_at', deleted_at))
+                   .order_by('deleted_at', 'id')
+                   .values_list('deleted_at', 'id', 'object_id')[:page_size + 1])
+
+    more_rows = len(rows) > page_size
+    more_deleted = len(deleted) > page_size
+    rows, deleted = rows[:page_size], deleted[:page_size]
+    if rows:
+        changed_at = (rows[-1].updated_at, rows[-1].id)
+    if more_deleted:
+        deleted_at = deleted[-1][:2]
+    else:
+        # Every tombstone up to the horizon has been seen; moving the
+        # position there keeps an idle client's cursor from expiring
+        deleted_at = max(deleted_at, (horizon, 0))
+
+    return {
+        'changed': feed.serializer(
+            rows, many=True, context={'request': request}).data,
+        'deleted': [object_id for _, _, object_id in deleted],
+        'cursor': encode_cursor(changed_at, deleted_at),
+        'has_more': more_rows or more_deleted,
+    }
+
+
+def prune_tombstones(days=None):
+    """Delete tombstones older than SYNC_TOMBSTONE_DAYS; returns the count"""
+    days = settings.SYNC_TOMBSTONE_DAYS if days is None else days
+    cutoff = timezone.now() - timedelta(days=days)
+    deleted, _ = Tombstone.objects.filter(deleted_at__lt=cutoff).delete()
+    return deleted
@@ -1,3 +1,1553 @@
-from django.test import TestCase
+import asyncio
+import base64
+import gzip
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO, StringIO
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from PIL import Image
+from rest_framework.authtoken.models import Token
+
+import build_offline_db
+
+from . import (
+    async_views, catalogue, fanout, http_client, middleware, name_index,
+    offline_packages, plant_cache, plant_service, providers, search)
+from .models import (
+    Admin, Disease, Logbook, MediaBlob, Plant, PlantInfoCache,
+    PlantNameTranslation, Reminder, Tombstone)
+from .image_hash import ImageHashIndex, dhash, hamming_distance
+from .image_processing import preprocess_image, preprocess_leaf_upload
+from .name_dictionary import NameDictionary
+from .notifiers import LocalNotifier
+from .reminders import add_months, dispatch_batch, next_occurrence
+from .singleflight import SingleFlight
+from .sync import prune_tombstones
+from .serializers import (
+    AdminSerializer, DiseaseSerializer, LogbookSerializer, PlantSerializer,
+    ReminderSerializer)
+
+
+# ==========================================
+# SERIALIZER QUERY COUNTS
+# ==========================================
+class SerializerQueryCountTests(TestCase):
+    """
+    Serializing a page through Model.objects.for_serializer() must cost
+    the same number of queries whether it holds 1 row or many.
+    """
+
+    def make_rows(self, count):
+        for i in range(count):
+            user = User.objects.create(username=f'user{self.created + i}')
+            plant = Plant.objects.create(
+                common_name=f'Plant {self.created + i}',
+                scientific_name=f'Planta {self.created + i}',
+                plant_type='indoor', size='small',
+                toxicity='non_toxic', edibility='edible')
+            for name in ('Leaf spot', 'Root rot'):
+                Disease.objects.create(
+                    plant=plant, name=name, symptoms='s', treatment='t')
+            Logbook.objects.create(user=user, plant=plant)
+            Reminder.objects.create(
+                user=user, plant=plant, reminder_type='watering',
+                frequency='weekly',
+                next_reminder_date=timezone.now() + timedelta(days=1))
+            Admin.objects.create(user=user, name=user.username)
+        self.created += count
+
+    def setUp(self):
+        self.created = 0
+
+    def assertConstantQueries(self, num, serializer_class, queryset):
+        for count in (1, 5):
+            self.make_rows(count)
+            with self.assertNumQueries(num):
+                data = serializer_class(queryset.all(), many=True).data
+            self.assertEqual(len(data), queryset.count())
+
+    def test_plant_serializer(self):
+        # plants with the disease count annotated + prefetched diseases
+        self.assertConstantQueries(
+            2, PlantSerializer, Plant.objects.for_serializer())
+
+    def test_plant_disease_count_annotated(self):
+        self.make_rows(2)
+        data = PlantSerializer(Plant.objects.for_serializer(), many=True).data
+        self.assertEqual([row['disease_count'] for row in data], [2, 2])
+        self.assertEqual(
+            {d['plant_name'] for d in data[0]['diseases']}, {'Plant 0'})
+
+    def test_disease_serializer(self):
+        self.assertConstantQueries(
+            1, DiseaseSerializer, Disease.objects.for_serializer())
+
+    def test_logbook_serializer(self):
+        self.assertConstantQueries(
+            1, LogbookSerializer, Logbook.objects.for_serializer())
+
+    def test_reminder_serializer(self):
+        self.assertConstantQueries(
+            1, ReminderSerializer, Reminder.objects.for_serializer())
+
+    def test_admin_serializer(self):
+        self.assertConstantQueries(
+            1, AdminSerializer, Admin.objects.for_serializer())
+
+
+class PlantListQueryCountTests(TestCase):
+    def test_list_page_is_one_query(self):
+        for i in range(30):
+            Plant.objects.create(
+                common_name=f'Plant {i:02}', scientific_name='x',
+                plant_type='indoor', size='small',
+                toxicity='non_toxic', edibility='edible')
+        url = '/api/plants/?page_size=10'
+        for _ in range(3):
+            with self.assertNumQueries(1):
+                response = self.client.get(url)
+            url = response.json()['next']
+        self.assertIsNone(url)
+
+    def test_malformed_cursor_is_404(self):
+        Plant.objects.create(common_name='Rose', scientific_name='Rosa',
+            plant_type='outdoor', size='small')
+        for key in (['a', 'x'], ['a', None], ['a', [1]], ['a', True], [1, 1],
+                    ['a'], {'a': 1}):
+            cursor = base64.urlsafe_b64encode(json.dumps(key).encode()).decode()
+            response = self.client.get('/api/plants/', {'cursor': cursor})
+            self.assertEqual(response.status_code, 404, key)
+        self.assertEqual(self.client.get(
+            '/api/plants/', {'cursor': 'not base64!'}).status_code, 404)
+        cursor = base64.urlsafe_b64encode(json.dumps(['Aloe', 1]).encode()).decode()
+        response = self.client.get('/api/plants/', {'cursor': cursor})
+        self.assertEqual([row['common_name'] for row in response.json()['results']],
+                         ['Rose'])
+
+
+# ==========================================
+# REMINDER DISPATCH
+# ==========================================
+class ReminderDispatchTests(TestCase):
+    def setUp(self):
+        LocalNotifier.outbox.clear()
+        self.user = User.objects.create(username='gardener')
+        self.now = timezone.now()
+
+    def make_reminder(self, offset, frequency='weekly', is_active=True):
+        return Reminder.objects.create(
+            user=self.user, reminder_type='watering', frequency=frequency,
+            is_active=is_active, next_reminder_date=self.now + offset)
+
+    def test_next_occurrence(self):
+        start = self.now - timedelta(hours=1)
+        self.assertEqual(next_occurrence(start, 'daily', self.now),
+                         start + timedelta(days=1))
+        # missed for three weeks: fires once, then back on schedule
+        start = self.now - timedelta(days=20)
+        self.assertEqual(next_occurrence(start, 'weekly', self.now),
+                         start + timedelta(days=21))
+        jan31 = self.now.replace(year=2025, month=1, day=31)
+        self.assertEqual(add_months(jan31, 1).day, 28)
+        self.assertEqual(next_occurrence(jan31, 'monthly', jan31), add_months(jan31, 1))
+
+    def test_dispatches_due_active_reminders(self):
+        due = self.make_reminder(-timedelta(hours=1))
+        later = self.make_reminder(timedelta(hours=1))
+        inactive = self.make_reminder(-timedelta(hours=1), is_active=False)
+
+        self.assertEqual(dispatch_batch(LocalNotifier(), now=self.now), (1, 1))
+        self.assertEqual([r.id for r in LocalNotifier.outbox], [due.id])
+        due.refresh_from_db()
+        self.assertEqual(due.next_reminder_date,
+                         self.now - timedelta(hours=1) + timedelta(days=7))
+        self.assertGreater(due.updated_at, self.now)
+        self.assertEqual(dispatch_batch(LocalNotifier(), now=self.now), (0, 0))
+        for reminder in (later, inactive):
+            self.assertEqual(reminder.next_reminder_date,
+                Reminder.objects.get(id=reminder.id).next_reminder_date)
+
+    @override_settings(REMINDER_RETRY_DELAY=60)
+    def test_undelivered_reminders_are_retried_later(self):
+        failing = self.make_reminder(-timedelta(minutes=5))
+        self.assertEqual(
+            dispatch_batch(LocalNotifier(fail_ids=[failing.id]), now=self.now), (1, 0))
+        failing.refresh_from_db()
+        self.assertEqual(failing.next_reminder_date, self.now + timedelta(seconds=60))
+
+    @override_settings(REMINDER_RETRY_DELAY=60)
+    def test_rows_are_claimed_before_sending(self):
+        due = self.make_reminder(-timedelta(hours=1))
+        edited = self.make_reminder(-timedelta(hours=1))
+        user_date = self.now + timedelta(days=3)
+
+        class EditingNotifier(LocalNotifier):
+            def send(inner, reminders):
+                # claimed rows are already out of the due set
+                self.assertEqual(set(Reminder.objects.filter(
+                    next_reminder_date=self.now + timedelta(seconds=60)
+                ).values_list('id', flat=True)), {due.id, edited.id})
+                self.assertEqual(dispatch_batch(LocalNotifier(), now=self.now), (0, 0))
+                Reminder.objects.filter(id=edited.id).update(next_reminder_date=user_date)
+                return super().send(reminders)
+
+        self.assertEqual(dispatch_batch(EditingNotifier(), now=self.now), (2, 2))
+        due.refresh_from_db()
+        edited.refresh_from_db()
+        self.assertEqual(due.next_reminder_date,
+                         self.now - timedelta(hours=1) + timedelta(days=7))
+        self.assertEqual(edited.next_reminder_date, user_date)
+
+    @override_settings(REMINDER_NOTIFIER='api.notifiers.LocalNotifier')
+    def test_command_drains_in_batches(self):
+        for i in range(7):
+            self.make_reminder(-timedelta(minutes=i + 1), frequency='daily')
+        call_command('dispatch_reminders', batch_size=3, stdout=StringIO())
+        self.assertEqual(len(LocalNotifier.outbox), 7)
+        self.assertFalse(Reminder.objects.filter(
+            next_reminder_date__lte=timezone.now()).exists())
+
+
+# ==========================================
+# INCREMENTAL SYNC
+# ==========================================
+@override_settings(SYNC_SETTLE_SECONDS=0)
+class SyncTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='gardener')
+        self.other = User.objects.create(username='neighbour')
+
+    def make_plant(self, name):
+        return Plant.objects.create(
+            common_name=name, scientific_name='x', plant_type='indoor',
+            size='small', toxicity='non_toxic', edibility='edible')
+
+    def sync(self, feed, cursor=None, page_size=2):
+        params = {'page_size': page_size}
+        if cursor:
+            params['cursor'] = cursor
+        response = self.client.get(f'/api/sync/{feed}/', params)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def sync_all(self, feed, cursor=None):
+        changed, deleted = [], []
+        while True:
+            page = self.sync(feed, cursor)
+            changed += [row['id'] for row in page['changed']]
+            deleted += page['deleted']
+            cursor = page['cursor']
+            if not page['has_more']:
+                return changed, deleted, cursor
+
+    def test_pages_changes_then_only_new_ones(self):
+        plants = [self.make_plant(f'Plant {i}') for i in range(5)]
+        changed, deleted, cursor = self.sync_all('plants')
+        self.assertEqual(changed, [p.id for p in plants])
+        self.assertEqual(deleted, [])
+
+        plants[1].watering = 'Weekly'
+        plants[1].save()
+        new = self.make_plant('Plant 5')
+        removed_id = plants[3].id
+        plants[3].delete()
+        changed, deleted, cursor = self.sync_all('plants', cursor)
+        self.assertEqual(changed, [plants[1].id, new.id])
+        self.assertEqual(deleted, [removed_id])
+        self.assertEqual(self.sync_all('plants', cursor)[:2], ([], []))
+
+    def test_cascaded_deletes_leave_tombstones(self):
+        plant = self.make_plant('Rose')
+        disease = Disease.objects.create(
+            plant=plant, name='Black spot', symptoms='s', treatment='t')
+        entry = Logbook.objects.create(user=self.user, plant=plant)
+        _, _, disease_cursor = self.sync_all('diseases')
+        plant.delete()
+        self.assertEqual(self.sync_all('diseases', disease_cursor)[1], [disease.id])
+        self.assertTrue(Tombstone.objects.filter(
+            model='logbook', object_id=entry.id, owner_id=self.user.id).exists())
+
+    def test_user_feeds_are_scoped(self):
+        plant = self.make_plant('Tulsi')
+        mine = Logbook.objects.create(user=self.user, plant=plant)
+        Logbook.objects.create(user=self.other, plant=plant)
+        self.assertEqual(
+            self.client.get('/api/sync/logbook/').status_code, 401)
+        self.client.force_login(self.user)
+        changed, _, cursor = self.sync_all('logbook')
+        self.assertEqual(changed, [mine.id])
+
+        Logbook.objects.filter(user=self.other).delete()
+        mine_id = mine.id
+        mine.delete()
+        self.assertEqual(self.sync_all('logbook', cursor)[1], [mine_id])
+
+    def test_fresh_client_skips_old_tombstones(self):
+        self.make_plant('Old').delete()
+        kept = self.make_plant('Kept')
+        self.assertEqual(self.sync_all('plants')[:2], ([kept.id], []))
+
+    def test_unsettled_rows_wait_for_the_next_sync(self):
+        self.make_plant('Neem')
+        with override_settings(SYNC_SETTLE_SECONDS=60):
+            page = self.sync('plants')
+        self.assertEqual(page['changed'], [])
+        self.assertEqual(len(self.sync('plants', page['cursor'])['changed']), 1)
+
+    def test_bad_and_expired_cursors(self):
+        self.assertEqual(self.client.get(
+            '/api/sync/plants/', {'cursor': 'nope'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/sync/weeds/').status_code, 404)
+        now = '2026-01-01T00:00:00+00:00'
+        for key in ({'changed': None, 'deleted': ['2026-01-01T00:00:00', 1]},
+                    {'changed': None, 'deleted': None},
+                    {'changed': [now, '1'], 'deleted': [now, 1]},
+                    [now, 1]):
+            crafted = base64.urlsafe_b64encode(json.dumps(key).encode()).decode()
+            self.assertEqual(self.client.get(
+                '/api/sync/plants/', {'cursor': crafted}).status_code, 400, key)
+        cursor = self.sync('plants')['cursor']
+        with override_settings(SYNC_TOMBSTONE_DAYS=0):
+            self.assertEqual(self.client.get(
+                '/api/sync/plants/', {'cursor': cursor}).status_code, 410)
+
+    def test_prune_tombstones(self):
+        self.make_plant('Mint').delete()
+        Tombstone.objects.update(deleted_at=timezone.now() - timedelta(days=100))
+        self.make_plant('Basil').delete()
+        self.assertEqual(prune_tombstones(days=90), 1)
+        self.assertEqual(Tombstone.objects.count(), 1)
+
+
+# ==========================================
+# LOGBOOK IMAGE VARIANTS
+# ==========================================
+class LogbookMediaTestCase(TestCase):
+    def setUp(self):
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media)
+        overrides = override_settings(
+            MEDIA_ROOT=self.media, LOGBOOK_IMAGE_WORKERS=0,
+            LOGBOOK_IMAGE_SIZES={'thumb': 64, 'medium': 256})
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.user = User.objects.create(username='gardener')
+        self.plant = Plant.objects.create(
+            common_name='Rose', scientific_name='Rosa', plant_type='outdoor',
+            size='small', toxicity='non_toxic', edibility='edible')
+
+    def photo(self, name='leaf.jpg', size=(1200, 900), color=(40, 120, 40)):
+        buffer = BytesIO()
+        Image.new('RGB', size, color).save(buffer, 'JPEG')
+        return SimpleUploadedFile(name, buffer.getvalue(), 'image/jpeg')
+
+    def make_entry(self, **kwargs):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Logbook.objects.create(user=self.user, plant=self.plant, **kwargs)
+
+
+class LogbookImageVariantTests(LogbookMediaTestCase):
+    def test_variants_generated_after_upload(self):
+        entry = self.make_entry(image=self.photo())
+        entry.refresh_from_db()
+        self.assertEqual(entry.image_variants['source'], entry.image.name)
+        self.assertEqual(
+            sorted(k for k in entry.image_variants if k != 'source'),
+            ['medium_jpeg', 'medium_webp', 'thumb_jpeg', 'thumb_webp'])
+        with entry.image.storage.open(entry.image_variants['thumb_webp']) as f:
+            image = Image.open(f)
+            self.assertEqual((image.format, max(image.size)), ('WEBP', 64))
+
+        data = LogbookSerializer(entry).data
+        self.assertTrue(data['image_variants']['thumb_jpeg'].endswith('_thumb.jpg'))
+
+    def test_replaced_image_gets_new_variants(self):
+        entry = self.make_entry(image=self.photo())
+        entry.refresh_from_db()
+        old = entry.image_variants
+        entry.image = self.photo('other.jpg', color=(200, 30, 30))
+        with self.captureOnCommitCallbacks(execute=True):
+            entry.save()
+        entry.refresh_from_db()
+        self.assertNotEqual(entry.image_variants['source'], old['source'])
+        self.assertNotEqual(entry.image_variants['thumb_jpeg'], old['thumb_jpeg'])
+        # the old photo was only used here: collected with its variants
+        storage = entry.image.storage
+        self.assertFalse(storage.exists(old['source']))
+        self.assertFalse(storage.exists(old['thumb_jpeg']))
+
+    @override_settings(SYNC_SETTLE_SECONDS=0)
+    def test_sync_feed_has_absolute_urls(self):
+        self.make_entry(image=self.photo())
+        self.client.force_login(self.user)
+        changed = self.client.get('/api/sync/logbook/').json()['changed']
+        self.assertTrue(changed[0]['image'].startswith('http://testserver/'))
+        self.assertEqual(len(changed[0]['image_variants']), 4)
+        for url in changed[0]['image_variants'].values():
+            self.assertTrue(url.startswith('http://testserver/'), url)
+
+    def test_no_image_no_variants(self):
+        entry = self.make_entry()
+        self.assertEqual(LogbookSerializer(entry).data['image_variants'], {})
+
+    def test_backfill_command(self):
+        entry = self.make_entry(image=self.photo())
+        Logbook.objects.filter(pk=entry.pk).update(image_variants={})
+        self.assertEqual(LogbookSerializer(
+            Logbook.objects.get(pk=entry.pk)).data['image_variants'], {})
+        call_command('generate_logbook_variants', workers=1, stdout=StringIO())
+        self.assertEqual(
+            len(Logbook.objects.get(pk=entry.pk).image_variants), 5)
+
+
+# ==========================================
+# DEDUPLICATED LOGBOOK MEDIA
+# ==========================================
+class MediaBlobTests(LogbookMediaTestCase):
+    def test_same_photo_stored_once(self):
+        first = self.make_entry(image=self.photo('a.jpg'))
+        second = self.make_entry(image=self.photo('b.jpg'))
+        self.assertEqual(first.image.name, second.image.name)
+        blob = MediaBlob.objects.get()
+        self.assertEqual((blob.name, blob.ref_count), (first.image.name, 2))
+        self.assertEqual(len(os.listdir(os.path.dirname(first.image.path))), 1)
+
+    def test_blob_collected_with_last_reference(self):
+        first = self.make_entry(image=self.photo())
+        second = self.make_entry(image=self.photo())
+        name = first.image.name
+        second.refresh_from_db()
+        variant = second.image_variants['thumb_webp']
+        storage = first.image.storage
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        self.assertEqual(MediaBlob.objects.get(name=name).ref_count, 1)
+        self.assertTrue(storage.exists(name))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            second.delete()
+        self.assertFalse(MediaBlob.objects.exists())
+        self.assertFalse(storage.exists(name))
+        self.assertFalse(storage.exists(variant))
+
+    def test_uploading_the_same_photo_again_keeps_one_reference(self):
+        entry = self.make_entry(image=self.photo())
+        entry.image = self.photo('again.jpg')
+        with self.captureOnCommitCallbacks(execute=True):
+            entry.save()
+        self.assertEqual(MediaBlob.objects.get().ref_count, 1)
+
+    def test_assigning_a_stored_image_counts(self):
+        first = self.make_entry(image=self.photo())
+        second = self.make_entry()
+        second.image = first.image.name
+        with self.captureOnCommitCallbacks(execute=True):
+            second.save()
+        self.assertEqual(MediaBlob.objects.get().ref_count, 2)
+
+    def test_gc_command_adopts_legacy_images(self):
+        storage = Logbook._meta.get_field('image').storage
+        for name in ('legacy1.jpg', 'legacy2.jpg'):
+            with open(os.path.join(self.media, name), 'wb') as f:
+                f.write(self.photo().read())
+            with self.captureOnCommitCallbacks(execute=True):
+                entry = self.make_entry()
+            Logbook.objects.filter(pk=entry.pk).update(image=name, image_variants={
+                'source': name, 'thumb_jpeg': 'logbook_images/variants/legacy_thumb.jpg'})
+        before = timezone.now()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('gc_media_blobs', adopt=True, stdout=StringIO())
+        names = set(Logbook.objects.values_list('image', flat=True))
+        self.assertEqual(len(names), 1)
+        for entry in Logbook.objects.all():
+            self.assertEqual(entry.image_variants, {})
+            self.assertGreaterEqual(entry.updated_at, before)
+        self.assertEqual(MediaBlob.objects.get().ref_count, 2)
+        self.assertFalse(storage.exists('legacy1.jpg'))
+
+
+# ==========================================
+# COMPRESSION & HTTP CACHING
+# ==========================================
+class HttpCachingTests(TestCase):
+    def setUp(self):
+        self.plant = Plant.objects.create(
+            common_name='Rose', scientific_name='Rosa indica', plant_type='outdoor',
+            size='small', toxicity='non_toxic', edibility='edible',
+            description='A woody perennial flowering plant. ' * 20)
+
+    def test_gzip_negotiated(self):
+        url = '/api/external/complete/?name=Rose'
+        plain = self.client.get(url)
+        self.assertNotIn('Content-Encoding', plain)
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertEqual(gzip.decompress(response.content), plain.content)
+        self.assertLess(len(response.content), len(plain.content))
+
+    @override_settings(PLANT_INFO_MAX_AGE=600)
+    def test_catalogue_answer_cache_headers_and_304(self):
+        url = '/api/external/complete/?name=Rose'
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertIn('max-age=600', response['Cache-Control'])
+        self.assertIn('public', response['Cache-Control'])
+        self.assertTrue(response['ETag'].startswith('W/'))  # weakened by gzip
+
+        again = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip',
+            HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(again.status_code, 304)
+        again = self.client.get(url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(again.status_code, 304)
+
+        self.plant.watering = 'Twice a week'
+        self.plant.save()
+        changed = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip',
+            HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(changed.status_code, 200)
+
+    def test_freshness_follows_the_cache_entry(self):
+        entry = PlantInfoCache.objects.create(key='tulsi')
+        now = time.time()
+        entry.sections = {
+            'wikipedia': {'value': ['d', None, None], 'fetched_at': now - 100},
+            'hindi_name': {'value': 'तुलसी', 'fetched_at': now - 10},
+        }
+        freshness = plant_cache.freshness(entry, ['wikipedia', 'hindi_name', 'plant_data'])
+        ttl = plant_cache.get_ttl('wikipedia')
+        self.assertAlmostEqual(freshness.max_age, ttl - 100, delta=2)
+        self.assertAlmostEqual(freshness.last_modified.timestamp(), now - 10, delta=1)
+        self.assertEqual(plant_cache.freshness(entry, ['plant_data']).max_age, 0)
+
+    def test_list_revalidates(self):
+        response = self.client.get('/api/plants/')
+        self.assertEqual(response['Cache-Control'], 'no-cache')
+        again = self.client.get('/api/plants/', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(again.status_code, 304)
+
+    def test_compressed_downloads_left_alone(self):
+        request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING='gzip, br')
+        compression = middleware.CompressionMiddleware(lambda request: None)
+        response = compression.process_response(request, HttpResponse(
+            b'x' * 1000, content_type='application/gzip'))
+        self.assertNotIn('Content-Encoding', response)
+
+    def test_sync_streams_are_not_buffered(self):
+        request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING='gzip, br')
+        compression = middleware.CompressionMiddleware(lambda request: None)
+        lines = [b'{"name": "Rose %d"}\n' % i for i in range(20)]
+        response = compression.process_response(request, StreamingHttpResponse(
+            iter(lines), content_type='application/x-ndjson'))
+        self.assertNotIn('Content-Encoding', response)
+        self.assertEqual(list(response.streaming_content), lines)
+
+    def test_html_is_never_brotli(self):
+        request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING='gzip, br')
+        compression = middleware.CompressionMiddleware(lambda request: None)
+        response = compression.process_response(request, HttpResponse(
+            b'<input name="csrfmiddlewaretoken" value="secret">' * 20))
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+
+    def test_brotli_preferred_when_installed(self):
+        if middleware.brotli is None:
+            self.skipTest('brotli not installed')
+        response = self.client.get('/api/external/complete/?name=Rose',
+            HTTP_ACCEPT_ENCODING='gzip, br')
+        self.assertEqual(response['Content-Encoding'], 'br')
+
+
+# ==========================================
+# PLANT INFO CACHE
+# ==========================================
+class PlantInfoCacheTests(TestCase):
+    def setUp(self):
+        self.calls = []
+        patches = [
+            mock.patch.object(plant_service, 'fetch_wikipedia',
+                lambda name: self.fetched('wikipedia', ['About', None, None])),
+            mock.patch.object(plant_service.GoogleTranslateAPI, 'translate_to_hindi',
+                lambda name: self.fetched('hindi_name', self.hindi or name)),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        self.hindi = 'गुड़हल'
+
+    def fetched(self, source, value):
+        self.calls.append(source)
+        return value
+
+    def plant_data(self, name):
+        return self.fetched('plant_data', {'scientific_name': 'Hibiscus rosa-sinensis'})
+
+    def test_sections_expire_on_their_own_ttl(self):
+        sections, missing, _ = plant_service.collect_sections('Hibiscus', self.plant_data)
+        self.assertEqual(missing, [])
+        self.assertEqual(sorted(self.calls), ['hindi_name', 'plant_data', 'wikipedia'])
+
+        self.calls.clear()
+        again, missing, _ = plant_service.collect_sections(' HIBISCUS ', self.plant_data)
+        self.assertEqual((self.calls, missing, again), ([], [], sections))
+
+        entry = PlantInfoCache.objects.get(key='hibiscus')
+        self.assertEqual((entry.hit_count, entry.miss_count), (1, 1))
+        entry.sections['wikipedia']['fetched_at'] -= plant_cache.get_ttl('wikipedia') + 1
+        entry.save()
+        plant_service.collect_sections('Hibiscus', self.plant_data)
+        self.assertEqual(self.calls, ['wikipedia'])
+
+    def test_unknown_names_are_not_stored(self):
+        self.hindi = None  # translator failure: echoes the input
+        with mock.patch.object(plant_service, 'fetch_wikipedia', lambda name: None):
+            sections, missing, freshness = plant_service.collect_sections(
+                'Xqzzyplant', lambda name: None)
+        self.assertEqual((sections, sorted(missing)),
+                         ({}, ['hindi_name', 'plant_data', 'wikipedia']))
+        self.assertEqual(freshness.max_age, 0)
+        self.assertFalse(PlantInfoCache.objects.exists())
+
+    def test_translator_echo_is_a_miss(self):
+        self.hindi = None
+        sections, missing, _ = plant_service.collect_sections('Xqzzy fern', self.plant_data)
+        self.assertEqual(missing, ['hindi_name'])
+        entry = PlantInfoCache.objects.get(key='xqzzy fern')
+        self.assertNotIn('hindi_name', entry.sections)
+
+    def test_purge(self):
+        for key in ('rose', 'tulsi', 'neem'):
+            PlantInfoCache.objects.create(key=key)
+        self.assertEqual(plant_cache.purge('  ROSE '), 1)
+        self.assertEqual(plant_cache.purge('rose'), 0)
+        self.assertEqual(plant_cache.purge(), 2)
+        self.assertFalse(PlantInfoCache.objects.exists())
+
+
+class FetchCoalescingTests(TestCase):
+    def setUp(self):
+        self.calls = []
+        patches = [
+            mock.patch.object(plant_service, 'fetch_wikipedia',
+                lambda name: self.calls.append('wikipedia')),
+            mock.patch.object(plant_service, 'fetch_hindi_name',
+                lambda name: self.calls.append('hindi_name')),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def plant_data(self, name):
+        self.calls.append('plant_data')
+
+    def hold_lease(self, key, seconds=60):
+        return PlantInfoCache.objects.create(key=key,
+            fetch_lease_until=timezone.now() + timedelta(seconds=seconds))
+
+    def test_single_flight_shares_one_call(self):
+        flights, started, release = SingleFlight(), threading.Event(), threading.Event()
+        runs, results = [], []
+
+        def work():
+            runs.append(1)
+            started.set()
+            release.wait(5)
+            return 'result'
+
+        leader = threading.Thread(target=lambda: results.append(flights.do('rose', work)))
+        leader.start()
+        started.wait(5)
+        followers = [threading.Thread(target=lambda: results.append(flights.do('rose', work)))
+                     for _ in range(3)]
+        for thread in followers:
+            thread.start()
+        time.sleep(0.05)
+        release.set()
+        for thread in [leader] + followers:
+            thread.join(5)
+        self.assertEqual((len(runs), results), (1, ['result'] * 4))
+
+    def test_waiter_reports_the_leaders_misses(self):
+        entry = self.hold_lease('banyan')
+        real_sleep = time.sleep
+
+        def leader_finishes(seconds):
+            entry.set_section('wikipedia', ['A fig tree', None, None])
+            entry.fetch_lease_until = None
+            entry.save()
+            real_sleep(0)
+
+        with mock.patch.object(plant_cache.time, 'sleep', leader_finishes):
+            sections, missing, _ = plant_service.collect_sections('Banyan', self.plant_data)
+        self.assertEqual(self.calls, [])
+        self.assertEqual(sections['wikipedia'], ['A fig tree', None, None])
+        self.assertIn('plant_data', missing)
+
+    @override_settings(EXTERNAL_API_DEADLINE=0.3)
+    def test_waiter_stays_within_the_deadline(self):
+        self.hold_lease('peepal')
+        start = time.monotonic()
+        sections, missing, _ = plant_service.collect_sections('Peepal', self.plant_data)
+        self.assertLess(time.monotonic() - start, 0.6)
+        self.assertEqual(self.calls, [])
+        self.assertIn('plant_data', missing)
+
+    def test_expired_lease_is_taken_over(self):
+        self.hold_lease('ashoka', seconds=-1)
+        plant_service.collect_sections('Ashoka', self.plant_data)
+        self.assertEqual(sorted(self.calls), ['hindi_name', 'plant_data', 'wikipedia'])
+
+
+# ==========================================
+# ASYNC VIEWS
+# ==========================================
+class AsyncViewAuthTests(TestCase):
+    def post_batch(self, **headers):
+        request = RequestFactory().post('/api/external/batch/', {'names': ['Rose']},
+            content_type='application/json', **headers)
+        async def call():
+            return await async_views.get_batch_plant_info(request)
+        return async_to_sync(call)()
+
+    def test_anonymous_is_401(self):
+        self.assertEqual(self.post_batch().status_code, 401)
+
+    def test_invalid_token_is_401(self):
+        response = self.post_batch(HTTP_AUTHORIZATION='Token bogus')
+        self.assertEqual(response.status_code, 401)
+        self.assertIn('Invalid token', response.content.decode())
+
+
+# ==========================================
+# BATCH ENDPOINT
+# ==========================================
+def fake_plant_info(plant_name):
+    if plant_name == 'Broken':
+        raise ValueError('provider down')
+    if plant_name == 'Slow':
+        time.sleep(0.2)
+    return {'common_name': plant_name}
+
+
+async def afake_plant_info(plant_name):
+    if plant_name == 'Slow':
+        await asyncio.sleep(0.2)
+    return fake_plant_info(plant_name)
+
+
+@override_settings(BATCH_MAX_NAMES=4, BATCH_MAX_PARALLEL=4)
+class BatchEndpointTests(TestCase):
+    """Both the DRF view and the native async view"""
+
+    def setUp(self):
+        self.user = User.objects.create(username='batcher')
+        self.token = Token.objects.create(user=self.user)
+
+    def post_sync(self, body):
+        self.client.force_login(self.user)
+        with mock.patch('api.views.get_plant_info', fake_plant_info):
+            response = self.client.post('/api/external/batch/', body,
+                content_type='application/json')
+            if response.streaming:
+                return response, [json.loads(line) for line in b''.join(
+                    response.streaming_content).decode().splitlines()]
+        return response, None
+
+    def post_async(self, body):
+        request = RequestFactory().post('/api/external/batch/', body,
+            content_type='application/json',
+            HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+        async def call():
+            response = await async_views.get_batch_plant_info(request)
+            if not response.streaming:
+                return response, None
+            chunks = [chunk async for chunk in response.streaming_content]
+            return response, [json.loads(line)
+                for line in b''.join(chunks).decode().splitlines()]
+
+        with mock.patch.object(async_views, 'aget_plant_info', afake_plant_info):
+            return async_to_sync(call)()
+
+    def test_lines_stream_as_each_plant_completes(self):
+        for post in (self.post_sync, self.post_async):
+            response, lines = post({'names': ['Slow', 'Rose', 'rose ', 'Tulsi']})
+            self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+            self.assertEqual([line['name'] for line in lines][-1], 'Slow')
+            self.assertEqual(sorted(line['name'] for line in lines),
+                ['Rose', 'Slow', 'Tulsi'])  # 'rose ' folded into 'Rose'
+            self.assertEqual(lines[-1]['result'], {'common_name': 'Slow'})
+
+    def test_a_failing_plant_gets_an_error_line(self):
+        for post in (self.post_sync, self.post_async):
+            _, lines = post({'names': ['Broken', 'Rose']})
+            by_name = {line['name']: line for line in lines}
+            self.assertEqual(by_name['Broken'], {'name': 'Broken', 'error': 'provider down'})
+            self.assertEqual(by_name['Rose']['result'], {'common_name': 'Rose'})
+
+    def test_too_many_names_is_400(self):
+        for post in (self.post_sync, self.post_async):
+            response, _ = post({'names': ['A', 'B', 'C', 'D', 'E']})
+            self.assertEqual(response.status_code, 400)
+            self.assertIn('At most 4 names', response.content.decode())
+            # repeats do not count against the limit
+            response, lines = post({'names': ['A', 'a', 'B', 'C', 'D']})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(lines), 4)
+
+    def test_missing_or_malformed_names_is_400(self):
+        for post in (self.post_sync, self.post_async):
+            for body in ({}, {'names': 'Rose'}, {'names': []}, {'names': [1, ' ']}):
+                self.assertEqual(post(body)[0].status_code, 400, body)
+
+    def test_anonymous_is_rejected(self):
+        response = self.client.post('/api/external/batch/', {'names': ['Rose']},
+            content_type='application/json')
+        self.assertEqual(response.status_code, 401)
+
+
+# ==========================================
+# CATALOGUE WRITE-BACK
+# ==========================================
+class CatalogueWriteBackTests(TestCase):
+    DETAILS = {
+        'common_name': 'Oleander',
+        'scientific_name': 'Nerium oleander',
+        'description': 'Nerium oleander is a shrub in the dogbane family.',
+        'hindi_name': 'कनेर',
+        'indoor_outdoor': 'Outdoor',
+        'toxic': 'Non-toxic to humans in small doses but toxic to cats and dogs',
+        'edible': 'Flowers are edible when cooked, seeds are poisonous',
+        'diseases': [{'name': 'Leaf scorch', 'symptom': 's', 'treatment': 't'}],
+    }
+
+    def test_toxicity_mixed_text(self):
+        cases = {
+            'Non-toxic to humans but toxic to cats and dogs': 'toxic_pets',
+            'Not toxic to humans; toxic to pets': 'toxic_pets',
+            'Non-toxic and safe for humans and pets': 'non_toxic',
+            'No known toxicity': 'non_toxic',
+            'Contains toxic compounds, avoid ingestion': 'toxic_humans',
+            'Not toxic to pets, but highly toxic to humans if eaten': 'highly_toxic',
+            'Toxicity information not available': None,
+        }
+        for text, expected in cases.items():
+            self.assertEqual(catalogue.classify_toxicity(text), expected, text)
+
+    def test_edibility_mixed_text(self):
+        cases = {
+            'Leaves are edible, seeds are poisonous': 'edible',
+            'Not edible, not safe for consumption': 'non_edible',
+            'Non-toxic but not edible': 'non_edible',
+            'Poisonous, do not consume': 'poisonous',
+            'Used medicinally, consume only in recommended amounts': 'medicinal',
+            'Edibility information not available': 'non_edible',
+        }
+        for text, expected in cases.items():
+            self.assertEqual(catalogue.classify_edibility(text), expected, text)
+
+    def test_descriptive_text_round_trips(self):
+        plant = catalogue.save_plant_from_details(self.DETAILS)
+        self.assertEqual((plant.toxicity, plant.edibility, plant.size),
+                         ('toxic_pets', 'edible', ''))
+        details = catalogue.plant_to_details(catalogue.find_local_plant('oleander'))
+        self.assertEqual(details['toxic'], self.DETAILS['toxic'])
+        self.assertEqual(details['edible'], self.DETAILS['edible'])
+        self.assertEqual(len(details['diseases']), 1)
+
+    def test_one_row_per_name(self):
+        first = catalogue.save_plant_from_details(self.DETAILS)
+        again = catalogue.save_plant_from_details(dict(self.DETAILS, common_name='OLEANDER'))
+        self.assertEqual(first.pk, again.pk)
+        self.assertEqual(Disease.objects.count(), 1)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Plant.objects.create(common_name='oleander', scientific_name='x',
+                plant_type='outdoor', toxicity='toxic_pets', edibility='edible')
+
+    def test_only_confident_answers_are_written_back(self):
+        self.assertTrue(catalogue.is_confident(self.DETAILS, []))
+        self.assertFalse(catalogue.is_confident(self.DETAILS, ['hindi_name']))
+        made_up = dict(self.DETAILS, common_name='Olaender',
+            description='Olaender may refer to a village.')
+        self.assertFalse(catalogue.is_confident(made_up, []))
+        plant_service._write_back(made_up, [])
+        self.assertFalse(Plant.objects.exists())
+
+
+# ==========================================
+# FULL-TEXT SEARCH
+# ==========================================
+class SearchTests(TestCase):
+    def setUp(self):
+        self.tulsi = Plant.objects.create(
+            common_name='Tulsi', scientific_name='Ocimum tenuiflorum',
+            hindi_name='तुलसी', plant_type='outdoor', toxicity='non_toxic',
+            edibility='medicinal', care_tips='Pinch the flowers')
+        self.basil = Plant.objects.create(
+            common_name='Sweet basil', scientific_name='Ocimum basilicum',
+            plant_type='both', toxicity='non_toxic', edibility='edible',
+            care_tips='Grows well next to tulsi')
+        self.blight = Disease.objects.create(
+            plant=self.basil, name='Downy mildew',
+            symptoms='Yellow leaves with grey fuzz', treatment='Copper spray')
+
+    def names(self, query):
+        return [plant.common_name for plant in search.search_plants(query)]
+
+    def test_fts5_index_exists(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('SQLite FTS5 only')
+        self.assertIn('api_plant_fts', connection.introspection.table_names())
+
+    def test_name_matches_rank_first(self):
+        self.assertEqual(self.names('tulsi'), ['Tulsi', 'Sweet basil'])
+        self.assertEqual(sorted(self.names('ocimum')), ['Sweet basil', 'Tulsi'])
+        self.assertEqual(self.names('तुलसी'), ['Tulsi'])
+        self.assertEqual(self.names('bas'), ['Sweet basil'])  # prefix
+        self.assertEqual(self.names('tulsi pinch'), ['Tulsi'])  # all terms
+        self.assertEqual(self.names('"(*'), [])
+
+    def test_triggers_follow_updates_and_deletes(self):
+        self.tulsi.care_tips = 'Water daily'
+        self.tulsi.save()
+        self.assertEqual(self.names('pinch'), [])
+        self.assertEqual(self.names('daily'), ['Tulsi'])
+        self.basil.delete()
+        self.assertEqual(self.names('ocimum'), ['Tulsi'])
+        self.assertEqual(search.search_diseases('mildew'), [])
+
+    def test_search_endpoint(self):
+        response = self.client.get('/api/search/', {'q': 'yellow leaves'})
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['plants'], [])
+        self.assertEqual([d['name'] for d in data['diseases']], ['Downy mildew'])
+        self.assertEqual(data['diseases'][0]['plant_name'], 'Sweet basil')
+
+        plants = self.client.get('/api/search/', {'q': 'tulsi', 'type': 'plants'}).json()
+        self.assertNotIn('diseases', plants)
+        self.assertGreater(plants['plants'][0]['rank'], plants['plants'][1]['rank'])
+
+        self.assertEqual(self.client.get('/api/search/').status_code, 400)
+        self.assertEqual(self.client.get(
+            '/api/search/', {'q': 'x', 'type': 'users'}).status_code, 400)
+
+
+# ==========================================
+# OFFLINE PACKAGES
+# ==========================================
+class OfflinePackageTests(TestCase):
+    COLUMNS = ['id'] + offline_packages.FTS_COLUMNS
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp, ignore_errors=True)
+        self.package_dir = os.path.join(self.tmp, 'packages')
+        self.source = os.path.join(self.tmp, 'source.db')
+        conn = sqlite3.connect(self.source)
+        conn.execute(f'CREATE TABLE plants (id INTEGER PRIMARY KEY, '
+                     f'{", ".join(self.COLUMNS[1:])})')
+        conn.executemany(f'INSERT INTO plants VALUES ({", ".join("?" * len(self.COLUMNS))})', [
+            (i, name, hindi, '', '', f'{name} description', 'weekly', 'sun', 'loam')
+            for i, (name, hindi) in enumerate(
+                [('Rose', 'गुलाब'), ('Tulsi', 'तुलसी'), ('Neem', 'नीम')], start=1)])
+        conn.commit()
+        conn.close()
+        override = override_settings(OFFLINE_PACKAGE_DIR=self.package_dir)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def test_interrupted_build_is_not_published(self):
+        names = os.path.join(self.tmp, 'names.txt')
+        with open(names, 'w', encoding='utf-8') as f:
+            f.write('Rose\nTulsi\n')
+        output = os.path.join(self.tmp, 'offline.db')
+
+        def fetch_plant(name, limits):
+            if name == 'Tulsi':
+                raise KeyboardInterrupt
+            return name, (name,) + ('',) * 17
+
+        with mock.patch.object(build_offline_db, 'fetch_plant', fetch_plant), \
+                mock.patch.object(offline_packages, 'publish') as publish, \
+                mock.patch('sys.stdout', new_callable=StringIO):
+            with self.assertRaises(SystemExit) as raised:
+                build_offline_db.main(['--names', names, '--output', output,
+                    '--workers', '1', '--publish', '--package-dir', self.package_dir])
+        self.assertEqual(raised.exception.code, 130)
+        publish.assert_not_called()
+        conn = sqlite3.connect(output)
+        self.assertEqual(conn.execute('SELECT common_name FROM plants').fetchall(), [('Rose',)])
+        conn.close()
+
+    def edit_source(self, *statements):
+        conn = sqlite3.connect(self.source)
+        for statement in statements:
+            conn.execute(statement)
+        conn.commit()
+        conn.close()
+
+    def unpacked(self, version):
+        manifest = offline_packages.read_manifest(self.package_dir)
+        path = os.path.join(self.tmp, f'unpacked-v{version}.db')
+        offline_packages._gunzip_to(os.path.join(
+            self.package_dir, manifest['versions'][str(version)]['file']), path)
+        return path
+
+    def fts_matches(self, db_path, *queries):
+        conn = sqlite3.connect(db_path)
+        try:
+            conn.execute("INSERT INTO plants_fts(plants_fts) VALUES ('integrity-check')")
+            return [sorted(row[0] for row in conn.execute(
+                'SELECT rowid FROM plants_fts WHERE plants_fts MATCH ?', (query,)))
+                for query in queries]
+        finally:
+            conn.close()
+
+    def get_update(self, version):
+        return self.client.get('/api/offline/update/', {'version': version})
+
+    def test_delta_reproduces_the_full_package(self):
+        self.assertEqual(offline_packages.publish(self.source, self.package_dir), 1)
+        self.edit_source(
+            "UPDATE plants SET description = 'Holy basil' WHERE id = 2",
+            'DELETE FROM plants WHERE id = 3',
+            "INSERT INTO plants VALUES (4, 'Marigold', 'गेंदा', '', '', "
+            "'Marigold description', 'daily', 'sun', 'loam')")
+        self.assertEqual(offline_packages.publish(self.source, self.package_dir), 2)
+
+        device = self.unpacked(1)
+        manifest = offline_packages.read_manifest(self.package_dir)
+        with gzip.open(os.path.join(
+                self.package_dir, manifest['deltas']['1-2']['file'])) as f:
+            delta = json.load(f)
+        self.assertEqual((len(delta['upsert']), delta['delete']), (2, [3]))
+        offline_packages.apply_delta(device, delta)
+
+        full = self.unpacked(2)
+        self.assertEqual(offline_packages.read_rows(device), offline_packages.read_rows(full))
+        queries = ('holy', 'neem', 'marigold', 'गेंदा', 'description')
+        self.assertEqual(self.fts_matches(device, *queries), self.fts_matches(full, *queries))
+        self.assertEqual(self.fts_matches(device, 'holy', 'neem'), [[2], []])
+
+    def test_unchanged_content_is_not_republished(self):
+        self.assertEqual(offline_packages.publish(self.source, self.package_dir), 1)
+        files = sorted(os.listdir(self.package_dir))
+        self.assertEqual(offline_packages.publish(self.source, self.package_dir), 1)
+        self.assertEqual(sorted(os.listdir(self.package_dir)), files)
+
+    def test_update_endpoint(self):
+        self.assertEqual(self.get_update(0).status_code, 404)
+        offline_packages.publish(self.source, self.package_dir)
+        self.edit_source("UPDATE plants SET watering = 'daily' WHERE id = 1")
+        offline_packages.publish(self.source, self.package_dir)
+
+        response = self.get_update(2)
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(response['X-Offline-Version'], '2')
+
+        response = self.get_update(0)
+        self.assertEqual(response['X-Offline-Package'], 'full')
+        self.assertEqual(gzip.decompress(b''.join(response.streaming_content))[:15],
+                         b'SQLite format 3')
+
+        response = self.get_update(1)
+        self.assertEqual(response['X-Offline-Package'], 'delta')
+        delta = json.loads(gzip.decompress(b''.join(response.streaming_content)))
+        self.assertEqual((delta['from'], delta['to']), (1, 2))
+
+    def test_pruned_delta_falls_back_to_the_full_package(self):
+        offline_packages.publish(self.source, self.package_dir)
+        self.edit_source("UPDATE plants SET watering = 'daily' WHERE id = 1")
+        offline_packages.publish(self.source, self.package_dir)
+        manifest = offline_packages.read_manifest(self.package_dir)
+        os.remove(os.path.join(self.package_dir, manifest['deltas']['1-2']['file']))
+
+        response = self.get_update(1)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Offline-Package'], 'full')
+        self.assertEqual(response['ETag'], '"%s"' % manifest['versions']['2']['sha256'])
+        response.close()
+
+
+# ==========================================
+# FAN-OUT
+# ==========================================
+class FanOutTests(TestCase):
+    def test_partial_results_at_the_deadline(self):
+        def fail():
+            raise RuntimeError('upstream down')
+
+        start = time.monotonic()
+        results, missing = fanout.fan_out({
+            'fast': lambda: 'wiki',
+            'slow': lambda: time.sleep(1) or 'late',
+            'broken': fail,
+        }, timeout=0.2)
+        self.assertLess(time.monotonic() - start, 0.8)
+        self.assertEqual(results, {'fast': 'wiki'})
+        self.assertEqual(sorted(missing), ['broken', 'slow'])
+
+    def test_async_partial_results_cancel_the_rest(self):
+        cancelled = []
+
+        async def slow():
+            try:
+                await asyncio.sleep(1)
+            except asyncio.CancelledError:
+                cancelled.append('slow')
+                raise
+
+        async def fast():
+            return 'wiki'
+
+        async def fail():
+            raise RuntimeError('upstream down')
+
+        async def run():
+            outcome = await fanout.afan_out(
+                {'fast': fast, 'slow': slow, 'broken': fail}, timeout=0.2)
+            await asyncio.sleep(0)  # let the cancellation be delivered
+            return outcome
+
+        results, missing = async_to_sync(run)()
+        self.assertEqual(results, {'fast': 'wiki'})
+        self.assertEqual(sorted(missing), ['broken', 'slow'])
+        self.assertEqual(cancelled, ['slow'])
+
+    def test_no_calls(self):
+        self.assertEqual(fanout.fan_out({}), ({}, []))
+        self.assertEqual(async_to_sync(fanout.afan_out)({}), ({}, []))
+
+
+# ==========================================
+# HTTP CLIENT
+# ==========================================
+class ScriptedHandler(BaseHTTPRequestHandler):
+    """Answers 503 `failures` times, then the document with an ETag (304 if it matches)"""
+    failures = 0
+    requests = []
+
+    def do_GET(self):
+        type(self).requests.append(self.headers.get('If-None-Match'))
+        if type(self).failures:
+            type(self).failures -= 1
+            self.send_response(503)
+            self.send_header('Content-Length', '0')
+        elif self.headers.get('If-None-Match') == '"v1"':
+            self.send_response(304)
+        else:
+            body = b'{"title": "Rose"}'
+            self.send_response(200)
+            self.send_header('ETag', '"v1"')
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+class HttpClientTests(TestCase):
+    def setUp(self):
+        ScriptedHandler.failures, ScriptedHandler.requests = 0, []
+        server = ThreadingHTTPServer(('127.0.0.1', 0), ScriptedHandler)
+        threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        self.url = f'http://127.0.0.1:{server.server_port}/summary/Rose'
+
+        patches = [
+            mock.patch.object(http_client, 'etag_cache', http_client.ETagCache(10)),
+            mock.patch.object(http_client, 'RETRY_BACKOFF', 0.01),
+            mock.patch.object(http_client, '_session', None),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def test_retries_then_revalidates(self):
+        ScriptedHandler.failures = 2
+        self.assertEqual(http_client.get_json(self.url), {'title': 'Rose'})
+        self.assertEqual(http_client.get_json(self.url), {'title': 'Rose'})
+        self.assertEqual(ScriptedHandler.requests, [None, None, None, '"v1"'])
+
+    def test_gives_up_after_max_retries(self):
+        ScriptedHandler.failures = http_client.MAX_RETRIES + 1
+        self.assertIsNone(http_client.get_json(self.url))
+        self.assertEqual(len(ScriptedHandler.requests), http_client.MAX_RETRIES + 1)
+
+    def test_async_retries_then_revalidates(self):
+        ScriptedHandler.failures = 2
+        self.assertEqual(async_to_sync(http_client.aget_json)(self.url), {'title': 'Rose'})
+        self.assertEqual(async_to_sync(http_client.aget_json)(self.url), {'title': 'Rose'})
+        self.assertEqual(ScriptedHandler.requests, [None, None, None, '"v1"'])
+
+    def test_etag_cache_evicts_least_recently_used(self):
+        cache = http_client.ETagCache(2)
+        cache.set('a', '"1"', 'A')
+        cache.set('b', '"2"', 'B')
+        cache.get('a')
+        cache.set('c', '"3"', 'C')
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual((cache.get('a'), cache.get('c')), (('"1"', 'A'), ('"3"', 'C')))
+
+
+# ==========================================
+# LEAF IDENTIFICATION CACHE
+# ==========================================
+class ImageHashIndexTests(TestCase):
+    def leaf(self, size=(400, 300)):
+        image = Image.linear_gradient('L').resize(size).convert('RGB')
+        buffer = BytesIO()
+        image.save(buffer, 'JPEG', quality=70)
+        return Image.open(BytesIO(buffer.getvalue()))
+
+    def test_dhash_tolerates_rescaling(self):
+        original = dhash(self.leaf())
+        self.assertLessEqual(hamming_distance(original, dhash(self.leaf((200, 150)))), 2)
+        noise = Image.effect_noise((400, 300), 80)
+        self.assertGreater(hamming_distance(original, dhash(noise)), 6)
+
+    def test_threshold_is_inclusive(self):
+        index = ImageHashIndex(max_size=10, max_distance=3)
+        index.add(0b0000, 'rose')
+        self.assertEqual(index.lookup(0b0111), 'rose')  # 3 bits off
+        self.assertIsNone(index.lookup(0b1111))  # 4 bits off
+
+    def test_closest_match_wins(self):
+        index = ImageHashIndex(max_size=10, max_distance=6)
+        index.add(0b000000, 'rose')
+        index.add(0b111000, 'tulsi')
+        self.assertEqual(index.lookup(0b110000), 'tulsi')
+        self.assertEqual(index.lookup(0b000001), 'rose')
+
+    def test_least_recently_used_is_evicted(self):
+        index = ImageHashIndex(max_size=2, max_distance=0)
+        index.add(1, 'rose')
+        index.add(2, 'tulsi')
+        index.lookup(1)  # refreshes rose
+        index.add(4, 'neem')
+        self.assertEqual(len(index), 2)
+        self.assertIsNone(index.lookup(2))
+        self.assertEqual((index.lookup(1), index.lookup(4)), ('rose', 'neem'))
+
+
+# ==========================================
+# LEAF PHOTO PREPROCESSING
+# ==========================================
+class LeafPreprocessingTests(TestCase):
+    def upload(self, size=(2000, 1000), orientation=None):
+        exif = Image.Exif()
+        if orientation:
+            exif[0x0112] = orientation
+        buffer = BytesIO()
+        Image.new('RGB', size, (40, 140, 60)).save(buffer, 'JPEG', exif=exif)
+        return SimpleUploadedFile('leaf.jpg', buffer.getvalue(), content_type='image/jpeg')
+
+    def test_rotates_crops_and_downscales(self):
+        upload = self.upload(orientation=6)  # stored landscape, shot portrait
+        prepared = preprocess_image(upload, max_edge=256, crop=0.5)
+        self.assertEqual(prepared.image.size, (128, 256))
+        self.assertEqual(Image.open(BytesIO(prepared.data)).size, (128, 256))
+        self.assertEqual(prepared.mime_type, 'image/jpeg')
+        self.assertEqual(prepared.original_bytes, upload.size)
+        self.assertLess(prepared.encoded_bytes, prepared.original_bytes)
+
+    def test_output_formats(self):
+        for fmt, mime_type, pil_format in (
+                ('webp', 'image/webp', 'WEBP'),
+                ('PNG', 'image/png', 'PNG'),
+                ('JPG', 'image/jpeg', 'JPEG')):  # not a PIL writer: falls back
+            prepared = preprocess_image(self.upload((300, 200)), max_edge=100, fmt=fmt)
+            self.assertEqual(prepared.mime_type, mime_type)
+            self.assertEqual(Image.open(BytesIO(prepared.data)).format, pil_format)
+
+    @override_settings(IDENTIFY_IMAGE_FORMAT='PNG')
+    def test_identify_accepts_other_formats(self):
+        self.assertEqual(preprocess_leaf_upload(self.upload()).mime_type, 'image/png')
+
+
+# ==========================================
+# PROVIDER HEDGING & ROUTING
+# ==========================================
+class FakeProvider:
+    VISION_LABEL = 'Fake Vision'
+
+    def __init__(self, delay=0.0, result=None, error=None):
+        self.delay, self.result, self.error = delay, result, error
+        self.started, self.cancelled = [], False
+
+    def answer(self):
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+    def get_plant_data(self, plant_name):
+        self.started.append(time.monotonic())
+        time.sleep(self.delay)
+        return self.answer()
+
+    async def aget_plant_data(self, plant_name):
+        self.started.append(time.monotonic())
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        return self.answer()
+
+    identify_from_image = get_plant_data
+
+
+@override_settings(HEDGE_DEFAULT_DELAY=0.1)
+class HedgingTests(TestCase):
+    def use(self, primary, backup):
+        router = providers.ProviderRouter({'primary': primary, 'backup': backup})
+        patch = mock.patch.object(providers, 'plant_data_router', router)
+        patch.start()
+        self.addCleanup(patch.stop)
+        return router
+
+    def hedge(self, asynchronous=False):
+        self.start = time.monotonic()
+        if asynchronous:
+            return async_to_sync(providers.ahedged_plant_data)('Rose')
+        return providers.hedged_plant_data('Rose')
+
+    def test_no_hedge_when_the_primary_is_fast(self):
+        primary, backup = FakeProvider(result={'from': 'primary'}), FakeProvider()
+        self.use(primary, backup)
+        for asynchronous in (False, True):
+            self.assertEqual(self.hedge(asynchronous), {'from': 'primary'})
+        self.assertEqual(backup.started, [])
+
+    def test_hedge_fires_after_the_delay_and_first_success_wins(self):
+        primary = FakeProvider(delay=0.5, result={'from': 'primary'})
+        backup = FakeProvider(result={'from': 'backup'})
+        self.use(primary, backup)
+        self.assertEqual(self.hedge(), {'from': 'backup'})
+        self.assertGreaterEqual(backup.started[0] - self.start, 0.1)
+        self.assertLess(time.monotonic() - self.start, 0.4)  # loser not awaited
+
+    def test_async_loser_is_cancelled(self):
+        primary = FakeProvider(delay=0.5, result={'from': 'primary'})
+        backup = FakeProvider(result={'from': 'backup'})
+        router = self.use(primary, backup)
+        self.assertEqual(self.hedge(asynchronous=True), {'from': 'backup'})
+        self.assertGreaterEqual(backup.started[0] - self.start, 0.1)
+        self.assertTrue(primary.cancelled)
+        self.assertEqual(router.health['primary'].error_rate(), 0.0)
+
+    def test_failed_primary_hedges_at_once(self):
+        primary, backup = FakeProvider(result=None), FakeProvider(result={'from': 'backup'})
+        self.use(primary, backup)
+        self.assertEqual(self.hedge(), {'from': 'backup'})
+        self.assertLess(backup.started[0] - self.start, 0.1)
+
+    def test_both_failing(self):
+        self.use(FakeProvider(result=None), FakeProvider(error=RuntimeError('quota')))
+        for asynchronous in (False, True):
+            with self.assertRaisesMessage(RuntimeError, 'quota'):
+                self.hedge(asynchronous)
+        self.use(FakeProvider(result=None), FakeProvider(result=None))
+        self.assertIsNone(self.hedge())
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@override_settings(CIRCUIT_FAILURE_THRESHOLD=3, CIRCUIT_RESET_TIMEOUT=30, HEDGE_MIN_SAMPLES=2)
+class CircuitBreakerTests(TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.health = providers.ProviderHealth(clock=self.clock)
+
+    def fail(self, times):
+        for _ in range(times):
+            self.health.record(1.0, False)
+
+    def test_trips_after_consecutive_failures(self):
+        self.fail(2)
+        self.health.record(1.0, True)  # a success resets the streak
+        self.fail(2)
+        self.assertEqual(self.health.state, 'closed')
+        self.fail(1)
+        self.assertEqual(self.health.state, 'open')
+        self.assertFalse(self.health.allow_request())
+
+    def test_half_open_lets_a_single_trial_through(self):
+        self.fail(3)
+        self.clock.now += 29
+        self.assertEqual(self.health.state, 'open')
+        self.clock.now += 1
+        self.assertEqual(self.health.state, 'half_open')
+        self.assertTrue(self.health.allow_request())
+        self.assertFalse(self.health.allow_request())
+
+    def test_successful_trial_closes_the_circuit(self):
+        self.fail(3)
+        self.clock.now += 30
+        self.assertTrue(self.health.allow_request())
+        self.health.record(1.0, True)
+        self.assertEqual(self.health.state, 'closed')
+        self.assertTrue(self.health.allow_request())
+
+    def test_failed_trial_reopens_for_a_fresh_timeout(self):
+        self.fail(3)
+        self.clock.now += 30
+        self.assertTrue(self.health.allow_request())
+        self.fail(1)
+        self.assertEqual(self.health.state, 'open')
+        self.clock.now += 29
+        self.assertEqual(self.health.state, 'open')
+        self.clock.now += 1
+        self.assertTrue(self.health.allow_request())
+
+    def test_raising_provider_counts_as_failure_and_frees_the_trial(self):
+        router = providers.ProviderRouter({'only': FakeProvider(error=RuntimeError('boom'))},
+                                          clock=self.clock)
+        for _ in range(3):
+            with self.assertRaises(RuntimeError):
+                router.call('only', 'get_plant_data', 'Rose')
+        self.assertEqual(router.health['only'].state, 'open')
+        self.assertIsNone(router.next_provider())
+        self.clock.now += 30
+        self.assertEqual(router.next_provider(), 'only')
+        with self.assertRaises(RuntimeError):
+            async_to_sync(router.acall)('only', 'aget_plant_data', 'Rose')
+        self.assertEqual(router.health['only'].state, 'open')
+        self.clock.now += 30
+        self.assertEqual(router.next_provider(), 'only')
+
+    def test_preference_order_until_enough_samples_then_fastest(self):
+        router = providers.ProviderRouter(
+            {'first': FakeProvider(), 'second': FakeProvider()}, clock=self.clock)
+        self.assertEqual(router.ranked(), ['first', 'second'])
+        router.health['first'].record(2.0, True)
+        router.health['second'].record(0.5, True)
+        self.assertEqual(router.ranked(), ['first', 'second'])
+        router.health['first'].record(2.0, True)
+        self.assertEqual(router.ranked(), ['first', 'second'])  # only first has p50
+        router.health['second'].record(0.5, True)
+        self.assertEqual(router.ranked(), ['second', 'first'])
+
+    def test_open_provider_is_skipped(self):
+        router = providers.ProviderRouter(
+            {'first': FakeProvider(), 'second': FakeProvider()}, clock=self.clock)
+        for _ in range(3):
+            router.health['first'].record(1.0, False)
+        self.assertEqual(router.ranked(), ['second'])
+        self.assertEqual(router.next_provider(), 'second')
+        self.assertIsNone(router.next_provider(exclude=['second']))
+
+    def test_identify_falls_back_to_the_next_provider(self):
+        empty, answering = FakeProvider(result=None), FakeProvider(result={'name': 'Rose'})
+        router = providers.ProviderRouter({'empty': empty, 'answering': answering},
+                                          clock=self.clock)
+        with mock.patch.object(providers, 'vision_router', router):
+            vision = providers.identify_from_image(b'jpeg')
+        self.assertEqual(vision, {'name': 'Rose', 'identified_by': 'Fake Vision'})
+        self.assertEqual((len(empty.started), len(answering.started)), (1, 1))
+        self.assertEqual(router.health['empty'].error_rate(), 1.0)
+
+
+# ==========================================
+# PLANT NAME DICTIONARY
+# ==========================================
+@mock.patch('api.name_dictionary.GoogleTranslateAPI')
+class NameDictionaryTests(TestCase):
+    def setUp(self):
+        self.names = NameDictionary()
+
+    def test_devanagari_translation_is_written_back(self, translator):
+        translator.translate_to_english.return_value = 'Lotus'
+        self.assertEqual(self.names.translate_to_english('कमल'), 'Lotus')
+        row = PlantNameTranslation.objects.get(english_key='lotus')
+        self.assertEqual((row.hindi, row.source), ('कमल', 'translator'))
+        self.assertEqual(NameDictionary().translate_to_english('कमल'), 'Lotus')
+        self.assertEqual(NameDictionary().hindi_for('Lotus'), 'कमल')
+        self.assertEqual(translator.translate_to_english.call_count, 1)
+
+    def test_romanized_input_is_not_stored_as_hindi(self, translator):
+        translator.translate_to_english.return_value = 'Lotus'
+        self.assertEqual(self.names.translate_to_english('kamal'), 'Lotus')
+        self.assertFalse(PlantNameTranslation.objects.filter(english_key='lotus').exists())
+        self.assertIsNone(self.names.hindi_for('Lotus'))
+
+    def test_echoed_answer_is_not_stored(self, translator):
+        translator.translate_to_hindi.return_value = 'Monstera'
+        self.assertEqual(self.names.translate_to_hindi('Monstera'), 'Monstera')
+        self.assertFalse(PlantNameTranslation.objects.filter(english_key='monstera').exists())
+
+    def test_seed_names_need_no_translator(self, translator):
+        self.assertEqual(self.names.translate_to_english('gulab'), 'Rose')
+        self.assertEqual(self.names.translate_to_hindi('rose'), 'गुलाब')
+        translator.translate_to_english.assert_not_called()
+        translator.translate_to_hindi.assert_not_called()
+
+
+# ==========================================
+# PLANT NAME INDEX
+# ==========================================
+@override_settings(NAME_INDEX_MIN_SCORE=0.45, NAME_INDEX_AUTO_SCORE=0.65)
+class NameIndexTests(TestCase):
+    def setUp(self):
+        aliases = [(alias, canonical) for alias, canonical in
+                   name_index.TRANSLITERATIONS.items()]
+        aliases += [(name, name) for name in ('Rose', 'Rosemary', 'Roselle', 'Marigold')]
+        patch = mock.patch.object(name_index, 'get_name_index',
+                                  return_value=name_index.NameIndex(aliases))
+        patch.start()
+        self.addCleanup(patch.stop)
+
+    def test_phonetic_key_folds_spelling_variants(self):
+        self.assertEqual(name_index.phonetic_key('Aloe-Vera'), 'aloevera')
+        self.assertEqual(name_index.phonetic_key(' Tulsee '), 'tulsi')
+        self.assertEqual(name_index.phonetic_key('gainddaa'), 'gainda')
+        self.assertEqual(name_index.phonetic_key('Genda Phool'),
+                         name_index.phonetic_key('gendaphul'))
+
+    def test_exact_alias_and_spelling_variant(self):
+        self.assertEqual(name_index.canonical_name('gulab'), 'Rose')
+        self.assertEqual(name_index.canonical_name('genda phul'), 'Marigold')
+
+    def test_near_miss_is_corrected(self):
+        self.assertEqual(name_index.resolve('Marygold')[0].name, 'Marigold')
+        self.assertGreaterEqual(name_index.resolve('Marygold')[0].score, 0.65)
+        self.assertEqual(name_index.canonical_name('Marygold'), 'Marigold')
+
+    def test_distant_name_is_left_alone(self):
+        self.assertEqual(name_index.resolve('Cactus'), [])
+        self.assertEqual(name_index.canonical_name('Cactus'), 'Cactus')
+
+    def test_ambiguous_name_is_left_alone(self):
+        # 'Rosem' is close to both Rose and Rosemary
+        names = [candidate.name for candidate in name_index.resolve('Rosem')]
+        self.assertEqual(names[:2], ['Rose', 'Rosemary'])
+        self.assertEqual(name_index.canonical_name('Rosem'), 'Rosem')
@@ -1,9 +1,23 @@
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import async_views, views
+
+# Under ASGI the native async views replace the DRF ones
+plant_views = async_views if settings.ASYNC_VIEWS else views
 
 urlpatterns = [
-    path('external/complete/', views.get_complete_plant_info,
+    path('external/complete/', plant_views.get_complete_plant_info,
         name='complete_plant_info'),
-    path('identify-leaf/', views.identify_plant_from_image,
+    path('external/batch/', plant_views.get_batch_plant_info,
+        name='batch_plant_info'),
+    path('identify-leaf/', plant_views.identify_plant_from_image,
         name='identify_leaf'),
+    path('plants/', views.list_plants, name='plant_list'),
+    path('plants/resolve/', views.resolve_plant_name,
+        name='resolve_plant_name'),
+    path('search/', views.search_catalogue, name='search_catalogue'),
+    path('offline/update/', views.get_offline_update, name='offline_update'),
+    path('sync/<str:feed>/', views.sync_changes, name='sync_changes'),
+    path('external/stats/', views.external_api_stats,
+        name='external_api_stats'),
 ]
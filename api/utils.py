@@ -1,4 +1,5 @@
-from .external_apis import PlantDataAggregator, HindiTranslator
+from .name_dictionary import HindiTranslator
+from .plant_service import get_plant_info
 
 
 def populate_plant_from_api(plant_name):
@@ -6,8 +7,7 @@ def populate_plant_from_api(plant_name):
     Helper function to get complete plant data from all APIs
     Usage: data = populate_plant_from_api('Rose')
     """
-    aggregator = PlantDataAggregator()
-    return aggregator.get_complete_plant_data(plant_name)
+    return get_plant_info(plant_name)
 
 
 def translate_to_hindi(text):
@@ -25,4 +25,4 @@ def translate_to_english(text):
     Usage: result = translate_to_english('गुलाब')
     """
     translator = HindiTranslator()
-    return translator.translate_to_english(text)
\ No newline at end of file
+    return translator.translate_to_english(text)
@@ -1,8 +1,24 @@
-from rest_framework.decorators import api_view
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from django.conf import settings
+from django.db import connections
+from django.http import FileResponse, StreamingHttpResponse
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAdminUser
 from rest_framework.response import Response
 from rest_framework import status
-from api.external_apis import (
-    WikipediaAPI, GeminiPlantAPI, GroqPlantAPI, GoogleTranslateAPI)
+from PIL import UnidentifiedImageError
+from api.image_hash import dhash, get_identification_index
+from api.image_processing import preprocess_leaf_upload
+from api import (
+    name_index, offline_packages, plant_cache, providers, search, sync)
+from api.models import Plant
+from api.pagination import KeysetPagination
+from api.serializers import DiseaseSerializer, PlantListSerializer
+from api.plant_service import (
+    batch_line, build_identification, dedupe_plant_names, get_plant_info,
+    lookup_plant_info)
 
 
 @api_view(['GET'])
@@ -12,49 +28,53 @@ def get_complete_plant_info(request):
         return Response({'error': 'Plant name required'},
             status=status.HTTP_400_BAD_REQUEST)
     try:
-        # Wikipedia
-        wiki_desc, wiki_img, wiki_url = WikipediaAPI.get_plant_info(plant_name)
-
-        # Try Groq first (more reliable for now)
-        api_data = GroqPlantAPI.get_plant_data(plant_name)
-        if not api_data:
-            api_data = GeminiPlantAPI.get_plant_data(plant_name)
-
-
-
-
-        # Gemini (preferred) or Groq (backup)
-        #api_data = GeminiPlantAPI.get_plant_data(plant_name)
-        #if not api_data:
-          #  api_data = GroqPlantAPI.get_plant_data(plant_name)
-        # Hindi name
-        hindi_name = GoogleTranslateAPI.translate_to_hindi(plant_name)
-        if api_data and api_data.get('hindi_name'):
-            hindi_name = api_data['hindi_name']
-        result = {
-            'common_name': plant_name,
-            'hindi_name': hindi_name,
-            'description': wiki_desc or 'Not available',
-            'image_url': wiki_img,
-            'wikipedia_url': wiki_url,
-            'scientific_name': api_data.get('scientific_name','') if api_data else '',
-            'family': api_data.get('family','') if api_data else '',
-            'watering': api_data.get('watering','') if api_data else '',
-            'sunlight': api_data.get('sunlight','') if api_data else '',
-            'soil_type': api_data.get('soil_type','') if api_data else '',
-            'indoor_outdoor': api_data.get('indoor_outdoor','') if api_data else '',
-            'edible': api_data.get('edible','') if api_data else '',
-            'toxic': api_data.get('toxic','') if api_data else '',
-            'warning': api_data.get('warning') if api_data else None,
-            'fun_facts': api_data.get('fun_facts','') if api_data else '',
-            'origin': api_data.get('origin','') if api_data else '',
-            'growth_rate': api_data.get('growth_rate','') if api_data else '',
-            'diseases': api_data.get('diseases',[]) if api_data else []
-        }
-        return Response(result)
+        result, freshness = lookup_plant_info(plant_name)
     except Exception as e:
         return Response({'error': str(e)},
             status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    # Reusable for as long as the data it was built from; ETag and 304s
+    # come from ConditionalGetMiddleware
+    return plant_cache.set_cache_headers(Response(result), freshness)
+
+def _batch_lookup(plant_name):
+    try:
+        return get_plant_info(plant_name)
+    finally:
+        connections.close_all()  # this pool thread's own DB connection
+
+
+def _stream_batch(names):
+    executor = ThreadPoolExecutor(
+        max_workers=settings.BATCH_MAX_PARALLEL, thread_name_prefix='batch')
+    try:
+        futures = {executor.submit(_batch_lookup, name): name for name in names}
+        for future in as_completed(futures):
+            try:
+                yield batch_line(futures[future], future.result())
+            except Exception as e:
+                yield batch_line(futures[future], error=str(e))
+    finally:
+        # client went away: drop whatever has not started yet
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+@api_view(['POST'])
+def get_batch_plant_info(request):
+    """
+    Body: {"names": ["Rose", "Tulsi", ...]}. Streams one JSON object per
+    line (application/x-ndjson) as each plant becomes ready.
+    """
+    names = request.data.get('names') if isinstance(request.data, dict) else None
+    names = dedupe_plant_names(names) if isinstance(names, list) else []
+    if not names:
+        return Response({'error': 'names list required'},
+            status=status.HTTP_400_BAD_REQUEST)
+    if len(names) > settings.BATCH_MAX_NAMES:
+        return Response(
+            {'error': f'At most {settings.BATCH_MAX_NAMES} names per request'},
+            status=status.HTTP_400_BAD_REQUEST)
+    return StreamingHttpResponse(
+        _stream_batch(names), content_type='application/x-ndjson')
 
 @api_view(['POST'])
 def identify_plant_from_image(request):
@@ -63,54 +83,176 @@ def identify_plant_from_image(request):
         return Response({'error': 'No image provided'},
             status=status.HTTP_400_BAD_REQUEST)
     try:
-        # Gemini Vision identifies plant
-        gemini_vision = GeminiPlantAPI.identify_from_image(image_file)
-        if not gemini_vision:
+        # Orient, crop and shrink the photo before it goes anywhere
+        try:
+            prepared = preprocess_leaf_upload(image_file)
+        except UnidentifiedImageError:
+            return Response({'error': 'Invalid image'},
+                status=status.HTTP_400_BAD_REQUEST)
+        # Near-duplicate uploads reuse a recent identification
+        image_hash = dhash(prepared.image)
+        identification_index = get_identification_index()
+        vision = identification_index.lookup(image_hash)
+
+        # Fastest healthy vision provider identifies plant
+        if vision is None:
+            vision = providers.identify_from_image(prepared)
+            if vision:
+                identification_index.add(image_hash, vision)
+        if not vision:
             return Response({'error': 'Identification failed'},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-        plant_name = gemini_vision.get('plant_name', 'Unknown')
+        plant_name = vision.get('plant_name', 'Unknown')
         if plant_name == 'Unknown':
             return Response({'error': 'Could not identify'},
                 status=status.HTTP_404_NOT_FOUND)
-        # Get full details
-        api_data = GeminiPlantAPI.get_plant_data(plant_name)
-        wiki_desc, wiki_img, wiki_url = WikipediaAPI.get_plant_info(plant_name)
-        hindi_name = GoogleTranslateAPI.translate_to_hindi(plant_name)
-        if api_data and api_data.get('hindi_name'):
-            hindi_name = api_data['hindi_name']
-        response_data = {
-            'plant_identification': {
-                'plant_name': plant_name,
-                'confidence': gemini_vision.get('confidence', 0),
-                'identified_by': 'Gemini 2.0 Flash Vision'
-            },
-            'disease_detection': {
-                'is_healthy': gemini_vision.get('is_healthy', True),
-                'disease': gemini_vision.get('disease')
-            },
-            'plant_details': {
-                'common_name': plant_name,
-                'hindi_name': hindi_name,
-                'scientific_name': gemini_vision.get('scientific_name') or
-                    (api_data.get('scientific_name','') if api_data else ''),
-                'family': api_data.get('family','') if api_data else '',
-                'description': wiki_desc or 'Not available',
-                'image_url': wiki_img,
-                'wikipedia_url': wiki_url,
-                'watering': api_data.get('watering','') if api_data else '',
-                'sunlight': api_data.get('sunlight','') if api_data else '',
-                'soil_type': api_data.get('soil_type','') if api_data else '',
-                'indoor_outdoor': api_data.get('indoor_outdoor','') if api_data else '',
-                'edible': api_data.get('edible','') if api_data else '',
-                'toxic': api_data.get('toxic','') if api_data else '',
-                'warning': api_data.get('warning') if api_data else None,
-                'fun_facts': api_data.get('fun_facts','') if api_data else '',
-                'origin': api_data.get('origin','') if api_data else '',
-                'growth_rate': api_data.get('growth_rate','') if api_data else '',
-                'diseases': api_data.get('diseases',[]) if api_data else []
-            }
-        }
+        # Get full details (local catalogue first, then the external APIs)
+        response_data = build_identification(
+            plant_name, vision, get_plant_info(plant_name), prepared)
         return Response(response_data)
     except Exception as e:
         return Response({'error': str(e)},
             status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+@api_view(['GET'])
+def resolve_plant_name(request):
+    """Ranked canonical plant names for free-text / transliterated input"""
+    query = request.GET.get('q', '').strip()
+    if not query:
+        return Response({'error': 'Query required'},
+            status=status.HTTP_400_BAD_REQUEST)
+    try:
+        limit = max(1, min(int(request.GET.get('limit', 5)), 20))
+    except ValueError:
+        limit = 5
+    candidates = name_index.resolve(query, limit=limit)
+    return Response({
+        'query': query,
+        'candidates': [candidate._asdict() for candidate in candidates]
+    })
+
+PLANT_LIST_FILTERS = ('plant_type', 'toxicity', 'edibility')
+
+
+@api_view(['GET'])
+def list_plants(request):
+    """
+    Plant catalogue, keyset-paginated on (common_name, id).
+    Filters: plant_type, toxicity, edibility, is_common
+    """
+    queryset = Plant.objects.all()
+    for field in PLANT_LIST_FILTERS:
+        value = request.query_params.get(field)
+        if value:
+            queryset = queryset.filter(**{field: value})
+    is_common = request.query_params.get('is_common')
+    if is_common is not None:
+        queryset = queryset.filter(
+            is_common=is_common.lower() in ('1', 'true', 'yes'))
+
+    paginator = KeysetPagination()
+    page = paginator.paginate_queryset(queryset, request)
+    data = PlantListSerializer(page, many=True).data
+    response = paginator.get_paginated_response(data)
+    # Revalidated on every use; ETag and 304s come from ConditionalGetMiddleware
+    response['Cache-Control'] = 'no-cache'
+    return response
+
+@api_view(['GET'])
+def search_catalogue(request):
+    """Ranked full-text search over plants and their diseases"""
+    query = request.GET.get('q', '').strip()
+    if not query:
+        return Response({'error': 'Query required'},
+            status=status.HTTP_400_BAD_REQUEST)
+    kind = request.GET.get('type', 'all')
+    if kind not in ('all', 'plants', 'diseases'):
+        return Response({'error': 'type must be all, plants or diseases'},
+            status=status.HTTP_400_BAD_REQUEST)
+    try:
+        limit = max(1, min(int(request.GET.get('limit', 20)), 50))
+    except ValueError:
+        limit = 20
+
+    response_data = {'query': query}
+    if kind in ('all', 'plants'):
+        plants = search.search_plants(query, limit=limit)
+        response_data['plants'] = [
+            dict(data, rank=plant.search_rank) for plant, data in
+            zip(plants, PlantListSerializer(plants, many=True).data)]
+    if kind in ('all', 'diseases'):
+        diseases = search.search_diseases(query, limit=limit)
+        response_data['diseases'] = [
+            dict(data, rank=disease.search_rank) for disease, data in
+            zip(diseases, DiseaseSerializer(diseases, many=True).data)]
+    return Response(response_data)
+
+@api_view(['GET'])
+def get_offline_update(request):
+    """
+    Smallest download that brings the app's offline database from
+    ?version=N to the latest published version: a row-level delta when
+    one exists and is smaller, otherwise the full package. 204 when the
+    client is already up to date.
+    """
+    try:
+        current = int(request.GET.get('version', 0))
+    except ValueError:
+        current = 0
+    manifest = offline_packages.read_manifest(settings.OFFLINE_PACKAGE_DIR)
+    kind, info = offline_packages.best_update(manifest, current)
+    if kind is None:
+        return Response({'error': 'No offline package published'},
+            status=status.HTTP_404_NOT_FOUND)
+    if kind == 'none':
+        response = Response(status=status.HTTP_204_NO_CONTENT)
+    else:
+        try:
+            package = open(os.path.join(settings.OFFLINE_PACKAGE_DIR, info['file']), 'rb')
+        except FileNotFoundError:
+            # Pruned by a concurrent publish, whose manifest is already
+            # written: serve its full package
+            manifest = offline_packages.read_manifest(settings.OFFLINE_PACKAGE_DIR)
+            kind, info = 'full', manifest['versions'][str(manifest['latest'])]
+            package = open(os.path.join(settings.OFFLINE_PACKAGE_DIR, info['file']), 'rb')
+        response = FileResponse(package, as_attachment=True,
+            filename=info['file'], content_type='application/gzip')
+        response['ETag'] = '"%s"' % info['sha256']
+        response['X-Offline-Package'] = kind
+    response['X-Offline-Version'] = str(manifest['latest'])
+    return response
+
+@api_view(['GET'])
+def sync_changes(request, feed):
+    """
+    Incremental sync of one feed (plants, diseases, logbook, reminders):
+    rows changed and ids deleted since ?cursor=, paginated on
+    (updated_at, id). logbook and reminders hold the caller's rows only.
+    """
+    if feed not in sync.FEEDS:
+        return Response({'error': f'Unknown feed, use one of: {", ".join(sync.FEEDS)}'},
+            status=status.HTTP_404_NOT_FOUND)
+    if sync.FEEDS[feed].per_user and not request.user.is_authenticated:
+        return Response({'error': 'Authentication required'},
+            status=status.HTTP_401_UNAUTHORIZED)
+    try:
+        page_size = int(request.GET.get('page_size', settings.SYNC_PAGE_SIZE))
+    except ValueError:
+        page_size = settings.SYNC_PAGE_SIZE
+    page_size = max(1, min(page_size, settings.SYNC_MAX_PAGE_SIZE))
+
+    try:
+        page = sync.changes(feed, request.user, request.GET.get('cursor'),
+            page_size, request=request)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    except sync.CursorExpired:
+        return Response({'error': 'Cursor expired, sync again without a cursor'},
+            status=status.HTTP_410_GONE)
+    return Response(page)
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def external_api_stats(request):
+    """Per-worker provider counters (staff only)"""
+    return Response(providers.get_provider_stats())
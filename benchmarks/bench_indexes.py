@@ -0,0 +1,127 @@
+"""
+Benchmark: query plans and timings of the hot query paths, with and
+without the indexes declared in api.models.
+
+Creates a throwaway test database (test_<NAME>, like `manage.py test`),
+seeds it, prints EXPLAIN output and the mean time of each query, then
+drops the Meta indexes and measures again. The configured database is
+never written to.
+
+    python benchmarks/bench_indexes.py [plants] [users] [iterations]
+"""
+import os
+import random
+import sys
+import time
+from datetime import timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'plant_backend.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.contrib.auth.models import User  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.test.utils import setup_test_environment  # noqa: E402
+from django.utils import timezone  # noqa: E402
+
+from api.models import Disease, Logbook, Plant, Reminder  # noqa: E402
+
+BATCH = 5000
+
+
+def seed(plants, users, rng):
+    now = timezone.now()
+    Plant.objects.bulk_create([
+        Plant(common_name=f'Plant {i}', scientific_name=f'Genus species{i}',
+              hindi_name=f'पौधा {i}', plant_type='indoor', size='small',
+              toxicity='non_toxic', edibility='edible')
+        for i in range(plants)
+    ], batch_size=BATCH)
+    plant_ids = list(Plant.objects.values_list('id', flat=True))
+    Disease.objects.bulk_create([
+        Disease(plant_id=pk, name='Leaf spot', symptoms='s', treatment='t')
+        for pk in plant_ids
+    ], batch_size=BATCH)
+    User.objects.bulk_create([User(username=f'bench{i}') for i in range(users)],
+        batch_size=BATCH)
+    user_ids = list(User.objects.values_list('id', flat=True))
+    Logbook.objects.bulk_create([
+        Logbook(user_id=user_id, plant_id=rng.choice(plant_ids))
+        for user_id in user_ids for _ in range(20)
+    ], batch_size=BATCH)
+    # dates are auto_now_add: spread them out afterwards
+    for entry_id in Logbook.objects.values_list('id', flat=True)[::7]:
+        Logbook.objects.filter(id=entry_id).update(
+            date=now.date() - timedelta(days=rng.randint(0, 365)))
+    Reminder.objects.bulk_create([
+        Reminder(user_id=user_id, plant_id=rng.choice(plant_ids),
+                 reminder_type='watering', frequency='weekly',
+                 is_active=rng.random() < 0.2,
+                 next_reminder_date=now + timedelta(hours=rng.randint(-48, 24 * 60)))
+        for user_id in user_ids for _ in range(5)
+    ], batch_size=BATCH)
+    return plant_ids, user_ids
+
+
+def hot_queries(plant_ids, user_ids, rng):
+    now = timezone.now()
+    some_user = rng.choice(user_ids)
+    name = f'PLANT {len(plant_ids) // 2}'
+    since = Plant.objects.order_by('updated_at').values_list(
+        'updated_at', flat=True)[len(plant_ids) * 9 // 10]
+    return {
+        'plant by name (ci)': Plant.objects.by_name(name),
+        'logbook of user': Logbook.objects.filter(user_id=some_user).order_by('-date')[:20],
+        'due reminders': Reminder.objects.filter(
+            is_active=True, next_reminder_date__lte=now).order_by('next_reminder_date')[:500],
+        'plants changed since': Plant.objects.filter(
+            updated_at__gt=since).order_by('updated_at', 'id')[:500],
+        'diseases changed since': Disease.objects.filter(
+            updated_at__gt=since).order_by('updated_at', 'id')[:500],
+    }
+
+
+def measure(label, queries, iterations):
+    print(f'\n=== {label} ===')
+    for name, queryset in queries.items():
+        plan = queryset.explain()
+        start = time.perf_counter()
+        for _ in range(iterations):
+            list(queryset.all())
+        per_query = (time.perf_counter() - start) / iterations * 1e3
+        print(f'\n{name}: {per_query:.2f} ms/query')
+        print('  ' + plan.replace('\n', '\n  '))
+
+
+def drop_meta_indexes():
+    with connection.schema_editor() as editor:
+        for model in (Plant, Disease, Logbook, Reminder):
+            for index in model._meta.indexes:
+                editor.remove_index(model, index)
+
+
+if __name__ == '__main__':
+    plants = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    users = int(sys.argv[2]) if len(sys.argv) > 2 else 5000
+    iterations = int(sys.argv[3]) if len(sys.argv) > 3 else 20
+    rng = random.Random(7)
+
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        start = time.perf_counter()
+        plant_ids, user_ids = seed(plants, users, rng)
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        print(f'seeded {plants} plants, {users} users in '
+              f'{time.perf_counter() - start:.1f} s ({connection.vendor})')
+
+        queries = hot_queries(plant_ids, user_ids, rng)
+        measure('with indexes', queries, iterations)
+        drop_meta_indexes()
+        measure('without indexes', queries, iterations)
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
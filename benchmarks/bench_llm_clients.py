@@ -0,0 +1,48 @@
+"""
+Micro-benchmark: per-call setup cost of the LLM provider clients.
+
+Compares building a Groq client / configuring Gemini and creating a
+GenerativeModel on every call (the old behaviour) with the shared
+clients from api.llm_clients. No network requests are made.
+
+    python benchmarks/bench_llm_clients.py [iterations]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('GROQ_API_KEY', 'bench-key')
+os.environ.setdefault('GEMINI_API_KEY', 'bench-key')
+
+import google.generativeai as genai  # noqa: E402
+
+from api.llm_clients import (  # noqa: E402
+    GEMINI_MODEL, _build_groq_client, get_gemini_model, get_groq_client)
+
+
+def per_call_groq():
+    _build_groq_client().close()
+
+
+def per_call_gemini():
+    genai.configure(api_key=os.environ['GEMINI_API_KEY'])
+    genai.GenerativeModel(GEMINI_MODEL)
+
+
+def bench(label, fn, iterations):
+    fn()  # warm imports
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    per_call = (time.perf_counter() - start) / iterations * 1e6
+    print(f'{label:<28} {per_call:>10.1f} us/call')
+
+
+if __name__ == '__main__':
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    print(f'{n} iterations')
+    bench('groq: new client per call', per_call_groq, n)
+    bench('groq: shared client', get_groq_client, n)
+    bench('gemini: configure per call', per_call_gemini, n)
+    bench('gemini: shared model', get_gemini_model, n)
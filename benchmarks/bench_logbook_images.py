@@ -0,0 +1,92 @@
+"""
+Benchmark: what a logbook list screen downloads and decodes, with the
+full-size originals versus the generated variants.
+
+Synthesizes phone-sized photos, renders their variants with
+api.image_processing.render_variants (the background job's work, timed
+separately), then for one screen of entries reports the bytes
+transferred and the time to decode each image and scale it to the list
+cell, as the app does. No database or network access.
+
+    python benchmarks/bench_logbook_images.py [entries] [width] [height]
+"""
+import io
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'plant_backend.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.conf import settings  # noqa: E402
+from PIL import Image, ImageDraw, ImageFilter  # noqa: E402
+
+from api.image_processing import render_variants  # noqa: E402
+
+CELL_EDGE = 240  # list cell, px
+
+
+def synthetic_photo(width, height, rng):
+    """Leafy noise + shapes: compresses about like a real phone photo"""
+    noise = Image.effect_noise((width // 4, height // 4), 60).resize((width, height))
+    image = Image.merge('RGB', (
+        noise.point(lambda v: v // 3),
+        noise.point(lambda v: 60 + v // 2),
+        noise.point(lambda v: v // 4)))
+    draw = ImageDraw.Draw(image)
+    for _ in range(40):
+        x, y = rng.randrange(width), rng.randrange(height)
+        r = rng.randint(width // 40, width // 8)
+        draw.ellipse((x - r, y - r, x + r, y + r),
+            fill=(rng.randint(20, 90), rng.randint(90, 200), rng.randint(20, 80)))
+    image = image.filter(ImageFilter.GaussianBlur(1))
+    buffer = io.BytesIO()
+    image.save(buffer, 'JPEG', quality=92)
+    return buffer.getvalue()
+
+
+def render_cell(data):
+    """Decode and scale to the list cell, like the app's image loader"""
+    image = Image.open(io.BytesIO(data))
+    image.draft('RGB', (CELL_EDGE, CELL_EDGE))
+    image = image.convert('RGB')
+    image.thumbnail((CELL_EDGE, CELL_EDGE), Image.LANCZOS)
+    return image
+
+
+def screen(label, images, baseline=None):
+    start = time.perf_counter()
+    for data in images:
+        render_cell(data)
+    elapsed = (time.perf_counter() - start) * 1e3
+    size = sum(len(data) for data in images)
+    ratio = f'  ({size / baseline:.1%} of originals)' if baseline else ''
+    print(f'{label:<16} {size / 1024:>9,.0f} KB {elapsed:>9.1f} ms{ratio}')
+    return size
+
+
+if __name__ == '__main__':
+    entries = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    width = int(sys.argv[2]) if len(sys.argv) > 2 else 4032
+    height = int(sys.argv[3]) if len(sys.argv) > 3 else 3024
+    rng = random.Random(7)
+
+    originals = [synthetic_photo(width, height, rng) for _ in range(entries)]
+    start = time.perf_counter()
+    variants = [render_variants(io.BytesIO(data), settings.LOGBOOK_IMAGE_SIZES,
+                    settings.LOGBOOK_IMAGE_FORMATS, settings.LOGBOOK_IMAGE_QUALITY)
+                for data in originals]
+    per_photo = (time.perf_counter() - start) / entries * 1e3
+    print(f'{entries} photos {width}x{height}; variants rendered in '
+          f'{per_photo:.0f} ms/photo (background pool)\n')
+
+    print(f'{"list screen":<16} {"payload":>12} {"decode":>12}')
+    baseline = screen('originals', originals)
+    for key in sorted(variants[0]):
+        name, fmt = key
+        screen(f'{name} {fmt.lower()}', [v[key] for v in variants], baseline)
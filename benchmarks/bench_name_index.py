@@ -0,0 +1,60 @@
+"""
+Micro-benchmark: fuzzy plant-name resolution.
+
+Builds api.name_index.NameIndex from the built-in transliterations plus
+N synthetic catalogue names and times exact, transliterated and
+misspelled lookups. No database or network access.
+
+    python benchmarks/bench_name_index.py [catalogue_size] [iterations]
+"""
+import os
+import random
+import string
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'plant_backend.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from api.name_index import NameIndex, TRANSLITERATIONS  # noqa: E402
+
+
+def synthetic_names(n, seed=7):
+    rng = random.Random(seed)
+    names = []
+    for _ in range(n):
+        words = [''.join(rng.choices(string.ascii_lowercase, k=rng.randint(4, 9)))
+                 for _ in range(rng.randint(1, 2))]
+        names.append(' '.join(words).title())
+    return names
+
+
+def bench(label, index, query, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        candidates = index.search(query, min_score=0.45)
+    per_call = (time.perf_counter() - start) / iterations * 1e6
+    best = candidates[0].name if candidates else '-'
+    print(f'{label:<24} {query!r:<14} -> {best:<12} {per_call:>8.1f} us/call')
+
+
+if __name__ == '__main__':
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    n = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    aliases = list(TRANSLITERATIONS.items())
+    aliases += [(name, name) for name in set(TRANSLITERATIONS.values())]
+    aliases += [(name, name) for name in synthetic_names(size)]
+
+    start = time.perf_counter()
+    index = NameIndex(aliases)
+    print(f'{len(index)} aliases indexed in '
+          f'{(time.perf_counter() - start) * 1e3:.1f} ms, {n} iterations')
+    bench('exact', index, 'Marigold', n)
+    bench('transliterated', index, 'genda', n)
+    bench('run-together', index, 'aloevera', n)
+    bench('misspelled', index, 'marigld', n)
+    bench('unknown', index, 'xqzplant', n)
@@ -1,73 +1,271 @@
-import sqlite3, requests, json, time
-import google.generativeai as genai
-from decouple import Config
+"""
+Build the SQLite plant database bundled with the Android app.
+
+Plants are fetched concurrently (Wikipedia summary + Gemini details),
+each provider paced by its own token bucket, and written in batched
+transactions. Progress is appended to a checkpoint log after every
+committed batch, so an interrupted build resumes where it stopped.
+
+    python build_offline_db.py                          # names from offline_plants.txt
+    python build_offline_db.py --names my_plants.txt
+    python build_offline_db.py --from-db [--all-plants] # Plant table (is_common)
+    python build_offline_db.py --retry-failed
+    python build_offline_db.py --publish [--package-dir offline_packages]
+
+--publish turns the finished database into the next versioned package
+(gzipped, FTS5 index built in) plus row-level deltas from earlier
+versions, served to the app by /api/offline/update/.
+"""
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from api import offline_packages
+from api.external_apis import parse_json_text
+from api.http_client import get_json
+from api.llm_clients import get_gemini_model
 
-config = Config('.env')
-genai.configure(api_key=config('GEMINI_API_KEY'))
 OUTPUT_DB = 'plants_offline.db'
+NAMES_FILE = 'offline_plants.txt'
+PACKAGE_DIR = 'offline_packages'
+
+SCHEMA = '''CREATE TABLE IF NOT EXISTS plants (
+    id INTEGER PRIMARY KEY, common_name TEXT, hindi_name TEXT,
+    scientific_name TEXT, family TEXT, description TEXT, image_url TEXT,
+    watering TEXT, sunlight TEXT, soil_type TEXT, indoor_outdoor TEXT,
+    edible TEXT, toxic TEXT, warning TEXT, origin TEXT, growth_rate TEXT,
+    fun_facts TEXT, diseases TEXT, category TEXT)'''
 
-PLANTS_LIST = [
-    'Rose','Tulsi','Neem','Marigold','Sunflower','Lotus',
-    'Hibiscus','Jasmine','Aloe Vera','Money Plant','Snake Plant',
-    'Bamboo','Mango','Banana','Orchid','Lily','Basil',
-    'Mint','Coriander','Lavender','Cactus','Button Mushroom'
-]
 
+# ═══════════════════════════════════════════════════════════════════════
+# RATE LIMITING
+# ═══════════════════════════════════════════════════════════════════════
+class TokenBucket:
+    """Allows `rate` calls per second on average, bursts up to `capacity`"""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity,
+                    self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# PROVIDERS
+# ═══════════════════════════════════════════════════════════════════════
 def get_wikipedia(name):
     try:
         url = f'https://en.wikipedia.org/api/rest_v1/page/summary/{name.replace(chr(32),chr(95))}'
-        r = requests.get(url, headers={'User-Agent':'VanVidya/1.0'}, timeout=10)
-        if r.status_code == 200:
-            data = r.json()
+        data = get_json(url, timeout=10)
+        if data is not None:
             desc = data.get('extract','')
             if 'may refer to' not in desc:
                 return desc[:600], data.get('thumbnail',{}).get('source')
-    except: pass
+    except Exception as e:
+        print(f'Wikipedia error ({name}): {e}')
     return None, None
 
 def get_gemini(name):
     try:
-        model = genai.GenerativeModel('gemini-2.0-flash-exp')
+        model = get_gemini_model()
         prompt = f'''Plant "{name}" JSON: scientific_name, family, hindi_name,
 watering, sunlight, soil_type, indoor_outdoor, edible, toxic, warning,
 origin, growth_rate, fun_facts, diseases. Only JSON.'''
         resp = model.generate_content(prompt)
-        text = resp.text.strip()
-        if '```json' in text: text = text.split('```json')[1].split('```')[0].strip()
-        elif '```' in text: text = text.split('```')[1].split('```')[0].strip()
-        return json.loads(text)
-    except: return None
-
-conn = sqlite3.connect(OUTPUT_DB)
-c = conn.cursor()
-c.execute('''CREATE TABLE IF NOT EXISTS plants (
-    id INTEGER PRIMARY KEY, common_name TEXT, hindi_name TEXT,
-    scientific_name TEXT, family TEXT, description TEXT, image_url TEXT,
-    watering TEXT, sunlight TEXT, soil_type TEXT, indoor_outdoor TEXT,
-    edible TEXT, toxic TEXT, warning TEXT, origin TEXT, growth_rate TEXT,
-    fun_facts TEXT, diseases TEXT, category TEXT)''')
-conn.commit()
+        return parse_json_text(resp.text)
+    except Exception as e:
+        print(f'Gemini error ({name}): {e}')
+        return None
 
-for i, name in enumerate(PLANTS_LIST):
-    print(f'[{i+1}/{len(PLANTS_LIST)}] {name}...')
-    c.execute('SELECT id FROM plants WHERE common_name=?', (name,))
-    if c.fetchone(): continue
+def fetch_plant(name, limits):
+    """(name, row values or None); the two providers are called in turn"""
+    limits['wikipedia'].acquire()
     desc, img = get_wikipedia(name)
+    limits['gemini'].acquire()
     data = get_gemini(name)
-    if data:
-        c.execute('''INSERT INTO plants (common_name,hindi_name,scientific_name,
+    if not data:
+        return name, None
+    return name, (
+        name, data.get('hindi_name',''), data.get('scientific_name',''),
+        data.get('family',''), desc or 'Not available', img,
+        data.get('watering',''), data.get('sunlight',''),
+        data.get('soil_type',''), data.get('indoor_outdoor',''),
+        data.get('edible',''), data.get('toxic',''), data.get('warning'),
+        data.get('origin',''), data.get('growth_rate',''),
+        data.get('fun_facts',''), json.dumps(data.get('diseases',[])),
+        'Plant')
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# PLANT LIST / CHECKPOINT
+# ═══════════════════════════════════════════════════════════════════════
+def names_from_file(path):
+    with open(path, encoding='utf-8') as f:
+        lines = (line.split('#', 1)[0].strip() for line in f)
+        return [line for line in lines if line]
+
+def names_from_db(all_plants):
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'plant_backend.settings')
+    import django
+    django.setup()
+    from api.models import Plant
+    plants = Plant.objects.all() if all_plants else Plant.objects.filter(is_common=True)
+    return list(plants.order_by('common_name').values_list('common_name', flat=True))
+
+def unique(names):
+    seen = set()
+    return [n for n in names if not (n.lower() in seen or seen.add(n.lower()))]
+
+def read_checkpoint(path):
+    """name -> last recorded status ('done' / 'failed')"""
+    status = {}
+    if os.path.exists(path):
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue  # torn last line from a crash
+                status[entry['name']] = entry['status']
+    return status
+
+def append_checkpoint(log, names, status):
+    for name in names:
+        log.write(json.dumps({'name': name, 'status': status}, ensure_ascii=False) + '\n')
+    log.flush()
+    os.fsync(log.fileno())
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# BUILD
+# ═══════════════════════════════════════════════════════════════════════
+def build(names, args):
+    """Fetch and store every plant not built yet; False if interrupted"""
+    conn = sqlite3.connect(args.output)
+    c = conn.cursor()
+    c.execute(SCHEMA)
+    conn.commit()
+
+    checkpoint_path = args.checkpoint or f'{args.output}.checkpoint'
+    status = read_checkpoint(checkpoint_path)
+    in_db = {row[0] for row in c.execute('SELECT common_name FROM plants')}
+    skip = {'done', 'failed'} if not args.retry_failed else {'done'}
+    todo = [n for n in names if n not in in_db and status.get(n) not in skip]
+    print(f'{len(names)} plants, {len(names) - len(todo)} already built or '
+          f'skipped, {len(todo)} to fetch')
+
+    limits = {
+        'wikipedia': TokenBucket(args.wiki_rate),
+        'gemini': TokenBucket(args.gemini_rate),
+    }
+    pending_rows, pending_names = [], []
+    built = failed = 0
+    interrupted = False
+
+    def commit(log):
+        c.executemany('''INSERT INTO plants (common_name,hindi_name,scientific_name,
             family,description,image_url,watering,sunlight,soil_type,indoor_outdoor,
             edible,toxic,warning,origin,growth_rate,fun_facts,diseases,category)
-            VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)''',
-            (name, data.get('hindi_name',''), data.get('scientific_name',''),
-             data.get('family',''), desc or 'Not available', img,
-             data.get('watering',''), data.get('sunlight',''),
-             data.get('soil_type',''), data.get('indoor_outdoor',''),
-             data.get('edible',''), data.get('toxic',''), data.get('warning'),
-             data.get('origin',''), data.get('growth_rate',''),
-             data.get('fun_facts',''), json.dumps(data.get('diseases',[])),
-             'Plant'))
+            VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)''', pending_rows)
         conn.commit()
-        time.sleep(2)
-conn.close()
-print(f'Done! Copy {OUTPUT_DB} to Android assets/')
+        # only recorded once the rows are durable
+        append_checkpoint(log, pending_names, 'done')
+        pending_rows.clear()
+        pending_names.clear()
+
+    start = time.monotonic()
+    with open(checkpoint_path, 'a', encoding='utf-8') as log, \
+            ThreadPoolExecutor(max_workers=args.workers) as executor:
+        futures = [executor.submit(fetch_plant, name, limits) for name in todo]
+        try:
+            for i, future in enumerate(as_completed(futures), 1):
+                name, row = future.result()
+                if row is None:
+                    failed += 1
+                    append_checkpoint(log, [name], 'failed')
+                    print(f'[{i}/{len(todo)}] {name}: failed')
+                    continue
+                built += 1
+                pending_rows.append(row)
+                pending_names.append(name)
+                print(f'[{i}/{len(todo)}] {name}')
+                if len(pending_rows) >= args.batch_size:
+                    commit(log)
+        except KeyboardInterrupt:
+            print('Interrupted, saving finished plants...')
+            interrupted = True
+            for future in futures:
+                future.cancel()
+        finally:
+            if pending_rows:
+                commit(log)
+    conn.close()
+    print(f'Done in {time.monotonic() - start:.0f} s: {built} built, {failed} failed. '
+          f'Copy {args.output} to Android assets/')
+    return not interrupted
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument('--names', default=NAMES_FILE,
+        help=f'file with one plant name per line (default {NAMES_FILE})')
+    source.add_argument('--from-db', action='store_true',
+        help='use the Plant table (is_common plants) instead of a file')
+    parser.add_argument('--all-plants', action='store_true',
+        help='with --from-db, every plant rather than only is_common ones')
+    parser.add_argument('--output', default=OUTPUT_DB)
+    parser.add_argument('--checkpoint',
+        help='checkpoint log (default <output>.checkpoint)')
+    parser.add_argument('--retry-failed', action='store_true',
+        help='fetch plants that failed in an earlier run again')
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--batch-size', type=int, default=25,
+        help='plants written per transaction')
+    parser.add_argument('--wiki-rate', type=float, default=10.0,
+        help='Wikipedia requests per second')
+    parser.add_argument('--gemini-rate', type=float, default=0.5,
+        help='Gemini requests per second')
+    parser.add_argument('--publish', action='store_true',
+        help='publish the result as a new versioned offline package')
+    parser.add_argument('--package-dir', default=PACKAGE_DIR,
+        help=f'where packages are published (default {PACKAGE_DIR})')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    names = names_from_db(args.all_plants) if args.from_db else names_from_file(args.names)
+    if not build(unique(names), args):
+        if args.publish:
+            print('Not publishing an incomplete build; run again to finish it')
+        sys.exit(130)
+    if args.publish:
+        version = offline_packages.publish(args.output, args.package_dir)
+        manifest = offline_packages.read_manifest(args.package_dir)
+        info = manifest['versions'][str(version)]
+        print(f'Published v{version}: {info["size"]:,} bytes, '
+              f'{len(manifest["deltas"])} deltas')
+
+
+if __name__ == '__main__':
+    main()
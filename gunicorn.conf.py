@@ -0,0 +1,24 @@
+# Gunicorn picks this file up automatically from the working directory.
+# SERVER_MODE=wsgi (default) runs the classic sync workers;
+# SERVER_MODE=asgi runs uvicorn workers and the async plant views.
+from decouple import config
+
+SERVER_MODE = config('SERVER_MODE', default='wsgi')
+
+if SERVER_MODE == 'asgi':
+    wsgi_app = 'plant_backend.asgi:application'
+    worker_class = 'uvicorn.workers.UvicornWorker'
+else:
+    wsgi_app = 'plant_backend.wsgi:application'
+    worker_class = 'sync'
+
+workers = config('WEB_CONCURRENCY', default=2, cast=int)
+accesslog = '-'
+errorlog = '-'
+
+
+def post_fork(server, worker):
+    # Provider clients created in the master (e.g. with preload_app)
+    # must not share their sockets / gRPC channels with the workers
+    from api.llm_clients import reset_clients
+    reset_clients()
@@ -45,15 +45,19 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'corsheaders.middleware.CorsMiddleware',
+    'whitenoise.middleware.WhiteNoiseMiddleware',
+    # Compresses what the middleware below it produce: gzip, or brotli
+    # when installed; static files come precompressed from WhiteNoise
+    'api.middleware.CompressionMiddleware',
+    # ETag for every GET response and 304s for If-None-Match /
+    # If-Modified-Since, computed before compression
+    'django.middleware.http.ConditionalGetMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',  # ADD THIS
-    'corsheaders.middleware.CorsMiddleware',  # ADD THIS
-
 ]
 
 ROOT_URLCONF = 'plant_backend.urls'
@@ -78,6 +82,12 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'plant_backend.wsgi.application'
+ASGI_APPLICATION = 'plant_backend.asgi.application'
+
+# 'wsgi' (sync gunicorn workers) or 'asgi' (uvicorn workers + async views),
+# see gunicorn.conf.py
+SERVER_MODE = config('SERVER_MODE', default='wsgi')
+ASYNC_VIEWS = SERVER_MODE == 'asgi'
 
 # ==========================================
 # DATABASE - PostgreSQL
@@ -120,6 +130,10 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 MEDIA_URL = 'media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Versioned offline database packages (build_offline_db.py --publish)
+OFFLINE_PACKAGE_DIR = config(
+    'OFFLINE_PACKAGE_DIR', default=os.path.join(BASE_DIR, 'offline_packages'))
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # ==========================================
@@ -142,6 +156,112 @@ REST_FRAMEWORK = {
     ],
 }
 
+# ==========================================
+# PLANT INFO CACHE (seconds per source)
+# ==========================================
+PLANT_CACHE_TTL = {
+    'wikipedia': config('PLANT_CACHE_TTL_WIKIPEDIA', default=7 * 24 * 3600, cast=int),
+    'plant_data': config('PLANT_CACHE_TTL_PLANT_DATA', default=30 * 24 * 3600, cast=int),
+    'hindi_name': config('PLANT_CACHE_TTL_HINDI_NAME', default=90 * 24 * 3600, cast=int),
+}
+
+# ==========================================
+# HTTP CACHING & COMPRESSION
+# ==========================================
+# Cache-Control max-age of plant details served from the local catalogue
+# (external answers use the remaining PLANT_CACHE_TTL of their sections)
+PLANT_INFO_MAX_AGE = config('PLANT_INFO_MAX_AGE', default=24 * 3600, cast=int)
+# max-age of answers with missing sections, so clients retry them soon
+PLANT_INFO_INCOMPLETE_MAX_AGE = config('PLANT_INFO_INCOMPLETE_MAX_AGE', default=60, cast=int)
+# 0-11; 4-6 suits responses compressed on the fly
+BROTLI_QUALITY = config('BROTLI_QUALITY', default=5, cast=int)
+
+# ==========================================
+# EXTERNAL API CALLS
+# ==========================================
+# Size of the shared thread pool used to fan out provider calls
+EXTERNAL_API_MAX_WORKERS = config('EXTERNAL_API_MAX_WORKERS', default=16, cast=int)
+# Overall deadline (seconds) for one plant lookup; late sections are
+# reported in `missing_sections`
+EXTERNAL_API_DEADLINE = config('EXTERNAL_API_DEADLINE', default=15, cast=float)
+# Gemini is fired in parallel once Groq is slower than this percentile of
+# its recent latencies (HEDGE_DEFAULT_DELAY seconds until enough samples)
+HEDGE_PERCENTILE = config('HEDGE_PERCENTILE', default=90, cast=float)
+HEDGE_DEFAULT_DELAY = config('HEDGE_DEFAULT_DELAY', default=4, cast=float)
+HEDGE_MIN_SAMPLES = config('HEDGE_MIN_SAMPLES', default=20, cast=int)
+# A provider that fails this many times in a row is skipped for
+# CIRCUIT_RESET_TIMEOUT seconds, then retried with a single trial call
+CIRCUIT_FAILURE_THRESHOLD = config('CIRCUIT_FAILURE_THRESHOLD', default=5, cast=int)
+CIRCUIT_RESET_TIMEOUT = config('CIRCUIT_RESET_TIMEOUT', default=30, cast=float)
+# /api/external/batch/: max names per request and plants fetched at once
+BATCH_MAX_NAMES = config('BATCH_MAX_NAMES', default=50, cast=int)
+BATCH_MAX_PARALLEL = config('BATCH_MAX_PARALLEL', default=8, cast=int)
+
+# ==========================================
+# LEAF IMAGE PREPROCESSING
+# ==========================================
+# Uploads are EXIF-rotated, center-cropped to IDENTIFY_IMAGE_CROP of each
+# side and downsampled to IDENTIFY_IMAGE_MAX_EDGE px before Gemini Vision
+IDENTIFY_IMAGE_MAX_EDGE = config('IDENTIFY_IMAGE_MAX_EDGE', default=1024, cast=int)
+IDENTIFY_IMAGE_CROP = config('IDENTIFY_IMAGE_CROP', default=0.9, cast=float)
+IDENTIFY_IMAGE_FORMAT = config('IDENTIFY_IMAGE_FORMAT', default='JPEG', cast=str.upper)  # JPEG or WEBP
+IDENTIFY_IMAGE_QUALITY = config('IDENTIFY_IMAGE_QUALITY', default=85, cast=int)
+
+# ==========================================
+# LEAF IDENTIFICATION CACHE
+# ==========================================
+# Recent identifications kept per worker, matched by perceptual hash
+IDENTIFY_HASH_CACHE_SIZE = config('IDENTIFY_HASH_CACHE_SIZE', default=2048, cast=int)
+# Max differing bits (out of 64) for an upload to count as the same photo
+IDENTIFY_HASH_MAX_DISTANCE = config('IDENTIFY_HASH_MAX_DISTANCE', default=6, cast=int)
+
+# ==========================================
+# PLANT NAME RESOLVER
+# ==========================================
+# Seconds before the per-worker fuzzy name index is rebuilt from the DB
+NAME_INDEX_REFRESH = config('NAME_INDEX_REFRESH', default=300, cast=int)
+# Minimum trigram similarity for a name to be offered as a candidate
+NAME_INDEX_MIN_SCORE = config('NAME_INDEX_MIN_SCORE', default=0.45, cast=float)
+# Minimum similarity for a lookup to be silently corrected to the candidate
+NAME_INDEX_AUTO_SCORE = config('NAME_INDEX_AUTO_SCORE', default=0.65, cast=float)
+
+# ==========================================
+# REMINDER DISPATCH (manage.py dispatch_reminders)
+# ==========================================
+# Dotted path of the notifier class (see api/notifiers.py)
+REMINDER_NOTIFIER = config('REMINDER_NOTIFIER', default='api.notifiers.ConsoleNotifier')
+REMINDER_BATCH_SIZE = config('REMINDER_BATCH_SIZE', default=500, cast=int)
+# Seconds before a reminder the notifier failed to deliver is retried
+REMINDER_RETRY_DELAY = config('REMINDER_RETRY_DELAY', default=300, cast=int)
+REMINDER_POLL_INTERVAL = config('REMINDER_POLL_INTERVAL', default=10, cast=float)
+
+# ==========================================
+# LOGBOOK IMAGE VARIANTS
+# ==========================================
+# Resized copies made in the background after each upload (max edge px)
+LOGBOOK_IMAGE_SIZES = {
+    'thumb': config('LOGBOOK_THUMB_EDGE', default=240, cast=int),
+    'medium': config('LOGBOOK_MEDIUM_EDGE', default=960, cast=int),
+}
+LOGBOOK_IMAGE_FORMATS = ['JPEG', 'WEBP']
+LOGBOOK_IMAGE_QUALITY = config('LOGBOOK_IMAGE_QUALITY', default=80, cast=int)
+# Background pool size; 0 renders right after the upload commits, in the
+# request (development and tests)
+LOGBOOK_IMAGE_WORKERS = config('LOGBOOK_IMAGE_WORKERS', default=2, cast=int)
+
+# ==========================================
+# INCREMENTAL SYNC (/api/sync/<feed>/)
+# ==========================================
+# Rows changed in the last few seconds are held back until the next
+# sync, so a transaction still in flight (its updated_at already set)
+# cannot commit behind a client's cursor and be skipped
+SYNC_SETTLE_SECONDS = config('SYNC_SETTLE_SECONDS', default=5, cast=float)
+SYNC_PAGE_SIZE = config('SYNC_PAGE_SIZE', default=200, cast=int)
+SYNC_MAX_PAGE_SIZE = config('SYNC_MAX_PAGE_SIZE', default=1000, cast=int)
+# Tombstones older than this are pruned (manage.py prune_tombstones);
+# clients that have not synced for longer must start over
+SYNC_TOMBSTONE_DAYS = config('SYNC_TOMBSTONE_DAYS', default=90, cast=int)
+
 # ==========================================
 # CORS SETTINGS (For Android App)
 # ==========================================
@@ -160,11 +280,15 @@ CORS_ALLOW_HEADERS = [
     'authorization',
     'content-type',
     'dnt',
+    'if-modified-since',
+    'if-none-match',
     'origin',
     'user-agent',
     'x-csrftoken',
     'x-requested-with',
 ]
+# Readable by browser clients (conditional requests, offline updates)
+CORS_EXPOSE_HEADERS = ['etag', 'last-modified', 'x-offline-package', 'x-offline-version']
 
 # Add at bottom:
 CORS_ALLOW_ALL_ORIGINS = True